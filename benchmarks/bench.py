@@ -2,12 +2,7 @@ import argparse
 
 import numpy as np
 import pyperf
-from utils import (
-    geometric_matrix,
-    machol_wien_matrix,
-    random_machol_wien_matrix,
-    uniform_matrix,
-)
+from utils import generate_matrix
 
 
 def get_solvers():
@@ -30,16 +25,7 @@ def get_solvers():
 
 def time_func(n_inner_loops, solver, shape, type):
     # Note: If no matrix type is indicated, then the matrix is uniformly random
-    if type == "uniform":
-        cost_matrix = uniform_matrix(shape)
-    elif type == "geometric":
-        cost_matrix = geometric_matrix(shape)
-    elif type == "MW":
-        cost_matrix = machol_wien_matrix(shape)
-    elif type == "random_MW":
-        cost_matrix = random_machol_wien_matrix(shape)
-    else:
-        cost_matrix = np.random.random(shape)
+    cost_matrix = generate_matrix(shape, type)
 
     t0 = pyperf.perf_counter()
     for i in range(n_inner_loops):
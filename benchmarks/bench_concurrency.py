@@ -0,0 +1,214 @@
+"""Throughput and tail latency of laptools under concurrency.
+
+A seeded mix of requests, each a problem of the corpus of one of a few sizes,
+is fired at a target from N threads or N processes, every worker taking the
+next request as soon as it is done with the previous one. For every target,
+pool kind and number of workers N, this reports
+
+- the throughput, in requests per second,
+- the p50, p99 and p999 latency of a request, and
+- the scaling efficiency, the throughput relative to N times the throughput
+  of a single worker of the same kind.
+
+Threads only scale when the target releases the GIL while it solves. Among
+the targets, augment is the pybind11 backend _augment._solve, which holds
+the GIL throughout.
+"""
+import argparse
+import concurrent.futures
+import json
+import time
+
+import numpy as np
+from corpus import cost_matrix as corpus_cost_matrix
+from suite import setup_augment, setup_clap, setup_lapjv, setup_solve
+
+# Map each target to its setup and to the sizes of the square problems in its
+# mix of requests. A setup takes a cost matrix and returns the function to run.
+TARGETS = {
+    "solve": (setup_solve, [16, 64, 256]),
+    "lapjv": (setup_lapjv, [16, 64, 256]),
+    "augment": (setup_augment, [16, 64, 256]),
+    "clap": (setup_clap, [8, 16, 32]),
+}
+
+
+def load_problems(requests):
+    """Load the problem of each of the requests into the cache of the corpus.
+
+    Every worker runs this when it starts, so that no problem is loaded from
+    disk while the requests are timed.
+    """
+    for _, shape, type, seed in set(requests):
+        corpus_cost_matrix(shape, type, seed)
+
+
+def run_request(target, shape, type, seed):
+    """Run one request, returning its latency in seconds."""
+    setup, _ = TARGETS[target]
+    func = setup(corpus_cost_matrix(shape, type, seed))
+
+    t0 = time.perf_counter()
+    func()
+    return time.perf_counter() - t0
+
+
+def get_requests(target, n_requests, type, seed):
+    """Get a seeded mix of requests, each drawing one of a few problems."""
+    _, sizes = TARGETS[target]
+    rng = np.random.RandomState(seed)
+    return [
+        (target, (int(size), int(size)), type, int(problem_seed))
+        for size, problem_seed in zip(
+            rng.choice(sizes, size=n_requests), rng.randint(4, size=n_requests)
+        )
+    ]
+
+
+def run_pool(pool_kind, n_workers, requests):
+    """Fire the requests from a pool of workers.
+
+    Returns
+    -------
+    wall_time : float
+        The time taken to serve all of the requests, in seconds.
+    latencies : 1darray
+        The latency of each request, in seconds.
+    """
+    problems = sorted(set(requests))
+    if pool_kind == "threads":
+        executor = concurrent.futures.ThreadPoolExecutor(
+            n_workers, initializer=load_problems, initargs=(problems,)
+        )
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            n_workers, initializer=load_problems, initargs=(problems,)
+        )
+
+    with executor:
+        # Warm up the workers, so that starting them is not timed. Each of
+        # them has loaded every problem by then.
+        warmup = problems * n_workers
+        concurrent.futures.wait(
+            [executor.submit(run_request, *request) for request in warmup]
+        )
+
+        t0 = time.perf_counter()
+        latencies = list(executor.map(run_request, *zip(*requests)))
+        wall_time = time.perf_counter() - t0
+
+    return wall_time, np.array(latencies)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=list(TARGETS),
+        default=["solve", "augment", "clap"],
+        help="The functions to fire requests at.",
+    )
+    parser.add_argument(
+        "--pools",
+        nargs="+",
+        choices=["threads", "processes"],
+        default=["threads", "processes"],
+        help="The kinds of pools of workers to fire requests from.",
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=[1, 2, 4, 8],
+        help="The numbers of workers to fire requests from.",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=2000,
+        help="The number of requests fired at each target.",
+    )
+    parser.add_argument(
+        "--matrix-type",
+        type=str,
+        metavar="X",
+        default="uniform",
+        help="The matrix is of type X.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="The seed of the mix of requests.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="A JSON file in which to store the results, to track them over time.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    header = "{:<8} {:<10} {:>7} {:>12} {:>10} {:>10} {:>10} {:>10}".format(
+        "target",
+        "pool",
+        "workers",
+        "requests/s",
+        "p50 ms",
+        "p99 ms",
+        "p999 ms",
+        "scaling",
+    )
+    print(header)
+
+    results = []
+    for target in args.targets:
+        requests = get_requests(target, args.requests, args.matrix_type, args.seed)
+        for pool_kind in args.pools:
+            single_throughput = None
+            for n_workers in args.workers:
+                wall_time, latencies = run_pool(pool_kind, n_workers, requests)
+                throughput = len(requests) / wall_time
+                if single_throughput is None:
+                    # Scaling is relative to the smallest pool.
+                    single_throughput = throughput / n_workers
+                p50, p99, p999 = 1e3 * np.percentile(latencies, [50, 99, 99.9])
+                efficiency = throughput / (n_workers * single_throughput)
+
+                print(
+                    "{:<8} {:<10} {:>7} {:>12.1f} {:>10.3f} {:>10.3f} {:>10.3f} "
+                    "{:>9.0%}".format(
+                        target,
+                        pool_kind,
+                        n_workers,
+                        throughput,
+                        p50,
+                        p99,
+                        p999,
+                        efficiency,
+                    )
+                )
+                results.append(
+                    {
+                        "target": target,
+                        "pool": pool_kind,
+                        "workers": n_workers,
+                        "throughput": throughput,
+                        "p50": p50 / 1e3,
+                        "p99": p99 / 1e3,
+                        "p999": p999 / 1e3,
+                        "scaling_efficiency": efficiency,
+                    }
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Peak memory benchmarks of laptools.
+
+Every benchmark reports the peak extra memory of one call, as a multiple of
+the size of the float64 input cost matrix, for problems of the seeded corpus.
+Two metrics are available:
+
+tracemalloc
+    The peak of the memory traced by tracemalloc during the call. This covers
+    python objects and numpy arrays, which numpy reports to tracemalloc.
+rss
+    The growth of the peak resident set size during the call, measured in a
+    fresh process. This also covers the scratch space allocated natively by
+    the C++ solvers, which tracemalloc cannot see, but is page granular.
+
+The results are written as a pyperf suite. Benchmarks of the lap group are
+named "size-matrix_type-case" for plot.py, where size is the smaller side of
+the problem. Benchmarks of the clap group are named
+"n_rowsxn_cols-matrix_type-solver" for plot_clap.py.
+"""
+
+import argparse
+import gc
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+
+import numpy as np
+import pyperf
+from corpus import cost_matrix as corpus_cost_matrix
+from suite import (
+    setup_clap,
+    setup_clap_naive,
+    setup_removed_col,
+    setup_removed_row,
+    setup_solve,
+)
+
+# Map each case of the lap group to the shape of its problems of size n, and
+# to its setup. A setup takes a cost matrix and returns the function to run.
+LAP_CASES = {
+    "solve_square": (lambda n: (n, n), setup_solve),
+    "solve_tall": (lambda n: (2 * n, n), setup_solve),
+    "solve_wide": (lambda n: (n, 2 * n), setup_solve),
+    "removed_row": (lambda n: (n, 2 * n), setup_removed_row),
+    "removed_col": (lambda n: (n, 2 * n), setup_removed_col),
+}
+
+CLAP_SOLVERS = {"dynamic": setup_clap, "naive": setup_clap_naive}
+
+
+def tracemalloc_peak(func):
+    """Peak memory traced by tracemalloc while running func, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def max_rss():
+    """Peak resident set size of this process so far, in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return max_rss if sys.platform == "darwin" else 1024 * max_rss
+
+
+def _rss_growth(setup, shape, type, seed, queue):
+    func = setup(corpus_cost_matrix(shape, type, seed))
+    gc.collect()
+    before = max_rss()
+    func()
+    queue.put(max_rss() - before)
+
+
+def rss_peak(setup, shape, type, seed):
+    """Growth of the peak resident set size while running a fresh setup."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_rss_growth, args=(setup, shape, type, seed, queue)
+    )
+    process.start()
+    growth = queue.get()
+    process.join()
+    return growth
+
+
+def measure(metric, setup, shape, type, seeds):
+    """Peak extra memory of one call for each seed, relative to the input."""
+    input_bytes = np.prod(shape) * np.dtype(np.double).itemsize
+    values = []
+    for seed in seeds:
+        if metric == "tracemalloc":
+            func = setup(corpus_cost_matrix(shape, type, seed))
+            peak = tracemalloc_peak(func)
+        else:
+            peak = rss_peak(setup, shape, type, seed)
+        # pyperf only stores positive values, so a peak of zero bytes is
+        # reported as a single byte.
+        values.append(max(peak, 1) / input_bytes)
+    return values
+
+
+def get_benchmarks(args):
+    """Yield the name, setup and problem shape of each benchmark."""
+    type = args.matrix_type
+    if args.group == "lap":
+        for n in 2 ** np.arange(args.min_size_pow, args.max_size_pow + 1):
+            for case, (get_shape, setup) in LAP_CASES.items():
+                name = "{}-{}-{}".format(n, type, case)
+                yield name, setup, get_shape(int(n))
+    else:
+        shapes = [
+            (int(n_rows), int(n_cols))
+            for n_rows in 2 ** np.arange(args.min_size_pow, args.max_size_pow + 1)
+            for n_cols in 2 ** np.arange(args.min_size_pow, args.max_size_pow + 1)
+        ]
+        for shape in shapes:
+            for solver, setup in CLAP_SOLVERS.items():
+                name = "{}x{}-{}-{}".format(shape[0], shape[1], type, solver)
+                yield name, setup, shape
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("outputfile", help="The pyperf suite to write.")
+    parser.add_argument(
+        "--group",
+        choices=["lap", "clap"],
+        default="lap",
+        help="Benchmark lap.solve and the removal primitives, or clap.costs.",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=["tracemalloc", "rss"],
+        default="tracemalloc",
+        help="How the peak memory of a call is measured.",
+    )
+    parser.add_argument(
+        "--min-size-pow",
+        type=int,
+        metavar="POW",
+        default=3,
+        help="Smallest problems have 2^POW rows or columns.",
+    )
+    parser.add_argument(
+        "--max-size-pow",
+        type=int,
+        metavar="POW",
+        default=6,
+        help="Largest problems have 2^POW rows or columns.",
+    )
+    parser.add_argument(
+        "--matrix-type",
+        type=str,
+        metavar="X",
+        default="uniform",
+        help="The matrix is of type X.",
+    )
+    parser.add_argument(
+        "--values",
+        type=int,
+        default=3,
+        help="The number of corpus problems measured for each benchmark.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    seeds = range(args.values)
+
+    benches = []
+    for name, setup, shape in get_benchmarks(args):
+        values = measure(args.metric, setup, shape, args.matrix_type, seeds)
+        print("{}: {:.2f}x the input".format(name, np.median(values)))
+        metadata = {"name": name, "memory_metric": args.metric}
+        run = pyperf.Run(values, metadata=metadata, collect_metadata=False)
+        benches.append(pyperf.Benchmark([run]))
+
+    pyperf.BenchmarkSuite(benches).dump(args.outputfile, replace=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""End-to-end latency of lap.solve against scipy on tiny problems.
+
+Matrices of at most 8 rows and columns take the fast path of lap.solve, a
+single native call. The results plot with plot.py, e.g.
+
+    python bench_small.py -o small.json
+    python plot.py small.json small.pdf
+"""
+import argparse
+
+import pyperf
+from utils import generate_matrix
+
+
+def get_solvers():
+    from scipy.optimize import linear_sum_assignment as scipy_lap
+
+    from laptools.lap import solve as laptools_lap
+
+    return {
+        "scipy": scipy_lap,
+        "laptools": laptools_lap,
+    }
+
+
+def time_func(n_inner_loops, solver, shape, type):
+    cost_matrix = generate_matrix(shape, type)
+
+    t0 = pyperf.perf_counter()
+    for i in range(n_inner_loops):
+        solver(cost_matrix)
+    return pyperf.perf_counter() - t0
+
+
+def get_bench_name(size, type, solver_name):
+    return "{}-{}-{}".format(size, type, solver_name)
+
+
+def parse_args(benchopts):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        metavar="N",
+        default=2,
+        help="Smallest test matrix will be size N by N.",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        metavar="N",
+        default=8,
+        help="Largest test matrix will be size N by N.",
+    )
+    parser.add_argument(
+        "--matrix-type",
+        type=str,
+        metavar="X",
+        default="uniform",
+        help="The matrix is of type X.",
+    )
+    parser.add_argument(
+        "--tall",
+        action="store_true",
+        help="Use matrices of N by N - 1, which lap.solve transposes.",
+    )
+    return parser.parse_args(benchopts)
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append("--")
+    cmd.extend(args.benchopts)
+
+
+def main():
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument("benchopts", nargs="*")
+    args = parse_args(runner.parse_args().benchopts)
+
+    solvers = get_solvers()
+    type = args.matrix_type
+    for size in range(args.min_size, args.max_size + 1):
+        shape = (size, size - 1) if args.tall else (size, size)
+        for solver_name, solver_func in solvers.items():
+            bench_name = get_bench_name(size, type, solver_name)
+            runner.bench_time_func(bench_name, time_func, solver_func, shape, type)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""A seeded corpus of benchmark problems, cached as .npy files.
+
+Every benchmark run on a given shape, matrix type and seed sees exactly the
+same cost matrix, no matter which process generates it or when. Generated
+matrices are saved under corpus/ so later runs only need to load them.
+"""
+import functools
+import os
+import zlib
+
+import numpy as np
+from utils import generate_matrix
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def get_path(shape, type, seed):
+    """Get the file in which a problem of the corpus is cached."""
+    n_rows, n_cols = shape
+    name = "{}x{}-{}-{}.npy".format(n_rows, n_cols, type, seed)
+    return os.path.join(CORPUS_DIR, name)
+
+
+@functools.lru_cache(maxsize=None)
+def cost_matrix(shape, type, seed=0):
+    """Get the cost matrix of the corpus with the given shape, type and seed.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the cost matrix.
+    type : str
+        The matrix type, one of utils.MATRIX_TYPES.
+    seed : int, optional
+        Distinguishes between problems of the same shape and type.
+
+    Returns
+    -------
+    2darray
+        A read-only cost matrix of dtype float64.
+    """
+    path = get_path(shape, type, seed)
+    try:
+        matrix = np.load(path)
+    except FileNotFoundError:
+        # Every problem gets its own stream of random numbers.
+        rng = np.random.RandomState([seed, *shape, zlib.crc32(type.encode())])
+        matrix = generate_matrix(shape, type, rng=rng).astype(np.double)
+
+        # Several benchmark processes may generate the same problem at once,
+        # so the file is only moved into place once it is complete.
+        os.makedirs(CORPUS_DIR, exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+
+    matrix.setflags(write=False)
+    return matrix
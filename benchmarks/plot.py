@@ -69,6 +69,11 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("suitefile")
     parser.add_argument("outputfile")
+    parser.add_argument(
+        "--ylabel",
+        default="Time to solve",
+        help="The label of the y axis, e.g. for the suites of bench_memory.py.",
+    )
     return parser.parse_args()
 
 
@@ -78,7 +83,7 @@ def main():
     plot_suite(suite)
     plt.legend()
     plt.xlabel("Problem size")
-    plt.ylabel("Time to solve")
+    plt.ylabel(args.ylabel)
     plt.savefig(args.outputfile)
 
 
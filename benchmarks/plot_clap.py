@@ -81,6 +81,11 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("suitefile")
     parser.add_argument("outputfile")
+    parser.add_argument(
+        "--ylabel",
+        default="Time to solve (s)",
+        help="The label of the y axis, e.g. for the suites of bench_memory.py.",
+    )
     return parser.parse_args()
 
 
@@ -90,7 +95,7 @@ def main():
     plot_suite(suite)
     plt.legend()
     plt.xlabel("Problem size")
-    plt.ylabel("Time to solve (s)")
+    plt.ylabel(args.ylabel)
     plt.savefig(args.outputfile)
 
 
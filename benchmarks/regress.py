@@ -0,0 +1,132 @@
+"""Compare a run of suite.py against the stored baselines.
+
+The baselines are a JSON file mapping each benchmark name to its median time
+in seconds. A run fails, with exit status 1, when any of its benchmarks is
+slower than its baseline by more than the threshold. Benchmarks without a
+baseline are reported but never fail a run; use --update to store them.
+
+Timings only compare on the machine they were measured on, so the baselines
+are not committed: baselines/suite.json is ignored by git. Store them once
+with --update, on the machine the comparisons run on. Without them, a run
+fails with exit status 2.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+import numpy as np
+import pyperf
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "suite.json"
+)
+
+
+def get_medians(suite):
+    """Map the name of each benchmark of a suite to its median time."""
+    return {bench.get_name(): bench.median() for bench in suite}
+
+
+def load_baselines(path):
+    """Load the baseline medians, or None if there are none."""
+    try:
+        with open(path) as f:
+            return json.load(f)["benchmarks"]
+    except FileNotFoundError:
+        return None
+
+
+def save_baselines(path, medians):
+    """Store the baseline medians, along with where they were measured."""
+    baselines = {
+        "metadata": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "benchmarks": medians,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+
+def compare(medians, baselines, threshold):
+    """Compare medians against baselines.
+
+    Returns
+    -------
+    list of str
+        The names of the benchmarks which regressed past the threshold.
+    """
+    regressions = []
+    for name, median in sorted(medians.items()):
+        if name not in baselines:
+            print("{:<50} {:>12.3g}s  (no baseline)".format(name, median))
+            continue
+        ratio = median / baselines[name]
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            "{:<50} {:>12.3g}s  {:>6.2f}x{}".format(
+                name, median, ratio, "  REGRESSION" if regressed else ""
+            )
+        )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("suitefile", help="The output of suite.py.")
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="The JSON file of baselines (default: baselines/suite.json).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The tolerated slowdown relative to the baseline, as a fraction.",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Store the results of the run as the new baselines.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    medians = get_medians(pyperf.BenchmarkSuite.load(args.suitefile))
+    baselines = load_baselines(args.baseline)
+
+    if args.update:
+        if baselines is not None:
+            medians = {**baselines, **medians}
+        save_baselines(args.baseline, medians)
+        print("Stored {} baselines in {}".format(len(medians), args.baseline))
+        return
+    if baselines is None:
+        print(
+            "No baselines in {}; store them with --update".format(args.baseline),
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    regressions = compare(medians, baselines, args.threshold)
+    if regressions:
+        print(
+            "{} of {} benchmarks regressed by more than {:.0%}".format(
+                len(regressions), len(medians), args.threshold
+            )
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""The regression benchmark suite of laptools.
+
+Every benchmark times one of the laptools solvers on a problem of the seeded
+corpus, see corpus.py. Benchmarks are named
+
+    "group-n_rowsxn_cols-matrix_type-solver"
+
+Compare the results against the stored baselines with regress.py.
+"""
+import argparse
+
+import numpy as np
+import pyperf
+from corpus import cost_matrix as corpus_cost_matrix
+
+
+def setup_solve(cost_matrix):
+    from laptools import lap
+
+    return lambda: lap.solve(cost_matrix)
+
+
+def setup_lapjv(cost_matrix):
+    from py_lapjv import lapjv
+
+    return lambda: lapjv(cost_matrix)
+
+
+def setup_augment(cost_matrix):
+    from _augment import _solve
+
+    return lambda: _solve(cost_matrix)
+
+
+def setup_removed_row(cost_matrix):
+    from laptools import lap
+    from py_lapjv import lapjv
+
+    col4row, row4col, v = lapjv(cost_matrix)
+    row_removed = len(col4row) // 2
+    return lambda: lap.solve_lsap_with_removed_row(
+        cost_matrix, row_removed, row4col, col4row, v, modify_val=False
+    )
+
+
+def setup_removed_col(cost_matrix):
+    from laptools import lap
+    from py_lapjv import lapjv
+
+    col4row, row4col, v = lapjv(cost_matrix)
+    col_removed = col4row[len(col4row) // 2]
+    return lambda: lap.solve_lsap_with_removed_col(
+        cost_matrix, col_removed, row4col, col4row, v, modify_val=False
+    )
+
+
+def setup_clap(cost_matrix):
+    from laptools import clap
+
+    return lambda: clap.costs(cost_matrix)
+
+
+def setup_clap_naive(cost_matrix):
+    from laptools import clap_naive
+
+    return lambda: clap_naive.costs(cost_matrix)
+
+
+# Map each group of benchmarks to the ratio of columns to rows of its
+# problems, and to the setup of each of its solvers. A setup takes a cost
+# matrix and returns the function to time.
+GROUPS = {
+    "solve": (1, {"laptools": setup_solve}),
+    "backend": (1, {"lapjv": setup_lapjv, "augment": setup_augment}),
+    # Removing an assigned column from a square problem makes it infeasible.
+    "removed_row": (2, {"laptools": setup_removed_row}),
+    "removed_col": (2, {"laptools": setup_removed_col}),
+    "clap": (1, {"dynamic": setup_clap, "naive": setup_clap_naive}),
+}
+
+
+def time_func(n_inner_loops, setup, shape, type, seed):
+    func = setup(corpus_cost_matrix(shape, type, seed))
+
+    t0 = pyperf.perf_counter()
+    for i in range(n_inner_loops):
+        func()
+    return pyperf.perf_counter() - t0
+
+
+def get_bench_name(group, shape, type, solver_name):
+    return "{}-{}x{}-{}-{}".format(group, shape[0], shape[1], type, solver_name)
+
+
+def parse_args(benchopts):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--min-size-pow",
+        type=int,
+        metavar="POW",
+        default=3,
+        help="Smallest test matrix will have 2^POW rows.",
+    )
+    parser.add_argument(
+        "--max-size-pow",
+        type=int,
+        metavar="POW",
+        default=5,
+        help="Largest test matrix will have 2^POW rows.",
+    )
+    parser.add_argument(
+        "--matrix-type",
+        type=str,
+        metavar="X",
+        default="uniform",
+        help="The matrix is of type X.",
+    )
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        choices=list(GROUPS),
+        default=list(GROUPS),
+        help="The groups of benchmarks to run.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="The seed of the corpus problems.",
+    )
+    return parser.parse_args(benchopts)
+
+
+def add_cmdline_args(cmd, args):
+    cmd.append("--")
+    cmd.extend(args.benchopts)
+
+
+def main():
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.argparser.add_argument("benchopts", nargs="*")
+    args = parse_args(runner.parse_args().benchopts)
+
+    sizes = 2 ** np.arange(args.min_size_pow, args.max_size_pow + 1)
+    type = args.matrix_type
+    for group in args.groups:
+        col_ratio, setups = GROUPS[group]
+        for size in sizes:
+            shape = (int(size), int(size * col_ratio))
+            for solver_name, setup in setups.items():
+                bench_name = get_bench_name(group, shape, type, solver_name)
+                runner.bench_time_func(
+                    bench_name, time_func, setup, shape, type, args.seed
+                )
+
+
+if __name__ == "__main__":
+    main()
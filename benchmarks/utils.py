@@ -1,48 +1,53 @@
-import random
-
 import numpy as np
 
 
-def uniform_matrix(shape, low=0.0, high=1.0):
+def uniform_matrix(shape, low=0.0, high=1.0, rng=np.random):
     """Generate a uniformly random matrix of the given shape."""
-    return np.random.uniform(low=low, high=high, size=shape)
+    return rng.uniform(low=low, high=high, size=shape)
 
 
-def randint_matrix(shape, low=0, high=100):
+def randint_matrix(shape, low=0, high=100, rng=np.random):
     """Generate a matrix of random integers of the given shape."""
-    return np.random.randint(low=low, high=high, size=shape)
+    return rng.randint(low=low, high=high, size=shape)
 
 
-def geometric_matrix(shape, low=0.0, high=1.0):
+def geometric_matrix(shape, low=0.0, high=1.0, rng=np.random):
     """Generate a geometric matrix of the given shape."""
     n_rows, n_cols = shape
-    A = np.random.uniform(low=low, high=high, size=(n_rows + n_cols,))
-    B = np.random.uniform(low=low, high=high, size=(n_rows + n_cols,))
+    A = rng.uniform(low=low, high=high, size=(n_rows + n_cols,))
+    B = rng.uniform(low=low, high=high, size=(n_rows + n_cols,))
 
-    A_mat = np.array(
-        [[A[i] - A[n_rows + j] for j in range(n_cols)] for i in range(n_rows)]
-    )
-    B_mat = np.array(
-        [[B[i] - B[n_rows + j] for j in range(n_cols)] for i in range(n_rows)]
-    )
+    A_mat = A[:n_rows, np.newaxis] - A[np.newaxis, n_rows:]
+    B_mat = B[:n_rows, np.newaxis] - B[np.newaxis, n_rows:]
 
     return np.sqrt(A_mat ** 2 + B_mat ** 2) + 1.0
 
 
-def machol_wien_matrix(shape):
+def machol_wien_matrix(shape, rng=np.random):
     """Generate a Machol-Wien matrix of the given shape."""
     n_rows, n_cols = shape
-    return np.array(
-        [[i * j + 1 for j in range(1, n_cols + 1)] for i in range(1, n_rows + 1)]
-    )
+    return np.outer(np.arange(1, n_rows + 1), np.arange(1, n_cols + 1)) + 1
 
 
-def random_machol_wien_matrix(shape, low=0.0, high=1.0):
+def random_machol_wien_matrix(shape, low=0.0, high=1.0, rng=np.random):
     """Generate a random Machol-Wien matrix of the given shape."""
-    n_rows, n_cols = shape
-    return np.array(
-        [
-            [random.randint(1, i * j + 1) for j in range(1, n_cols + 1)]
-            for i in range(1, n_rows + 1)
-        ]
-    )
+    # Entry i, j is uniform among the integers 1, ..., i * j + 1.
+    return rng.randint(1, machol_wien_matrix(shape) + 1)
+
+
+MATRIX_TYPES = {
+    "uniform": uniform_matrix,
+    "randint": randint_matrix,
+    "geometric": geometric_matrix,
+    "MW": machol_wien_matrix,
+    "random_MW": random_machol_wien_matrix,
+}
+
+
+def generate_matrix(shape, type, rng=np.random):
+    """Generate a matrix of the given shape and type.
+
+    If the type is not known, the matrix is uniformly random.
+    """
+    generator = MATRIX_TYPES.get(type, uniform_matrix)
+    return generator(shape, rng=rng)
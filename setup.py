@@ -138,11 +138,11 @@ class BuildExt(build_ext):
 
     c_opts = {
         "msvc": ["/EHsc", "/std:c++latest", "/arch:AVX2"],
-        "unix": ["-march=native", "-ftree-vectorize"],
+        "unix": ["-march=native", "-ftree-vectorize", "-pthread"],
     }
     l_opts = {
         "msvc": [],
-        "unix": [],
+        "unix": ["-pthread"],
     }
 
     if sys.platform == "darwin":
@@ -0,0 +1,347 @@
+// Constrained linear assignment costs, the native counterpart of
+// laptools.clap.costs. The (i, j) entry of the result is the total cost of
+// the optimal assignment subject to the constraint that row i is assigned to
+// column j, i.e. cost(i, j) + lsap(rows \ i, cols \ j).
+
+#pragma once
+
+#include <vector>
+#include "lap.h"
+
+/// @brief Cost accessor for a matrix with one of its rows left out.
+template <typename cost, typename costs>
+struct removed_row_costs {
+  const costs &assign_cost;
+  int64_t row_removed;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return assign_cost(i < row_removed ? i : i + 1, j);
+  }
+};
+
+/// @brief Cost accessor for the transpose of a row-major matrix with nc columns.
+template <typename cost>
+struct transposed_costs {
+  const cost *restrict assign_cost;
+  int nc;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return assign_cost[j * nc + i];
+  }
+};
+
+/// @brief Total cost of the assignment rowsol of the first nr rows.
+template <typename idx, typename cost, typename costs>
+cost assignment_cost(int nr, const costs &assign_cost, const idx *rowsol) {
+  cost total = 0;
+  for (idx i = 0; i < nr; i++) {
+    total += assign_cost(i, rowsol[i]);
+  }
+  return total;
+}
+
+/// @brief Shortest alternating paths from every row to an unassigned column.
+/// @param rowsol in column assigned to each row, every row must be assigned
+/// @param colsol in row assigned to each column, -1 if unassigned
+/// @param v in optimal dual variables of the columns
+/// @param dist out reduced cost of the cheapest way to reassign each row, by
+///             a chain of reassignments ending in an unassigned column
+///
+/// This is Dijkstra's algorithm run backwards from the unassigned columns,
+/// with the reduced costs c(i, j) - u(i) - v(j) as edge weights.
+template <typename idx, typename cost, typename costs>
+void reassignment_costs(int nr, int nc, const costs &assign_cost,
+                        const idx *rowsol, const idx *colsol, const cost *v,
+                        cost *dist) {
+  std::vector<cost> u(nr);
+  std::vector<bool> done(nr, false);
+  for (idx a = 0; a < nr; a++) {
+    u[a] = assign_cost(a, rowsol[a]) - v[rowsol[a]];
+    dist[a] = INFINITY;
+    for (idx e = 0; e < nc; e++) {
+      if (colsol[e] < 0) {
+        dist[a] = std::min(dist[a], assign_cost(a, e) - u[a] - v[e]);
+      }
+    }
+  }
+
+  for (idx it = 0; it < nr; it++) {
+    idx b = -1;
+    for (idx a = 0; a < nr; a++) {
+      if (!done[a] && (b < 0 || dist[a] < dist[b])) {
+        b = a;
+      }
+    }
+    if (dist[b] == INFINITY) {
+      break;
+    }
+    done[b] = true;
+
+    // Row a can take the column of row b, which then has to move on.
+    idx k = rowsol[b];
+    for (idx a = 0; a < nr; a++) {
+      if (!done[a]) {
+        dist[a] = std::min(dist[a], assign_cost(a, k) - u[a] - v[k] + dist[b]);
+      }
+    }
+  }
+}
+
+/// @brief Constrained lsap costs of row i, given the lsap with row i removed.
+template <typename idx, typename cost, typename costs>
+struct removed_row_solution {
+  const costs &assign_cost;
+  idx i;
+  cost sub_total;         // total cost of the lsap with row i removed.
+  const idx *sub_colsol;  // its row assigned to each column, -1 if unassigned.
+  const cost *sub_v;      // its dual variables.
+  const cost *dist;       // its reassignment_costs, if they were asked for.
+
+  /// @brief Total cost of the lsap with row i assigned to column j.
+  cost operator()(idx j) const {
+    // Unassigned columns can be given to row i for free. Row i otherwise
+    // takes column j away from row r, which has to be reassigned. Since the
+    // unassigned columns have zero duals, the reassignment changes the sub
+    // total by dist[r] - v[j].
+    idx r = sub_colsol[j];
+    cost total = assign_cost(i, j) + sub_total;
+    return r < 0 ? total : total - sub_v[j] + dist[r];
+  }
+};
+
+/// @brief Solve the lsap with row i removed for each of the rows
+/// [row_start, row_stop) of an nr x nc matrix, nr <= nc, given the optimal
+/// solution of the full problem, and pass the removed_row_solution to store.
+/// @param rowsol in column assigned to each row in the solution / size nr
+/// @param colsol in row assigned to each column in the solution / size nc
+/// @param v in dual variables of the solution, as left by lap / size nc
+/// @param reassign in whether to compute the reassignment_costs of each
+///                 solution, which only the constrained costs need
+///
+/// The lsap with row i removed is warm started from the full solution. The
+/// other rows keep their columns and duals, and the column of row i is
+/// unassigned, which makes it a column added to the sub problem.
+template <typename idx, typename cost, typename costs, typename F>
+void for_each_removed_row(int nr, int nc, const costs &assign_cost,
+                          const idx *rowsol, const idx *colsol, const cost *v,
+                          int64_t row_start, int64_t row_stop, F store,
+                          bool reassign = true) {
+  if (row_start >= row_stop) {
+    return;
+  }
+  int sub_nr = nr - 1;
+  std::vector<idx> sub_rowsol(sub_nr), sub_colsol(nc);
+  std::vector<cost> sub_v(nc), dist(sub_nr);
+  auto added = std::unique_ptr<bool[]>(new bool[nc]());
+
+  for (idx i = row_start; i < row_stop; i++) {
+    removed_row_costs<cost, costs> sub_cost{assign_cost, i};
+
+    for (idx r = 0; r < sub_nr; r++) {
+      sub_rowsol[r] = rowsol[r < i ? r : r + 1];
+    }
+    for (idx j = 0; j < nc; j++) {
+      idx r = colsol[j];
+      sub_colsol[j] = r < 0 || r == i ? -1 : r < i ? r : r - 1;
+      sub_v[j] = v[j];
+    }
+    // The full problem is feasible, so the sub problem is as well.
+    added[rowsol[i]] = true;
+    augment_added_cols(added.get(), sub_nr, nc, sub_cost, sub_rowsol.data(),
+                       sub_colsol.data(), sub_v.data());
+    added[rowsol[i]] = false;
+
+    if (reassign) {
+      reassignment_costs<idx, cost>(sub_nr, nc, sub_cost, sub_rowsol.data(),
+                                    sub_colsol.data(), sub_v.data(),
+                                    dist.data());
+    }
+    store(removed_row_solution<idx, cost, costs>{
+        assign_cost, i,
+        assignment_cost<idx, cost>(sub_nr, sub_cost, sub_rowsol.data()),
+        sub_colsol.data(), sub_v.data(), reassign ? dist.data() : nullptr});
+  }
+}
+
+/// @brief Constrained lsap costs of the rows [row_start, row_stop) of an
+/// nr x nc matrix, nr <= nc, given the optimal solution of the full problem.
+/// @param assign_cost in cost accessor
+/// @param rowsol in column assigned to each row in the solution / size nr
+/// @param colsol in row assigned to each column in the solution / size nc
+/// @param v in dual variables of the solution, as left by lap / size nc
+/// @param total_costs out result, entry (i, j) is stored at
+///                    total_costs[(i - row_start) * row_stride + j * col_stride]
+///
+/// For each row i, the lsap with row i removed is solved. Columns not used by
+/// that solution can be given to row i for free. A column j that is used, by
+/// row r say, costs the reduced cost of reassigning row r elsewhere.
+template <typename idx, typename cost, typename costs>
+void clap_costs_rows(int nr, int nc, const costs &assign_cost,
+                     const idx *rowsol, const idx *colsol, const cost *v,
+                     int64_t row_start, int64_t row_stop, cost *total_costs,
+                     int64_t row_stride, int64_t col_stride) {
+  for_each_removed_row<idx, cost>(
+      nr, nc, assign_cost, rowsol, colsol, v, row_start, row_stop,
+      [&](const removed_row_solution<idx, cost, costs> &constrained) {
+        cost *out = total_costs + (constrained.i - row_start) * row_stride;
+        for (idx j = 0; j < nc; j++) {
+          out[j * col_stride] = constrained(j);
+        }
+      });
+}
+
+/// @brief Constrained lsap costs of the entries of an nr x nc matrix,
+/// nr <= nc, listed in compressed sparse row form.
+/// @param indptr in the entries of row i are indptr[i] to indptr[i + 1] - 1
+///               / size nr + 1
+/// @param indices in column of each entry / size indptr[nr]
+/// @param total_costs out result, the constrained cost of each entry
+///                    / size indptr[nr]
+///
+/// Entries of infinite cost may be left out. If the full problem is
+/// infeasible, every entry is infinite.
+template <typename idx, typename cost, typename costs>
+void clap_costs_entries(int nr, int nc, const costs &assign_cost,
+                        const int64_t *indptr, const int64_t *indices,
+                        cost *total_costs) {
+  std::vector<idx> rowsol(nr), colsol(nc);
+  std::vector<cost> v(nc);
+  try {
+    lap_costs(nr, nc, assign_cost, rowsol.data(), colsol.data(), v.data());
+  }
+  catch (char const* e) {
+    std::fill(total_costs, total_costs + indptr[nr], cost(INFINITY));
+    return;
+  }
+
+  for_each_removed_row<idx, cost>(
+      nr, nc, assign_cost, rowsol.data(), colsol.data(), v.data(), 0, nr,
+      [&](const removed_row_solution<idx, cost, costs> &constrained) {
+        for (int64_t k = indptr[constrained.i]; k < indptr[constrained.i + 1];
+             k++) {
+          total_costs[k] = constrained(indices[k]);
+        }
+      });
+}
+
+/// @brief Constrained lsap costs of every entry of an nr x nc matrix, nr <= nc.
+/// @param assign_cost in cost accessor
+/// @param total_costs out result, entry (i, j) is stored at
+///                    total_costs[i * row_stride + j * col_stride]
+template <typename idx, typename cost, typename costs>
+void clap_costs(int nr, int nc, const costs &assign_cost, cost *total_costs,
+                int64_t row_stride, int64_t col_stride) {
+  std::vector<idx> rowsol(nr), colsol(nc);
+  std::vector<cost> v(nc);
+  try {
+    lap_costs(nr, nc, assign_cost, rowsol.data(), colsol.data(), v.data());
+  }
+  catch (char const* e) {
+    // Every constraint only makes an infeasible problem harder.
+    for (idx i = 0; i < nr; i++) {
+      for (idx j = 0; j < nc; j++) {
+        total_costs[i * row_stride + j * col_stride] = INFINITY;
+      }
+    }
+    return;
+  }
+
+  clap_costs_rows<idx, cost>(nr, nc, assign_cost, rowsol.data(), colsol.data(),
+                             v.data(), 0, nr, total_costs, row_stride,
+                             col_stride);
+}
+
+/// @brief Total costs of the lsap of an nr x nc matrix, nr <= nc, with each
+/// of its rows, or each of its columns, removed.
+/// @param remove_rows in whether to remove the rows, or else the columns, in
+///                    which case nr < nc
+/// @param totals out total cost with each row, or column, removed, infinite
+///                   if that is infeasible / size nr, or nc
+/// @param n_threads in number of worker threads removing the rows
+///
+/// The lsap with a row removed is warm started from the full solution, see
+/// for_each_removed_row, in chunks of rows spread over the threads. Removing
+/// an assigned column costs the reassignment of its row instead, which the
+/// reassignment_costs of the full solution give for every column at once.
+template <typename idx, typename cost, typename costs>
+void lap_leave_one_out(int nr, int nc, const costs &assign_cost,
+                       bool remove_rows, cost *totals, int n_threads) {
+  std::vector<idx> rowsol(nr), colsol(nc);
+  std::vector<cost> v(nc);
+  bool feasible = true;
+  try {
+    lap_costs(nr, nc, assign_cost, rowsol.data(), colsol.data(), v.data());
+  }
+  catch (char const* e) {
+    feasible = false;
+  }
+
+  if (!remove_rows) {
+    // Removing a column only makes an infeasible problem harder.
+    if (!feasible) {
+      std::fill(totals, totals + nc, cost(INFINITY));
+      return;
+    }
+    std::vector<cost> dist(nr);
+    reassignment_costs<idx, cost>(nr, nc, assign_cost, rowsol.data(),
+                                  colsol.data(), v.data(), dist.data());
+    cost total = assignment_cost<idx, cost>(nr, assign_cost, rowsol.data());
+    for (idx j = 0; j < nc; j++) {
+      idx r = colsol[j];
+      totals[j] = r < 0 ? total : total - v[j] + dist[r];
+    }
+    return;
+  }
+
+  int64_t n_chunks = std::min<int64_t>(nr, int64_t(n_threads) * 4);
+  batch_for(n_chunks, n_threads, [&](int64_t chunk) {
+    int64_t row_start = nr * chunk / n_chunks;
+    int64_t row_stop = nr * (chunk + 1) / n_chunks;
+    if (feasible) {
+      for_each_removed_row<idx, cost>(
+          nr, nc, assign_cost, rowsol.data(), colsol.data(), v.data(),
+          row_start, row_stop,
+          [&](const removed_row_solution<idx, cost, costs> &removed) {
+            totals[removed.i] = removed.sub_total;
+          },
+          false);
+      return;
+    }
+    // Removing the row might make the problem feasible, so the sub problems
+    // are solved from scratch.
+    std::vector<idx> sub_rowsol(nr), sub_colsol(nc);
+    std::vector<cost> sub_v(nc);
+    for (idx i = row_start; i < row_stop; i++) {
+      removed_row_costs<cost, costs> sub_cost{assign_cost, i};
+      try {
+        lap_costs(nr - 1, nc, sub_cost, sub_rowsol.data(), sub_colsol.data(),
+                  sub_v.data());
+        totals[i] = assignment_cost<idx, cost>(nr - 1, sub_cost,
+                                               sub_rowsol.data());
+      }
+      catch (char const* e) {
+        totals[i] = INFINITY;
+      }
+    }
+  });
+}
+
+/// @brief Constrained lsap costs of a stack of batch nr x nc matrices.
+/// @param stack in row-major cost matrices, stored contiguously
+/// @param total_costs out results, in the same layout as stack
+/// @param n_threads in number of worker threads, each solving whole matrices
+template <typename idx, typename cost>
+void clap_costs_batch(int64_t batch, int nr, int nc, const cost *stack,
+                      cost *total_costs, int n_threads) {
+  int64_t size = int64_t(nr) * nc;
+  batch_for(batch, n_threads, [&](int64_t b) {
+    if (nr <= nc) {
+      clap_costs<idx, cost>(nr, nc, dense_costs<cost>{stack + b * size, nc},
+                            total_costs + b * size, nc, 1);
+    } else {
+      clap_costs<idx, cost>(nc, nr,
+                            transposed_costs<cost>{stack + b * size, nc},
+                            total_costs + b * size, 1, nc);
+    }
+  });
+}
@@ -1,8 +1,16 @@
+#pragma once
+
+#include <algorithm>
+#include <atomic>
 #include <cassert>
-#include <cstdio>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
+#include <exception>
 #include <limits>
 #include <memory>
-#include <iostream>
+#include <thread>
+#include <vector>
 
 #ifdef __GNUC__
 #define always_inline __attribute__((always_inline)) inline
@@ -15,30 +23,161 @@
 #define restrict
 #endif
 
+/// @brief Row-major dense cost matrix accessor, assign_cost(i, j).
+template <typename cost>
+struct dense_costs {
+  const cost *restrict assign_cost;
+  int nc;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return assign_cost[i * nc + j];
+  }
+};
+
+/// @brief Strided cost matrix accessor, e.g. for transposed numpy views.
+template <typename cost>
+struct strided_costs {
+  const cost *restrict assign_cost;
+  int64_t row_stride;
+  int64_t col_stride;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return assign_cost[i * row_stride + j * col_stride];
+  }
+};
+
+/// @brief Cost accessor for the sub matrix of the columns cols, with the costs
+/// of the removed rows treated as zero.
+template <typename idx, typename cost, typename costs>
+struct removed_row_sub_costs {
+  const costs &assign_cost;
+  const idx *cols;
+  const bool *removed;
+
+  always_inline cost operator()(int64_t i, int64_t k) const {
+    return removed[i] ? 0 : assign_cost(i, cols[k]);
+  }
+};
+
+/// @brief Cost accessor for a problem padded with rows of zero cost below the
+/// first nr rows.
+template <typename cost, typename costs>
+struct zero_padded_costs {
+  const costs &assign_cost;
+  int64_t nr;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return i < nr ? assign_cost(i, j) : 0;
+  }
+};
+
+/// @brief Cost accessor for the saving of assigning row i to column j over
+/// leaving both of them unassigned.
+template <typename cost, typename costs>
+struct unassigned_costs {
+  const costs &assign_cost;
+  const cost *restrict row_cost;
+  const cost *restrict col_cost;
+
+  always_inline cost operator()(int64_t i, int64_t j) const {
+    return assign_cost(i, j) - row_cost[i] - col_cost[j];
+  }
+};
+
+/// @brief Statistics of the solver, gathered only when asked for.
+struct lap_stats {
+  int64_t augmentations = 0;        // augmenting paths found.
+  int64_t dijkstra_iterations = 0;  // rows scanned by the shortest path searches.
+  int64_t columns_scanned = 0;      // reduced costs computed.
+  int64_t ties = 0;                 // extra columns found at the minimum distance.
+  std::vector<int64_t> path_lengths;  // number of augmenting paths by their
+                                      // number of rows.
+  double init_time = 0;     // seconds spent initializing the solution.
+  double augment_time = 0;  // seconds spent augmenting.
+
+  void add_path(int64_t length) {
+    if (static_cast<int64_t>(path_lengths.size()) <= length) {
+      path_lengths.resize(length + 1, 0);
+    }
+    path_lengths[length]++;
+  }
+};
+
+/// @brief Scratch arrays of augment_costs, each of size nc, to reuse them
+/// across augmentations instead of allocating them for every one.
 template <typename idx, typename cost>
-void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
-             idx *restrict rowsol, idx *restrict colsol, cost *restrict v,
-             bool verbose)
+struct augment_workspace {
+  cost *d;
+  idx *pred;
+  idx *collist;
+};
+
+/// @brief Seconds elapsed since t0.
+inline double seconds_since(std::chrono::steady_clock::time_point t0) {
+  return std::chrono::duration<double>(
+      std::chrono::steady_clock::now() - t0).count();
+}
+
+/// @brief Find the shortest augmenting path from freerow and augment along it.
+/// @param assign_cost in cost accessor, assign_cost(i, j) is the cost of
+///                    assigning row i to column j
+/// @param colmask in optional mask of the columns which may be used, columns
+///                with a false entry are skipped entirely / size nc
+/// @param stats in/out optional statistics, which are added to
+/// @param workspace in optional scratch arrays, allocated for this
+///                  augmentation otherwise
+template <typename idx, typename cost, typename costs>
+void augment_costs(idx freerow, int nr, int nc, const costs &assign_cost,
+                   const bool *colmask, idx *restrict rowsol,
+                   idx *restrict colsol, cost *restrict v, lap_stats *stats,
+                   const augment_workspace<idx, cost> *workspace = nullptr)
 {
-  idx endofpath;
-  if (verbose) {
-    printf("lapjv: AUGMENT SOLUTION row [%lld / %d]\n", freerow, nr);
+  std::chrono::steady_clock::time_point t0;
+  if (stats) {
+    t0 = std::chrono::steady_clock::now();
   }
+  // Counted regardless of stats, since local counters are next to free.
+  int64_t iterations = 0, scanned = 0, ties = 0, path_length = 0;
 
-  auto d = std::unique_ptr<cost[]>(new cost[nc]);  // 'cost-distance' in augmenting path calculation.
-  auto pred = std::unique_ptr<idx[]>(new idx[nc]);   // row-predecessor of column in augmenting/alternating path.
-  auto collist = std::unique_ptr<idx[]>(new idx[nc]);  // list of columns to be scanned in various ways.
+  idx endofpath;
+  std::unique_ptr<cost[]> d_owner;
+  std::unique_ptr<idx[]> pred_owner, collist_owner;
+  if (!workspace) {
+    d_owner.reset(new cost[nc]);
+    pred_owner.reset(new idx[nc]);
+    collist_owner.reset(new idx[nc]);
+  }
+  cost *restrict d = workspace? workspace->d : d_owner.get();  // 'cost-distance' in augmenting path calculation.
+  idx *restrict pred = workspace? workspace->pred : pred_owner.get();  // row-predecessor of column in augmenting/alternating path.
+  idx *restrict collist = workspace? workspace->collist : collist_owner.get();  // list of columns to be scanned in various ways.
 
   // Dijkstra shortest path algorithm.
   // runs until unassigned column added to shortest path tree.
-  #if _OPENMP >= 201307
-  #pragma omp simd
-  #endif
-  for (idx j = 0; j < nc; j++) {
-    d[j] = assign_cost[freerow * nc + j] - v[j];
-    pred[j] = freerow;
-    collist[j] = nc - j - 1;  // init column list.
+  // Only the first dim entries of collist take part, masked columns are left out.
+  idx dim = nc;
+  if (colmask == nullptr) {
+    #if _OPENMP >= 201307
+    #pragma omp simd
+    #endif
+    for (idx j = 0; j < nc; j++) {
+      d[j] = assign_cost(freerow, j) - v[j];
+      pred[j] = freerow;
+      collist[j] = nc - j - 1;  // init column list.
+    }
+  } else {
+    dim = 0;
+    for (idx j = nc - 1; j >= 0; j--) {
+      if (colmask[j]) {
+        d[j] = assign_cost(freerow, j) - v[j];
+        pred[j] = freerow;
+        collist[dim++] = j;  // init column list, in the same order as above.
+      }
+    }
+    if (dim == 0) {
+      throw "cost matrix is infeasible";
+    }
   }
+  scanned += dim;
 
   idx low = 0; // columns in 0..low-1 are ready, now none.
   idx up = 0;  // columns in low..up-1 are to be scanned for current minimum, now none.
@@ -51,10 +190,13 @@ void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
   do {
     if (up == low) {        // no more columns to be scanned for current minimum.
       last = low - 1;
+      if (up == dim) {  // every admissible column is assigned.
+        throw "cost matrix is infeasible";
+      }
       // scan columns for up..dim-1 to find all indices for which new minimum occurs.
       // store these indices between low..up-1 (increasing up).
       min = d[collist[up++]];
-      for (idx k = up; k < nc; k++) {
+      for (idx k = up; k < dim; k++) {
         idx j = collist[k];
         cost h = d[j];
         if (h <= min) {
@@ -67,6 +209,7 @@ void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
           collist[up++] = j;
         }
       }
+      ties += up - low - 1;
 
       // check if any of the minimum columns happens to be unassigned.
       // if so, we have an augmenting path right away.
@@ -85,21 +228,24 @@ void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
 
     if (!unassigned_found) {
       // update 'distances' between freerow and all unscanned columns, via next scanned column.
+      iterations++;
       idx j1 = collist[low];
       low++;
       idx i = colsol[j1];
-      const cost *local_cost = &assign_cost[i * nc];
-      cost h = local_cost[j1] - v[j1] - min;
-      for (idx k = up; k < nc; k++) {
+      cost h = assign_cost(i, j1) - v[j1] - min;
+      idx k0 = up, k = up;
+      for (; k < dim; k++) {
         idx j = collist[k];
-        cost v2 = local_cost[j] - v[j] - h;
+        cost v2 = assign_cost(i, j) - v[j] - h;
         if (v2 < d[j]) {
           pred[j] = i;
           if (v2 == min) {  // new column found at same minimum value
+            ties++;
             if (colsol[j] < 0) {
               // if unassigned, shortest augmenting path is complete.
               endofpath = j;
               unassigned_found = true;
+              k++;
               break;
             } else {  // else add to list to be scanned right away.
               collist[k] = collist[up];
@@ -109,6 +255,7 @@ void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
           d[j] = v2;
         }
       }
+      scanned += k - k0;
     }
   } while (!unassigned_found);
 
@@ -130,52 +277,234 @@ void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
       idx j1 = endofpath;
       endofpath = rowsol[i];
       rowsol[i] = j1;
+      path_length++;
     } while (i != freerow);
   }
 
-  // End of the current augment step
-  if (verbose) {
-    std::cout << "v:  ";
-    for (idx i = 0; i < nc; i++){
-      std::cout << v[i] << " ";
+  if (stats) {
+    stats->augmentations++;
+    stats->dijkstra_iterations += iterations;
+    stats->columns_scanned += scanned;
+    stats->ties += ties;
+    stats->add_path(path_length);
+    stats->augment_time += seconds_since(t0);
+  }
+}
+
+template <typename idx, typename cost>
+void augment(idx freerow, int nr, int nc, const cost *restrict assign_cost,
+             idx *restrict rowsol, idx *restrict colsol, cost *restrict v,
+             lap_stats *stats = nullptr)
+{
+  augment_costs(freerow, nr, nc, dense_costs<cost>{assign_cost, nc}, nullptr,
+                rowsol, colsol, v, stats);
+}
+
+/// @brief Re-augment an assignment after the removal of some of its rows.
+/// @param removed in mask of the rows to remove, their costs are treated as
+///                zero / size nr
+/// @param rowsol in/out column assigned to each row, every row must be assigned
+/// @param colsol in/out row assigned to each column
+/// @param v in/out dual variables of the columns
+///
+/// Only the nr x nr sub matrix of the assigned columns takes part, with the
+/// freed columns as its only unassigned columns. The removed rows are still
+/// assigned to columns afterwards. Only O(nr) scratch space is used.
+template <typename idx, typename cost, typename costs>
+void augment_removed_rows(const bool *removed, int nr,
+                          const costs &assign_cost, idx *restrict rowsol,
+                          idx *restrict colsol, cost *restrict v,
+                          lap_stats *stats = nullptr)
+{
+  // In the sub matrix, row i is assigned to column i.
+  auto cols = std::unique_ptr<idx[]>(new idx[nr]);
+  auto sub_rowsol = std::unique_ptr<idx[]>(new idx[nr]);
+  auto sub_colsol = std::unique_ptr<idx[]>(new idx[nr]);
+  auto sub_v = std::unique_ptr<cost[]>(new cost[nr]);
+  for (idx k = 0; k < nr; k++) {
+    cols[k] = rowsol[k];
+    sub_rowsol[k] = removed[k] ? -1 : k;
+    sub_colsol[k] = removed[k] ? -1 : k;
+    sub_v[k] = v[cols[k]];
+  }
+
+  removed_row_sub_costs<idx, cost, costs> sub_cost{
+      assign_cost, cols.get(), removed};
+  for (idx k = 0; k < nr; k++) {
+    if (removed[k]) {
+      augment_costs(k, nr, nr, sub_cost, nullptr, sub_rowsol.get(),
+                    sub_colsol.get(), sub_v.get(), stats);
     }
-    std::cout << std::endl;
   }
 
-  if (verbose) {
-    std::cout << "rowsol: ";
-    for (idx i = 0; i < nr; i++){
-      std::cout << rowsol[i] << " ";
+  // Map the sub solution back to the original columns.
+  for (idx k = 0; k < nr; k++) {
+    colsol[cols[k]] = sub_colsol[k];
+    v[cols[k]] = sub_v[k];
+    rowsol[k] = cols[sub_rowsol[k]];
+  }
+}
+
+/// @brief Re-augment an assignment after the addition of some columns.
+/// @param added in mask of the added columns, which must be unassigned / size nc
+/// @param rowsol in/out column assigned to each row, every row must be assigned
+/// @param colsol in/out row assigned to each column
+/// @param v in/out dual variables of the columns, at most zero and zero for the
+///          unassigned columns, as left by lap. Those of the added columns
+///          are ignored on input.
+///
+/// The added columns are given the largest duals, at most zero, which keep
+/// the assignment dual feasible. The assignment is then optimal unless one of
+/// them is negative. The problem is padded to a square one by rows of zero
+/// cost, which take the unassigned columns with zero duals. The remaining
+/// padding rows are augmented, and the columns they end up with are unassigned
+/// in the result. Only O(nc) scratch space is used.
+template <typename idx, typename cost, typename costs>
+void augment_added_cols(const bool *added, int nr, int nc,
+                        const costs &assign_cost, idx *restrict rowsol,
+                        idx *restrict colsol, cost *restrict v,
+                        lap_stats *stats = nullptr)
+{
+  auto u = std::unique_ptr<cost[]>(new cost[nr]);
+  for (idx i = 0; i < nr; i++) {
+    u[i] = assign_cost(i, rowsol[i]) - v[rowsol[i]];
+  }
+  for (idx j = 0; j < nc; j++) {
+    if (added[j]) {
+      v[j] = 0;
+      for (idx i = 0; i < nr; i++) {
+        v[j] = std::min<cost>(v[j], assign_cost(i, j) - u[i]);
+      }
     }
-    std::cout << std::endl;
   }
 
-  if (verbose) {
-    std::cout << "colsol: ";
-    for (idx i = 0; i < nc; i++){
-      std::cout << colsol[i] << " ";
+  auto pad_rowsol = std::unique_ptr<idx[]>(new idx[nc]);
+  auto pad_colsol = std::unique_ptr<idx[]>(new idx[nc]);
+  auto freerows = std::unique_ptr<idx[]>(new idx[nc]);
+  for (idx i = 0; i < nr; i++) {
+    pad_rowsol[i] = rowsol[i];
+  }
+  idx pad = nr, n_free = 0;
+  for (idx j = 0; j < nc; j++) {
+    pad_colsol[j] = colsol[j];
+    if (colsol[j] < 0) {
+      if (v[j] < 0) {
+        freerows[n_free++] = pad;
+        pad_rowsol[pad++] = -1;
+      } else {
+        pad_colsol[j] = pad;
+        pad_rowsol[pad++] = j;
+      }
     }
-    std::cout << std::endl;
   }
 
-  if (verbose) {
-    std::cout << "End of this augmentation step." << std::endl;
+  zero_padded_costs<cost, costs> pad_cost{assign_cost, nr};
+  for (idx k = 0; k < n_free; k++) {
+    augment_costs(freerows[k], nc, nc, pad_cost, nullptr, pad_rowsol.get(),
+                  pad_colsol.get(), v, stats);
+  }
+
+  // The padding rows hold the columns with the largest dual. Shift the duals
+  // so that these are zero again.
+  if (n_free > 0) {
+    cost vmax = *std::max_element(v, v + nc);
+    for (idx j = 0; j < nc; j++) {
+      v[j] -= vmax;
+    }
+  }
+  for (idx i = 0; i < nr; i++) {
+    rowsol[i] = pad_rowsol[i];
+  }
+  for (idx j = 0; j < nc; j++) {
+    colsol[j] = pad_colsol[j] < nr ? pad_colsol[j] : -1;
+  }
+}
+
+/// @brief Re-augment an assignment after a change of the costs.
+/// @param rowsol in/out column assigned to each row, every row must be assigned
+/// @param colsol in/out row assigned to each column
+/// @param v in/out dual variables of the columns, at most zero and zero for the
+///          unassigned columns, as left by lap for the old costs
+///
+/// The rows which the duals no longer price out, i.e. which have a negative
+/// reduced cost under the new costs, give up their columns. As in
+/// augment_added_cols, the problem is padded to a square one by rows of zero
+/// cost, which take the unassigned columns. The freed rows are then augmented
+/// one at a time, and the other rows keep their columns unless an augmenting
+/// path moves them. Only O(nc) scratch space is used.
+template <typename idx, typename cost, typename costs>
+void augment_changed(int nr, int nc, const costs &assign_cost,
+                     idx *restrict rowsol, idx *restrict colsol,
+                     cost *restrict v, lap_stats *stats = nullptr)
+{
+  auto pad_rowsol = std::unique_ptr<idx[]>(new idx[nc]);
+  auto pad_colsol = std::unique_ptr<idx[]>(new idx[nc]);
+  auto freerows = std::unique_ptr<idx[]>(new idx[nr]);
+  idx n_free = 0;
+  for (idx j = 0; j < nc; j++) {
+    pad_colsol[j] = colsol[j];
+  }
+  for (idx i = 0; i < nr; i++) {
+    pad_rowsol[i] = rowsol[i];
+    cost u = assign_cost(i, rowsol[i]) - v[rowsol[i]];
+    for (idx j = 0; j < nc; j++) {
+      if (assign_cost(i, j) - u - v[j] < 0) {
+        pad_colsol[rowsol[i]] = -1;
+        pad_rowsol[i] = -1;
+        freerows[n_free++] = i;
+        break;
+      }
+    }
+  }
+  // The padding rows price out every column, since the duals are at most
+  // zero and zero for the columns they take.
+  idx pad = nr;
+  for (idx j = 0; j < nc; j++) {
+    if (colsol[j] < 0) {
+      pad_colsol[j] = pad;
+      pad_rowsol[pad++] = j;
+    }
+  }
+
+  zero_padded_costs<cost, costs> pad_cost{assign_cost, nr};
+  for (idx k = 0; k < n_free; k++) {
+    augment_costs(freerows[k], nc, nc, pad_cost, nullptr, pad_rowsol.get(),
+                  pad_colsol.get(), v, stats);
+  }
+
+  // The padding rows hold the columns with the largest dual, up to rounding.
+  // Shift the duals so that these are zero again.
+  if (n_free > 0 && nr < nc) {
+    cost vmax = *std::max_element(v, v + nc);
+    for (idx j = 0; j < nc; j++) {
+      v[j] = pad_colsol[j] < nr ? std::min<cost>(v[j] - vmax, 0) : 0;
+    }
+  }
+  for (idx i = 0; i < nr; i++) {
+    rowsol[i] = pad_rowsol[i];
+  }
+  for (idx j = 0; j < nc; j++) {
+    colsol[j] = pad_colsol[j] < nr ? pad_colsol[j] : -1;
   }
 }
 
 /// @brief Jonker-Volgenant algorithm.
-/// @param dim in problem size
-/// @param assign_cost in cost matrix
-/// @param verbose in indicates whether to report the progress to stdout
-/// @param rowsol out column assigned to row in solution / size dim
-/// @param colsol out row assigned to column in solution / size dim
-/// @param u out dual variables, row reduction numbers / size dim
-/// @param v out dual variables, column reduction numbers / size dim
-/// @return achieved minimum assignment cost
-template <typename idx, typename cost>
-void lap(int nr, int nc, const cost *restrict assign_cost,
-         idx *restrict rowsol, idx *restrict colsol, cost *restrict v,
-         bool verbose) {
+/// @param nr in number of rows, at most nc
+/// @param nc in number of columns
+/// @param assign_cost in cost accessor
+/// @param rowsol out column assigned to row in solution / size nr
+/// @param colsol out row assigned to column in solution / size nc
+/// @param v out dual variables, column reduction numbers / size nc
+/// @param stats in/out optional statistics, which are added to
+template <typename idx, typename cost, typename costs>
+void lap_costs(int nr, int nc, const costs &assign_cost,
+               idx *restrict rowsol, idx *restrict colsol, cost *restrict v,
+               lap_stats *stats = nullptr) {
+  std::chrono::steady_clock::time_point t0;
+  if (stats) {
+    t0 = std::chrono::steady_clock::now();
+  }
+
   // Initialization
   #if _OPENMP >= 201307
   #pragma omp simd
@@ -192,67 +521,648 @@ void lap(int nr, int nc, const cost *restrict assign_cost,
     v[i] = 0;
   }
 
-  if (verbose) {
-    std::cout << "v:  ";
-    for (idx i = 0; i < nc; i++){
-      std::cout << v[i] << " ";
+  if (stats) {
+    stats->init_time += seconds_since(t0);
+  }
+
+  // AUGMENT SOLUTION for each free row, sharing one workspace.
+  auto d = std::unique_ptr<cost[]>(new cost[nc]);
+  auto pred = std::unique_ptr<idx[]>(new idx[nc]);
+  auto collist = std::unique_ptr<idx[]>(new idx[nc]);
+  augment_workspace<idx, cost> workspace{d.get(), pred.get(), collist.get()};
+  for (idx freerow = 0; freerow < nr; freerow++) {
+    augment_costs(freerow, nr, nc, assign_cost, nullptr,
+                  rowsol, colsol, v, stats, &workspace);
+  }
+}
+
+template <typename idx, typename cost>
+void lap(int nr, int nc, const cost *restrict assign_cost,
+         idx *restrict rowsol, idx *restrict colsol, cost *restrict v,
+         lap_stats *stats = nullptr) {
+  lap_costs(nr, nc, dense_costs<cost>{assign_cost, nc}, rowsol, colsol, v,
+            stats);
+}
+
+/// @brief Mark the columns which are among the k cheapest of some row.
+/// @param candidate out whether each column is among the k cheapest of some
+///                  row / size nc
+/// @param max_candidates in give up once more columns than this are marked,
+///                       or never if negative
+/// @return whether all of the rows were gone through
+///
+/// With k = nr, some optimal assignment only uses candidate columns: a row
+/// assigned to any other column could take one of its k cheapest columns
+/// instead, at least one of which is left by the other nr - 1 rows.
+template <typename idx, typename cost, typename costs>
+bool candidate_cols(int nr, int nc, const costs &assign_cost, int k,
+                    bool *candidate, int max_candidates = -1) {
+  std::fill(candidate, candidate + nc, false);
+  k = std::min(k, nc);
+  if (k <= 0) {
+    return true;
+  }
+  // The k'th cheapest cost of each row is found by keeping the k cheapest
+  // costs seen so far in a max-heap, which most costs are rejected by with a
+  // single comparison. The columns cheaper than it are marked, and then as
+  // many of those tied with it as are needed to make up k.
+  std::vector<cost> heap;
+  heap.reserve(k);
+  int n_candidates = 0;
+  for (idx i = 0; i < nr; i++) {
+    heap.clear();
+    for (idx j = 0; j < k; j++) {
+      heap.push_back(assign_cost(i, j));
+    }
+    std::make_heap(heap.begin(), heap.end());
+    cost kth = heap.front();
+    for (idx j = k; j < nc; j++) {
+      cost c = assign_cost(i, j);
+      if (c < kth) {
+        std::pop_heap(heap.begin(), heap.end());
+        heap.back() = c;
+        std::push_heap(heap.begin(), heap.end());
+        kth = heap.front();
+      }
+    }
+    int n_marked = 0;
+    for (idx j = 0; j < nc; j++) {
+      if (assign_cost(i, j) < kth) {
+        n_candidates += !candidate[j];
+        candidate[j] = true;
+        n_marked++;
+      }
+    }
+    for (idx j = 0; j < nc && n_marked < k; j++) {
+      if (assign_cost(i, j) == kth) {
+        n_candidates += !candidate[j];
+        candidate[j] = true;
+        n_marked++;
+      }
+    }
+    if (max_candidates >= 0 && n_candidates > max_candidates) {
+      return false;
     }
-    std::cout << std::endl;
   }
+  return true;
+}
+
+/// The largest number of columns solved by lap_small.
+constexpr int lap_small_max = 8;
 
-  if (verbose) {
-    std::cout << "rowsol: ";
-    for (idx i = 0; i < nr; i++){
-      std::cout << rowsol[i] << " ";
+/// @brief Find the cheapest assignment of rows i..nr-1 to the columns which
+/// are not used yet, by exhaustive enumeration. Ties keep the first found.
+template <typename idx, typename cost, typename costs>
+void enumerate_assignments(int i, int nr, int nc, const costs &assign_cost,
+                           unsigned used, cost partial, idx *current,
+                           idx *best, cost &best_cost) {
+  if (i == nr) {
+    if (partial < best_cost) {
+      best_cost = partial;
+      std::copy(current, current + nr, best);
+    }
+    return;
+  }
+  for (int j = 0; j < nc; j++) {
+    if (!(used & (1u << j))) {
+      current[i] = j;
+      enumerate_assignments(i + 1, nr, nc, assign_cost, used | (1u << j),
+                            partial + assign_cost(i, j), current, best,
+                            best_cost);
     }
-    std::cout << std::endl;
   }
+}
 
-  if (verbose) {
-    std::cout << "colsol: ";
-    for (idx i = 0; i < nc; i++){
-      std::cout << colsol[i] << " ";
+/// @brief Solve a problem of at most lap_small_max columns, and no more rows
+/// than columns, without allocating anything on the heap. Problems of at most
+/// 4 columns, with at most 24 assignments, are enumerated exhaustively.
+/// @param rowsol out column assigned to row in solution / size nr
+/// @param colsol out row assigned to column in solution / size nc
+template <typename idx, typename cost, typename costs>
+void lap_small(int nr, int nc, const costs &assign_cost,
+               idx *restrict rowsol, idx *restrict colsol) {
+  assert(nr <= nc && nc <= lap_small_max);
+  if (nc <= 4) {
+    idx current[4];
+    cost best_cost = std::numeric_limits<cost>::infinity();
+    enumerate_assignments(0, nr, nc, assign_cost, 0u, cost(0), current,
+                          rowsol, best_cost);
+    if (nr > 0 && !(best_cost < std::numeric_limits<cost>::infinity())) {
+      throw "cost matrix is infeasible";
     }
-    std::cout << std::endl;
+    std::fill(colsol, colsol + nc, -1);
+    for (idx i = 0; i < nr; i++) {
+      colsol[rowsol[i]] = i;
+    }
+    return;
   }
 
-  // AUGMENT SOLUTION for each free row.
+  cost v[lap_small_max], d[lap_small_max];
+  idx pred[lap_small_max], collist[lap_small_max];
+  augment_workspace<idx, cost> workspace{d, pred, collist};
+  std::fill(rowsol, rowsol + nr, -1);
+  std::fill(colsol, colsol + nc, -1);
+  std::fill(v, v + nc, cost(0));
   for (idx freerow = 0; freerow < nr; freerow++) {
+    augment_costs(freerow, nr, nc, assign_cost, nullptr, rowsol, colsol, v,
+                  nullptr, &workspace);
+  }
+}
 
-    try {
-      augment(freerow, nr, nc, assign_cost, rowsol, colsol, v, verbose);
+/// @brief Bottleneck assignment, which minimizes the largest cost assigned.
+/// @param nr in number of rows, at most nc
+/// @param nc in number of columns
+/// @param rowsol out column assigned to row in solution / size nr
+/// @param colsol out row assigned to column in solution / size nc
+/// @return the largest cost assigned
+///
+/// The rows are assigned one at a time, each along the augmenting path whose
+/// largest cost is the least, as in Derigs and Zimmermann. This is Dijkstra's
+/// algorithm with the largest cost along a path in place of its length, in
+/// which costs up to the largest one assigned so far are free. The matching
+/// grows as the threshold rises, so no entries are sorted, and most rows are
+/// matched within the threshold at the cost of a single scan of their costs.
+template <typename idx, typename cost, typename costs>
+cost lap_bottleneck(int nr, int nc, const costs &assign_cost,
+                    idx *restrict rowsol, idx *restrict colsol) {
+  std::fill(colsol, colsol + nc, -1);
+  // Every row takes one of its columns, and if the matrix is square, every
+  // column one of its rows, so their cheapest costs bound the threshold.
+  cost threshold = -INFINITY;
+  std::vector<cost> col_min(nc, INFINITY);
+  for (idx i = 0; i < nr; i++) {
+    cost row_min = INFINITY;
+    for (idx j = 0; j < nc; j++) {
+      cost c = assign_cost(i, j);
+      row_min = std::min(row_min, c);
+      col_min[j] = std::min(col_min[j], c);
+    }
+    threshold = std::max(threshold, row_min);
+  }
+  if (nr == nc) {
+    for (idx j = 0; j < nc; j++) {
+      threshold = std::max(threshold, col_min[j]);
+    }
+  }
+  if (threshold == INFINITY) {
+    throw "cost matrix is infeasible";
+  }
+
+  std::vector<cost> d(nc);
+  std::vector<idx> pred(nc), collist(nc);
+  for (idx freerow = 0; freerow < nr; freerow++) {
+    for (idx j = 0; j < nc; j++) {
+      d[j] = std::max(threshold, assign_cost(freerow, j));
+      pred[j] = freerow;
+      collist[j] = j;
+    }
+    // Columns in 0..low-1 are scanned, those in low..up-1 are at the current
+    // minimum and to be scanned, and those in up..nc-1 are left.
+    idx low = 0, up = 0, endofpath = -1;
+    cost min = 0;
+    while (endofpath < 0) {
+      if (up == low) {
+        if (up == nc) {
+          throw "cost matrix is infeasible";
+        }
+        min = d[collist[up++]];
+        for (idx k = up; k < nc; k++) {
+          idx j = collist[k];
+          if (d[j] <= min) {
+            if (d[j] < min) {
+              up = low;
+              min = d[j];
+            }
+            collist[k] = collist[up];
+            collist[up++] = j;
+          }
+        }
+        if (min == INFINITY) {
+          throw "cost matrix is infeasible";
+        }
+        for (idx k = low; k < up; k++) {
+          if (colsol[collist[k]] < 0) {
+            endofpath = collist[k];
+            break;
+          }
+        }
+        continue;
+      }
+
+      // Extend the paths through the row of the next column at the minimum.
+      idx i = colsol[collist[low++]];
+      for (idx k = up; k < nc; k++) {
+        idx j = collist[k];
+        cost h = std::max(min, assign_cost(i, j));
+        if (h < d[j]) {
+          d[j] = h;
+          pred[j] = i;
+          if (h == min) {
+            if (colsol[j] < 0) {
+              endofpath = j;
+              break;
+            }
+            collist[k] = collist[up];
+            collist[up++] = j;
+          }
+        }
+      }
     }
-    catch (char const* e){
-      throw;
+
+    threshold = std::max(threshold, d[endofpath]);
+    idx i;
+    do {
+      i = pred[endofpath];
+      colsol[endofpath] = i;
+      std::swap(endofpath, rowsol[i]);
+    } while (i != freerow);
+  }
+  return threshold;
+}
+
+/// @brief k-cardinality assignment, the cheapest assignment of exactly k pairs.
+/// @param nr in number of rows
+/// @param nc in number of columns
+/// @param k in number of pairs to assign, at most min(nr, nc)
+/// @param rowsol out column assigned to row in solution, -1 for the rows left
+///               unassigned / size nr
+/// @param colsol out row assigned to column in solution, -1 for the columns
+///               left unassigned / size nc
+/// @param stats in/out optional statistics, which are added to
+/// @param profitable_only in stop before k pairs once another pair would not
+///                        lower the total cost, or is infeasible
+///
+/// Successive shortest paths from all of the unassigned rows at once, each of
+/// which extends the cheapest assignment of some number of pairs to the
+/// cheapest one of a pair more, so that it stops after k augmentations. The
+/// unassigned rows share a dual, as do the unassigned columns, and the
+/// cheapest cost of each column among the unassigned rows is kept up to date
+/// rather than scanned for every path, so that each path only scans the rows
+/// already assigned. The paths only grow longer, so the first one which
+/// does not lower the total cost is where profitable_only stops.
+template <typename idx, typename cost, typename costs>
+void lap_cardinality(int nr, int nc, const costs &assign_cost, int k,
+                     idx *restrict rowsol, idx *restrict colsol,
+                     lap_stats *stats = nullptr, bool profitable_only = false) {
+  std::chrono::steady_clock::time_point t0;
+  if (stats) {
+    t0 = std::chrono::steady_clock::now();
+  }
+  std::fill(rowsol, rowsol + nr, -1);
+  std::fill(colsol, colsol + nc, -1);
+  if (k == 0) {
+    return;
+  }
+
+  // The cheapest cost of each column among the unassigned rows, and its row.
+  std::vector<cost> best(nc, INFINITY);
+  std::vector<idx> bestrow(nc, 0);
+  for (idx i = 0; i < nr; i++) {
+    for (idx j = 0; j < nc; j++) {
+      cost c = assign_cost(i, j);
+      if (c < best[j]) {
+        best[j] = c;
+        bestrow[j] = i;
+      }
+    }
+  }
+  // Every reduced cost is non-negative with the column duals all at the
+  // cheapest cost, and the dual of the unassigned rows at zero.
+  cost cheapest = *std::min_element(best.begin(), best.end());
+  if (cheapest == INFINITY) {
+    if (profitable_only) {
+      return;
+    }
+    throw "cost matrix is infeasible";
+  }
+  std::vector<cost> v(nc, cheapest), d(nc);
+  std::vector<idx> pred(nc), collist(nc);
+  cost free_u = 0;
+  if (stats) {
+    stats->init_time += seconds_since(t0);
+  }
+
+  for (int n_assigned = 0; n_assigned < k; n_assigned++) {
+    if (stats) {
+      t0 = std::chrono::steady_clock::now();
+    }
+    int64_t iterations = 0, scanned = nc, ties = 0, path_length = 0;
+    for (idx j = 0; j < nc; j++) {
+      d[j] = best[j] - v[j] - free_u;
+      pred[j] = bestrow[j];
+      collist[j] = j;
     }
 
-    if (verbose) {
-      std::cout << "v:  ";
-      for (idx i = 0; i < nc; i++){
-        std::cout << v[i] << " ";
+    // Dijkstra's algorithm over the columns, as in augment_costs, until an
+    // unassigned column is reached.
+    idx low = 0, up = 0, last = 0, endofpath = -1;
+    cost min = 0;
+    while (endofpath < 0) {
+      if (up == low) {
+        last = low - 1;
+        if (up == nc) {
+          if (profitable_only) {
+            return;
+          }
+          throw "cost matrix is infeasible";
+        }
+        min = d[collist[up++]];
+        for (idx q = up; q < nc; q++) {
+          idx j = collist[q];
+          if (d[j] <= min) {
+            if (d[j] < min) {
+              up = low;
+              min = d[j];
+            }
+            collist[q] = collist[up];
+            collist[up++] = j;
+          }
+        }
+        ties += up - low - 1;
+        if (min == INFINITY) {
+          if (profitable_only) {
+            return;
+          }
+          throw "cost matrix is infeasible";
+        }
+        for (idx q = low; q < up; q++) {
+          if (colsol[collist[q]] < 0) {
+            endofpath = collist[q];
+            break;
+          }
+        }
+        continue;
+      }
+
+      iterations++;
+      idx j1 = collist[low++];
+      idx i = colsol[j1];
+      cost h = assign_cost(i, j1) - v[j1] - min;
+      scanned += nc - up;
+      for (idx q = up; q < nc; q++) {
+        idx j = collist[q];
+        cost v2 = assign_cost(i, j) - v[j] - h;
+        if (v2 < d[j]) {
+          pred[j] = i;
+          d[j] = v2;
+          if (v2 == min) {
+            ties++;
+            if (colsol[j] < 0) {
+              endofpath = j;
+              break;
+            }
+            collist[q] = collist[up];
+            collist[up++] = j;
+          }
+        }
       }
-      std::cout << std::endl;
     }
 
-    if (verbose) {
-      std::cout << "rowsol: ";
-      for (idx i = 0; i < nr; i++){
-        std::cout << rowsol[i] << " ";
+    // The cost of the path is its reduced cost plus the duals of its ends, the
+    // unassigned row and column.
+    if (profitable_only && min + free_u + v[endofpath] >= 0) {
+      return;
+    }
+
+    // Update the duals of the scanned columns, and of the unassigned rows,
+    // which all lie at distance zero.
+    for (idx q = 0; q <= last; q++) {
+      idx j = collist[q];
+      v[j] += d[j] - min;
+    }
+    free_u += min;
+
+    // Augment, back to the unassigned row the path starts from.
+    idx i;
+    do {
+      i = pred[endofpath];
+      colsol[endofpath] = i;
+      std::swap(endofpath, rowsol[i]);
+      path_length++;
+    } while (endofpath >= 0);
+
+    // Row i is assigned now, so the columns it was the cheapest row of
+    // need another among the rows left.
+    for (idx j = 0; j < nc; j++) {
+      if (bestrow[j] != i) {
+        continue;
+      }
+      best[j] = INFINITY;
+      for (idx r = 0; r < nr; r++) {
+        if (rowsol[r] < 0) {
+          cost c = assign_cost(r, j);
+          if (c < best[j]) {
+            best[j] = c;
+            bestrow[j] = r;
+          }
+        }
       }
-      std::cout << std::endl;
     }
 
-    if (verbose) {
-      std::cout << "colsol: ";
-      for (idx i = 0; i < nc; i++){
-        std::cout << colsol[i] << " ";
+    if (stats) {
+      stats->augmentations++;
+      stats->dijkstra_iterations += iterations;
+      stats->columns_scanned += scanned;
+      stats->ties += ties;
+      stats->add_path(path_length);
+      stats->augment_time += seconds_since(t0);
+    }
+  }
+}
+
+/// @brief Find the shortest augmenting path from freerow in a capacitated
+/// problem, and send as many units along it as it can carry.
+/// @param flow in/out number of units of row i assigned to column j, stored at
+///             flow[i * nc + j] / size nr x nc
+/// @param row_left in/out units of each row still to be assigned / size nr
+/// @param col_left in/out spare capacity of each column / size nc
+/// @param v in/out dual variables of the columns, at most zero and zero for
+///          the columns with spare capacity
+///
+/// The counterpart of augment_costs for columns holding several units, from
+/// several rows. A column with spare capacity ends the path, and a full
+/// column leads on to every row with units in it.
+template <typename idx, typename cost, typename costs>
+void augment_capacitated(idx freerow, int nr, int nc, const costs &assign_cost,
+                         int64_t *restrict flow, int64_t *restrict row_left,
+                         int64_t *restrict col_left, cost *restrict v)
+{
+  idx endofpath = -1;
+  auto d = std::unique_ptr<cost[]>(new cost[nc]);
+  auto pred = std::unique_ptr<idx[]>(new idx[nc]);     // row-predecessor of column.
+  auto predcol = std::unique_ptr<idx[]>(new idx[nr]);  // column-predecessor of row.
+  auto collist = std::unique_ptr<idx[]>(new idx[nc]);
+  auto rowdone = std::unique_ptr<bool[]>(new bool[nr]());
+
+  for (idx j = 0; j < nc; j++) {
+    d[j] = assign_cost(freerow, j) - v[j];
+    pred[j] = freerow;
+    collist[j] = nc - j - 1;
+  }
+  rowdone[freerow] = true;
+
+  idx low = 0, up = 0, last = 0;
+  cost min = 0;
+  do {
+    if (up == low) {
+      last = low - 1;
+      if (up == nc) {
+        throw "cost matrix is infeasible";
+      }
+      min = d[collist[up++]];
+      for (idx k = up; k < nc; k++) {
+        idx j = collist[k];
+        cost h = d[j];
+        if (h <= min) {
+          if (h < min) {
+            up = low;
+            min = h;
+          }
+          collist[k] = collist[up];
+          collist[up++] = j;
+        }
+      }
+      for (idx k = low; k < up; k++) {
+        if (col_left[collist[k]] > 0) {
+          endofpath = collist[k];
+          break;
+        }
+      }
+    }
+
+    if (min == INFINITY) {
+      throw "cost matrix is infeasible";
+    }
+
+    if (endofpath < 0) {
+      // The full column j1 leads on to every row with units in it, all of
+      // which are at the same distance since their units in j1 are tight.
+      idx j1 = collist[low];
+      low++;
+      for (idx i = 0; i < nr && endofpath < 0; i++) {
+        if (rowdone[i] || flow[i * nc + j1] == 0) {
+          continue;
+        }
+        rowdone[i] = true;
+        predcol[i] = j1;
+        cost h = assign_cost(i, j1) - v[j1] - min;
+        for (idx k = up; k < nc; k++) {
+          idx j = collist[k];
+          cost v2 = assign_cost(i, j) - v[j] - h;
+          if (v2 < d[j]) {
+            pred[j] = i;
+            d[j] = v2;
+            if (v2 == min) {
+              if (col_left[j] > 0) {
+                endofpath = j;
+                break;
+              }
+              collist[k] = collist[up];
+              collist[up++] = j;
+            }
+          }
+        }
       }
-      std::cout << std::endl;
+    }
+  } while (endofpath < 0);
+
+  for (idx k = 0; k <= last; k++) {
+    idx j1 = collist[k];
+    v[j1] = v[j1] + d[j1] - min;
+  }
+
+  // Send as many units as the path can carry, which is bounded by the units
+  // of freerow still to be assigned, the spare capacity of its last column and
+  // the units moved out of each column along the way.
+  int64_t units = std::min(row_left[freerow], col_left[endofpath]);
+  for (idx j = endofpath, i = pred[j]; i != freerow; j = predcol[i], i = pred[j]) {
+    units = std::min(units, flow[i * nc + predcol[i]]);
+  }
+  for (idx j = endofpath, i = pred[j];; j = predcol[i], i = pred[j]) {
+    flow[i * nc + j] += units;
+    if (i == freerow) {
+      break;
+    }
+    flow[i * nc + predcol[i]] -= units;
+  }
+  row_left[freerow] -= units;
+  col_left[endofpath] -= units;
+}
+
+/// @brief Capacitated linear assignment, in which row i is assigned
+/// row_capacity[i] units and column j takes at most col_capacity[j] units.
+/// The total row capacity must not exceed the total column capacity.
+/// @param flow out number of units of row i assigned to column j, stored at
+///             flow[i * nc + j] / size nr x nc
+/// @param v out dual variables of the columns / size nc
+template <typename idx, typename cost, typename costs>
+void lap_capacitated(int nr, int nc, const costs &assign_cost,
+                     const int64_t *row_capacity, const int64_t *col_capacity,
+                     int64_t *restrict flow, cost *restrict v) {
+  std::vector<int64_t> row_left(row_capacity, row_capacity + nr);
+  std::vector<int64_t> col_left(col_capacity, col_capacity + nc);
+  std::fill(flow, flow + int64_t(nr) * nc, 0);
+  std::fill(v, v + nc, 0);
+
+  for (idx freerow = 0; freerow < nr; freerow++) {
+    while (row_left[freerow] > 0) {
+      augment_capacitated(freerow, nr, nc, assign_cost, flow, row_left.data(),
+                          col_left.data(), v);
     }
   }
+}
 
-  if (verbose) {
-    printf("lapjv: AUGMENT SOLUTION finished\n");
+/// @brief Call solve(b) for every b in [0, batch), spread over n_threads
+/// threads. The first exception thrown stops the batch and is rethrown.
+template <typename F>
+void batch_for(int64_t batch, int n_threads, F solve) {
+  std::atomic<int64_t> next(0);
+  std::exception_ptr error = nullptr;
+  std::atomic<bool> failed(false);
+
+  auto worker = [&]() {
+    try {
+      for (int64_t b = next++; b < batch && !failed; b = next++) {
+        solve(b);
+      }
+    }
+    catch (...) {
+      if (!failed.exchange(true)) {
+        error = std::current_exception();
+      }
+    }
+  };
+
+  std::vector<std::thread> threads;
+  for (int t = 1; t < n_threads; t++) {
+    threads.emplace_back(worker);
+  }
+  worker();
+  for (auto &thread : threads) {
+    thread.join();
   }
+  if (error) {
+    std::rethrow_exception(error);
+  }
+}
 
+/// @brief Solve the lsap of each of a stack of batch nr x nc matrices, nr <= nc.
+/// @param stack in row-major cost matrices, stored contiguously
+/// @param rowsol out column assigned to each row of each matrix, batch x nr
+/// @param feasible out whether each matrix has a finite cost assignment
+/// @param n_threads in number of worker threads, each solving whole matrices
+template <typename idx, typename cost>
+void lap_batch(int64_t batch, int nr, int nc, const cost *stack,
+               idx *rowsol, bool *feasible, int n_threads) {
+  batch_for(batch, n_threads, [&](int64_t b) {
+    auto colsol = std::unique_ptr<idx[]>(new idx[nc]);
+    auto v = std::unique_ptr<cost[]>(new cost[nc]);
+    try {
+      lap(nr, nc, stack + b * nr * nc, rowsol + b * nr, colsol.get(), v.get());
+      feasible[b] = true;
+    }
+    catch (char const* e) {
+      feasible[b] = false;
+    }
+  });
 }
@@ -22,10 +22,12 @@
 
 #include <functional>
 #include <memory>
+#include <numeric>
 #include <Python.h>
 #define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
 #include <numpy/arrayobject.h>
 #include "lap.h"
+#include "clap.h"
 #include <iostream>
 #include <cstdint>
 
@@ -33,17 +35,115 @@ static char module_docstring[] =
     "This module wraps LAPJV - Jonker-Volgenant linear sum assignment algorithm.";
 static char lapjv_docstring[] =
     "Solves the linear sum assignment problem.";
+static char lapjv_small_docstring[] =
+    "Solves the linear sum assignment problem of a cost matrix with at most 8 "
+    "rows and columns, returning the row_ind, col_ind of lap.solve.";
 static char augment_docstring[] =
     "Perform augmentation for the selected row.";
+static char augment_removed_rows_docstring[] =
+    "Perform augmentation after the removal of the selected rows.";
+static char augment_masked_docstring[] =
+    "Perform augmentation for the selected rows, using only the masked columns.";
+static char augment_added_cols_docstring[] =
+    "Perform augmentation after the addition of the selected columns.";
+static char augment_changed_docstring[] =
+    "Perform augmentation for the rows no longer priced out after a change of "
+    "the costs.";
+static char bottleneck_docstring[] =
+    "Solve the bottleneck assignment problem, which minimizes the largest cost "
+    "assigned.";
+static char cardinality_docstring[] =
+    "Solve the k-cardinality assignment problem, the cheapest assignment of "
+    "exactly k pairs.";
+static char unassigned_docstring[] =
+    "Solve the linear assignment problem in which rows and columns may be left "
+    "unassigned, at a cost of row_cost[i] or col_cost[j].";
+static char candidate_cols_docstring[] =
+    "Mask of the columns which are among the k cheapest of some row, or None "
+    "once more than max_candidates columns are.";
+static char capacitated_docstring[] =
+    "Solves the capacitated linear sum assignment problem.";
+static char lapjv_batch_docstring[] =
+    "Solves the linear sum assignment problems of a stack of cost matrices.";
+static char costs_rows_docstring[] =
+    "Constrained linear sum assignment costs of a range of rows, given the "
+    "solution of the full problem.";
+static char costs_entries_docstring[] =
+    "Constrained linear sum assignment costs of the entries of a cost matrix "
+    "listed in compressed sparse row form.";
+static char costs_batch_docstring[] =
+    "Constrained linear sum assignment costs of a stack of cost matrices.";
+static char leave_one_out_docstring[] =
+    "Total linear sum assignment cost with each row of a cost matrix removed.";
 
 static PyObject *py_lapjv(PyObject *self, PyObject *args, PyObject *kwargs);
+static PyObject *py_lapjv_small(PyObject *self, PyObject *args,
+                                PyObject *kwargs);
 static PyObject *py_augment(PyObject *self, PyObject *args, PyObject *kwargs);
+static PyObject *py_augment_removed_rows(PyObject *self, PyObject *args,
+                                         PyObject *kwargs);
+static PyObject *py_augment_masked(PyObject *self, PyObject *args,
+                                   PyObject *kwargs);
+static PyObject *py_augment_added_cols(PyObject *self, PyObject *args,
+                                       PyObject *kwargs);
+static PyObject *py_augment_changed(PyObject *self, PyObject *args,
+                                    PyObject *kwargs);
+static PyObject *py_bottleneck(PyObject *self, PyObject *args,
+                               PyObject *kwargs);
+static PyObject *py_cardinality(PyObject *self, PyObject *args,
+                                PyObject *kwargs);
+static PyObject *py_unassigned(PyObject *self, PyObject *args,
+                               PyObject *kwargs);
+static PyObject *py_candidate_cols(PyObject *self, PyObject *args,
+                                   PyObject *kwargs);
+static PyObject *py_capacitated(PyObject *self, PyObject *args,
+                                PyObject *kwargs);
+static PyObject *py_lapjv_batch(PyObject *self, PyObject *args,
+                                PyObject *kwargs);
+static PyObject *py_costs_rows(PyObject *self, PyObject *args,
+                               PyObject *kwargs);
+static PyObject *py_costs_entries(PyObject *self, PyObject *args,
+                                  PyObject *kwargs);
+static PyObject *py_costs_batch(PyObject *self, PyObject *args, PyObject *kwargs);
+static PyObject *py_leave_one_out(PyObject *self, PyObject *args,
+                                  PyObject *kwargs);
 
 static PyMethodDef module_functions[] = {
   {"lapjv", reinterpret_cast<PyCFunction>(py_lapjv),
    METH_VARARGS | METH_KEYWORDS, lapjv_docstring},
+  {"lapjv_small", reinterpret_cast<PyCFunction>(py_lapjv_small),
+   METH_VARARGS | METH_KEYWORDS, lapjv_small_docstring},
   {"augment", reinterpret_cast<PyCFunction>(py_augment),
    METH_VARARGS | METH_KEYWORDS, augment_docstring},
+  {"augment_removed_rows",
+   reinterpret_cast<PyCFunction>(py_augment_removed_rows),
+   METH_VARARGS | METH_KEYWORDS, augment_removed_rows_docstring},
+  {"augment_masked", reinterpret_cast<PyCFunction>(py_augment_masked),
+   METH_VARARGS | METH_KEYWORDS, augment_masked_docstring},
+  {"augment_added_cols", reinterpret_cast<PyCFunction>(py_augment_added_cols),
+   METH_VARARGS | METH_KEYWORDS, augment_added_cols_docstring},
+  {"augment_changed", reinterpret_cast<PyCFunction>(py_augment_changed),
+   METH_VARARGS | METH_KEYWORDS, augment_changed_docstring},
+  {"bottleneck", reinterpret_cast<PyCFunction>(py_bottleneck),
+   METH_VARARGS | METH_KEYWORDS, bottleneck_docstring},
+  {"cardinality", reinterpret_cast<PyCFunction>(py_cardinality),
+   METH_VARARGS | METH_KEYWORDS, cardinality_docstring},
+  {"unassigned", reinterpret_cast<PyCFunction>(py_unassigned),
+   METH_VARARGS | METH_KEYWORDS, unassigned_docstring},
+  {"candidate_cols", reinterpret_cast<PyCFunction>(py_candidate_cols),
+   METH_VARARGS | METH_KEYWORDS, candidate_cols_docstring},
+  {"capacitated", reinterpret_cast<PyCFunction>(py_capacitated),
+   METH_VARARGS | METH_KEYWORDS, capacitated_docstring},
+  {"lapjv_batch", reinterpret_cast<PyCFunction>(py_lapjv_batch),
+   METH_VARARGS | METH_KEYWORDS, lapjv_batch_docstring},
+  {"costs_rows", reinterpret_cast<PyCFunction>(py_costs_rows),
+   METH_VARARGS | METH_KEYWORDS, costs_rows_docstring},
+  {"costs_entries", reinterpret_cast<PyCFunction>(py_costs_entries),
+   METH_VARARGS | METH_KEYWORDS, costs_entries_docstring},
+  {"costs_batch", reinterpret_cast<PyCFunction>(py_costs_batch),
+   METH_VARARGS | METH_KEYWORDS, costs_batch_docstring},
+  {"leave_one_out", reinterpret_cast<PyCFunction>(py_leave_one_out),
+   METH_VARARGS | METH_KEYWORDS, leave_one_out_docstring},
   {NULL, NULL, 0, NULL}
 };
 
@@ -92,15 +192,149 @@ class _pyobj : public pyobj_parent<O> {
 using pyobj = _pyobj<PyObject>;
 using pyarray = _pyobj<PyArrayObject>;
 
+// Whether obj is a numpy array of float32 dtype, which is solved in single
+// precision rather than being cast to float64.
+static bool is_float32(PyObject *obj) {
+  return PyArray_Check(obj) &&
+         PyArray_TYPE(reinterpret_cast<PyArrayObject*>(obj)) == NPY_FLOAT32;
+}
+
+// Get obj as a numpy array which is modified in place, so it is never copied.
+static PyArrayObject *inplace_array(PyObject *obj, int type, const char *name) {
+  auto array = reinterpret_cast<PyArrayObject*>(obj);
+  if (!PyArray_Check(obj) ||
+      !PyArray_EquivTypenums(PyArray_TYPE(array), type) ||
+      !PyArray_IS_C_CONTIGUOUS(array) || !PyArray_ISWRITEABLE(array)) {
+    PyErr_Format(PyExc_ValueError,
+                 "\"%s\" must be a writeable contiguous numpy array of %s dtype",
+                 name, type == NPY_INT64? "int64" :
+                       type == NPY_FLOAT32? "float32" : "float64");
+    return NULL;
+  }
+  Py_INCREF(obj);
+  return array;
+}
+
+// Get a 2D cost matrix without copying it when it is already of the right
+// dtype, whatever its strides. The strides are returned in elements.
+static PyArrayObject *strided_cost_matrix(
+    PyObject *obj, bool float32, int64_t *row_stride, int64_t *col_stride) {
+  pyarray array(PyArray_FROM_OTF(
+      obj, float32? NPY_FLOAT32 : NPY_FLOAT64,
+      NPY_ARRAY_ALIGNED | NPY_ARRAY_FORCECAST));
+  if (!array) {
+    PyErr_SetString(PyExc_ValueError, "\"cost_matrix\" must be a numpy array "
+                                      "of float32 or float64 dtype");
+    return NULL;
+  }
+  if (PyArray_NDIM(array.get()) != 2) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\" must be a 2D numpy array");
+    return NULL;
+  }
+  auto itemsize = PyArray_ITEMSIZE(array.get());
+  auto strides = PyArray_STRIDES(array.get());
+  if (strides[0] % itemsize || strides[1] % itemsize) {
+    array.reset(PyArray_FROM_OTF(
+        obj, float32? NPY_FLOAT32 : NPY_FLOAT64,
+        NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+    if (!array) {
+      return NULL;
+    }
+    strides = PyArray_STRIDES(array.get());
+  }
+  *row_stride = strides[0] / itemsize;
+  *col_stride = strides[1] / itemsize;
+  return array.release();
+}
+
+// Get obj, an index or a sequence of indices into an axis of length n, as a
+// mask of that axis.
+static std::unique_ptr<bool[]> index_mask(PyObject *obj, int64_t n,
+                                          const char *name) {
+  pyarray array(PyArray_FROMANY(obj, NPY_INT64, 0, 1, NPY_ARRAY_IN_ARRAY));
+  if (!array) {
+    return nullptr;
+  }
+  auto indices = reinterpret_cast<int64_t*>(PyArray_DATA(array.get()));
+  auto mask = std::unique_ptr<bool[]>(new bool[n]());
+  for (npy_intp k = 0; k < PyArray_SIZE(array.get()); k++) {
+    if (indices[k] < 0 || indices[k] >= n) {
+      PyErr_Format(PyExc_IndexError, "\"%s\" is out of bounds", name);
+      return nullptr;
+    }
+    mask[indices[k]] = true;
+  }
+  return mask;
+}
+
+// Whether every row of the assignment col4row is assigned to one of nc columns.
+static bool all_assigned(const int64_t *col4row, int nr, int nc) {
+  for (int i = 0; i < nr; i++) {
+    if (col4row[i] < 0 || col4row[i] >= nc) {
+      PyErr_SetString(PyExc_ValueError,
+                      "every row of \"col4row\" must be assigned");
+      return false;
+    }
+  }
+  return true;
+}
+
+// Get the statistics of the solver as a dict.
+static PyObject *stats_dict(const lap_stats &stats) {
+  npy_intp dims[] = {static_cast<npy_intp>(stats.path_lengths.size())};
+  pyarray path_lengths_array(PyArray_SimpleNew(1, dims, NPY_INT64));
+  if (!path_lengths_array) {
+    return NULL;
+  }
+  std::copy(stats.path_lengths.begin(), stats.path_lengths.end(),
+            reinterpret_cast<int64_t*>(PyArray_DATA(path_lengths_array.get())));
+  return Py_BuildValue(
+      "{s:L,s:L,s:L,s:L,s:O,s:d,s:d}",
+      "augmentations", static_cast<long long>(stats.augmentations),
+      "dijkstra_iterations", static_cast<long long>(stats.dijkstra_iterations),
+      "columns_scanned", static_cast<long long>(stats.columns_scanned),
+      "ties", static_cast<long long>(stats.ties),
+      "path_lengths", path_lengths_array.get(),
+      "init_time", stats.init_time,
+      "augment_time", stats.augment_time);
+}
+
+// Print a summary of the statistics of the solver, for verbose mode.
+static void print_stats(const lap_stats &stats) {
+  printf("lapjv: %lld augmentations, %lld dijkstra iterations, "
+         "%lld columns scanned, %lld ties, %.6fs init, %.6fs augment\n",
+         static_cast<long long>(stats.augmentations),
+         static_cast<long long>(stats.dijkstra_iterations),
+         static_cast<long long>(stats.columns_scanned),
+         static_cast<long long>(stats.ties), stats.init_time,
+         stats.augment_time);
+}
+
+// Build the result of a solver, the three arrays of the solution followed by
+// the statistics of the solver when they were asked for.
+static PyObject *solution(PyArrayObject *first, PyArrayObject *second,
+                          PyArrayObject *v, const lap_stats *stats) {
+  if (!stats) {
+    return Py_BuildValue("(OOO)", first, second, v);
+  }
+  pyobj stats_obj(stats_dict(*stats));
+  if (!stats_obj) {
+    return NULL;
+  }
+  return Py_BuildValue("(OOOO)", first, second, v, stats_obj.get());
+}
+
 static PyObject *py_lapjv(PyObject *self, PyObject *args, PyObject *kwargs) {
   PyObject *cost_matrix_obj;
   int verbose = 0;
   int force_doubles = 0;
+  int return_stats = 0;
   static const char *kwlist[] = {
-      "cost_matrix", "verbose", "force_doubles", NULL};
+      "cost_matrix", "verbose", "force_doubles", "return_stats", NULL};
   if (!PyArg_ParseTupleAndKeywords(
-      args, kwargs, "O|pb", const_cast<char**>(kwlist),
-      &cost_matrix_obj, &verbose, &force_doubles)) {
+      args, kwargs, "O|pbp", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &verbose, &force_doubles, &return_stats)) {
     return NULL;
   }
 
@@ -122,14 +356,15 @@ static PyObject *py_lapjv(PyObject *self, PyObject *args, PyObject *kwargs) {
   //   }
   // }
 
-  // Note: we only use float64 and int64 as the default datatypes for now
-  // TODO: allow more datatypes
-  bool float32 = false;
+  // Note: float32 arrays are solved in single precision, everything else is
+  // cast to float64. Indices are always int64.
+  bool float32 = is_float32(cost_matrix_obj) && !force_doubles;
   cost_matrix_array.reset(PyArray_FROM_OTF(
-      cost_matrix_obj, NPY_FLOAT64, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+      cost_matrix_obj, float32? NPY_FLOAT32 : NPY_FLOAT64,
+      NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
   if (!cost_matrix_array) {
       PyErr_SetString(PyExc_ValueError, "\"cost_matrix\" must be a numpy array "
-                                        "of float64 dtype");
+                                        "of float32 or float64 dtype");
       return NULL;
   }
 
@@ -167,24 +402,33 @@ static PyObject *py_lapjv(PyObject *self, PyObject *args, PyObject *kwargs) {
   pyarray v_array(PyArray_SimpleNew(
       1, col_dims, float32? NPY_FLOAT32 : NPY_FLOAT64));
 
-  // auto u = reinterpret_cast<double*>(PyArray_DATA(u_array.get()));
-  auto v = reinterpret_cast<double*>(PyArray_DATA(v_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  lap_stats stats;
+  auto stats_ptr = verbose || return_stats? &stats : nullptr;
   bool feasible = true;
   Py_BEGIN_ALLOW_THREADS
   try {
-    lap(nr, nc,
-        reinterpret_cast<double*>(cost_matrix),
-        row_ind, col_ind, v, verbose);
+    if (float32) {
+      lap(nr, nc,
+          reinterpret_cast<float*>(cost_matrix),
+          row_ind, col_ind, reinterpret_cast<float*>(v), stats_ptr);
+    } else {
+      lap(nr, nc,
+          reinterpret_cast<double*>(cost_matrix),
+          row_ind, col_ind, reinterpret_cast<double*>(v), stats_ptr);
+    }
   }
   catch (char const* e){
     feasible = false;
   }
   Py_END_ALLOW_THREADS
 
+  if (verbose) {
+    print_stats(stats);
+  }
   if (feasible){
-    return Py_BuildValue("(OOO)",
-                         row_ind_array.get(), col_ind_array.get(),
-                         v_array.get());
+    return solution(row_ind_array.get(), col_ind_array.get(), v_array.get(),
+                    return_stats? &stats : nullptr);
   } else{
     PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
     return NULL;
@@ -192,6 +436,97 @@ static PyObject *py_lapjv(PyObject *self, PyObject *args, PyObject *kwargs) {
 
 }
 
+// Everything lap.solve does for a small problem in a single call: validating
+// and negating the costs, transposing tall matrices and sorting the solution.
+static PyObject *py_lapjv_small(PyObject *self, PyObject *args,
+                                PyObject *kwargs) {
+  PyObject *cost_matrix_obj;
+  int maximize = 0;
+  static const char *kwlist[] = {"cost_matrix", "maximize", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "O|p", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &maximize)) {
+    return NULL;
+  }
+
+  pyarray cost_matrix_array(PyArray_FROM_OTF(
+      cost_matrix_obj, NPY_FLOAT64, NPY_ARRAY_ALIGNED | NPY_ARRAY_FORCECAST));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  if (PyArray_NDIM(cost_matrix_array.get()) != 2) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\" must be a 2D numpy array");
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  if (dims[0] > lap_small_max || dims[1] > lap_small_max) {
+    PyErr_Format(PyExc_ValueError,
+                 "\"cost_matrix\" must have at most %d rows and columns",
+                 lap_small_max);
+    return NULL;
+  }
+
+  // Copy the costs onto the stack, transposed if there are more rows than
+  // columns, so that the solver sees no more rows than columns.
+  bool transpose = dims[0] > dims[1];
+  int nr = transpose? dims[1] : dims[0];
+  int nc = transpose? dims[0] : dims[1];
+  auto data = reinterpret_cast<const char*>(PyArray_DATA(cost_matrix_array.get()));
+  auto strides = PyArray_STRIDES(cost_matrix_array.get());
+  npy_intp row_stride = transpose? strides[1] : strides[0];
+  npy_intp col_stride = transpose? strides[0] : strides[1];
+  double costs[lap_small_max * lap_small_max];
+  for (int i = 0; i < nr; i++) {
+    for (int j = 0; j < nc; j++) {
+      double c = *reinterpret_cast<const double*>(
+          data + i * row_stride + j * col_stride);
+      c = maximize? -c : c;
+      if (std::isnan(c) || c == -std::numeric_limits<double>::infinity()) {
+        PyErr_SetString(PyExc_ValueError,
+                        "matrix contains invalid numeric entries");
+        return NULL;
+      }
+      costs[i * nc + j] = c;
+    }
+  }
+
+  int64_t rowsol[lap_small_max], colsol[lap_small_max];
+  try {
+    lap_small<int64_t, double>(nr, nc, dense_costs<double>{costs, nc}, rowsol,
+                               colsol);
+  }
+  catch (char const* e) {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+
+  npy_intp ind_dims[] = {nr};
+  pyarray row_ind_array(PyArray_SimpleNew(1, ind_dims, NPY_INT64));
+  pyarray col_ind_array(PyArray_SimpleNew(1, ind_dims, NPY_INT64));
+  if (!row_ind_array || !col_ind_array) {
+    return NULL;
+  }
+  auto row_ind = reinterpret_cast<int64_t*>(PyArray_DATA(row_ind_array.get()));
+  auto col_ind = reinterpret_cast<int64_t*>(PyArray_DATA(col_ind_array.get()));
+  if (transpose) {
+    // The columns of the transpose are the rows, so walking them in order
+    // sorts the assignment by row.
+    int k = 0;
+    for (int j = 0; j < nc; j++) {
+      if (colsol[j] >= 0) {
+        row_ind[k] = j;
+        col_ind[k++] = colsol[j];
+      }
+    }
+  } else {
+    for (int i = 0; i < nr; i++) {
+      row_ind[i] = i;
+      col_ind[i] = rowsol[i];
+    }
+  }
+  return Py_BuildValue("(OO)", row_ind_array.get(), col_ind_array.get());
+}
 
 // TODO: Add an augment function that interacts with outside python objects
 static PyObject *py_augment(PyObject *self, PyObject *args, PyObject *kwargs) {
@@ -200,29 +535,23 @@ static PyObject *py_augment(PyObject *self, PyObject *args, PyObject *kwargs) {
   int64_t freerow = 0;
   int verbose = 0;
   int force_doubles = 0;
+  int return_stats = 0;
   static const char *kwlist[] = {
       "cost_matrix", "freerow", "col4row", "row4col", "v",
-      "verbose", "force_doubles", NULL};
+      "verbose", "force_doubles", "return_stats", NULL};
   if (!PyArg_ParseTupleAndKeywords(
-      args, kwargs, "OLOOO|pb", const_cast<char**>(kwlist),
+      args, kwargs, "OLOOO|pbp", const_cast<char**>(kwlist),
       &cost_matrix_obj, &freerow, &col4row_obj, &row4col_obj, &v_obj,
-      &verbose, &force_doubles)) {
+      &verbose, &force_doubles, &return_stats)) {
     return NULL;
   }
   pyarray cost_matrix_array;
-  // bool float32 = true;
-  cost_matrix_array.reset(PyArray_FROM_OTF(cost_matrix_obj, NPY_FLOAT64, NPY_ARRAY_IN_ARRAY));
-  // cost_matrix_array.reset(PyArray_FROM_OTF(
-  //     cost_matrix_obj, NPY_FLOAT32,
-  //     NPY_ARRAY_IN_ARRAY | (force_doubles? 0 : NPY_ARRAY_FORCECAST)));
-  // if (!cost_matrix_array) {
-  //   PyErr_Clear();
-  //   float32 = false;
-  //   cost_matrix_array.reset(PyArray_FROM_OTF(
-  //       cost_matrix_obj, NPY_FLOAT64, NPY_ARRAY_IN_ARRAY));
+  bool float32 = is_float32(cost_matrix_obj) && !force_doubles;
+  cost_matrix_array.reset(PyArray_FROM_OTF(
+      cost_matrix_obj, float32? NPY_FLOAT32 : NPY_FLOAT64, NPY_ARRAY_IN_ARRAY));
   if (!cost_matrix_array) {
     PyErr_SetString(PyExc_ValueError, "\"cost_matrix\" must be a numpy array "
-                                      "of float64 dtype");
+                                      "of float32 or float64 dtype");
     return NULL;
   }
 
@@ -260,8 +589,9 @@ static PyObject *py_augment(PyObject *self, PyObject *args, PyObject *kwargs) {
   // }
 
   // TODO: Verify that v is never copied but rather modified inplace.
+  // Note: v must share the precision of the cost matrix.
   pyarray v_array;
-  v_array.reset(PyArray_FROM_OT(v_obj, NPY_FLOAT64));
+  v_array.reset(PyArray_FROM_OT(v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64));
   if (!v_array) {
     // PyErr_SetString(PyExc_ValueError, "\"v\" must be a numpy array "
     //                                   "of float32 or float64 dtype");
@@ -287,26 +617,1257 @@ static PyObject *py_augment(PyObject *self, PyObject *args, PyObject *kwargs) {
   // auto u = PyArray_DATA(u_array.get());
   auto v = PyArray_DATA(v_array.get());
 
+  lap_stats stats;
+  auto stats_ptr = verbose || return_stats? &stats : nullptr;
   bool feasible = true;
   Py_BEGIN_ALLOW_THREADS
   try{
-    augment(freerow, nr, nc,
-            reinterpret_cast<double*>(cost_matrix),
-            col4row,
-            row4col,
-            reinterpret_cast<double*>(v),
-            verbose);
+    if (float32) {
+      augment(freerow, nr, nc,
+              reinterpret_cast<float*>(cost_matrix),
+              col4row,
+              row4col,
+              reinterpret_cast<float*>(v),
+              stats_ptr);
+    } else {
+      augment(freerow, nr, nc,
+              reinterpret_cast<double*>(cost_matrix),
+              col4row,
+              row4col,
+              reinterpret_cast<double*>(v),
+              stats_ptr);
+    }
   } catch (char const* e){
     feasible = false;
   }
   Py_END_ALLOW_THREADS
 
+  if (verbose) {
+    print_stats(stats);
+  }
   if (feasible){
-    return Py_BuildValue("(OOO)",
-                         col4row_array.get(), row4col_array.get(), v_array.get());
+    return solution(col4row_array.get(), row4col_array.get(), v_array.get(),
+                    return_stats? &stats : nullptr);
   } else{
     PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
     return NULL;
   }
 
 }
+
+
+static PyObject *py_augment_removed_rows(PyObject *self, PyObject *args,
+                                         PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *rows_removed_obj;
+  PyObject *col4row_obj, *row4col_obj, *v_obj;
+  int return_stats = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "rows_removed", "col4row", "row4col", "v", "return_stats",
+      NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOOOO|p", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &rows_removed_obj, &col4row_obj, &row4col_obj, &v_obj,
+      &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray col4row_array(reinterpret_cast<PyObject*>(
+      inplace_array(col4row_obj, NPY_INT64, "col4row")));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray row4col_array(reinterpret_cast<PyObject*>(
+      inplace_array(row4col_obj, NPY_INT64, "row4col")));
+  if (!row4col_array) {
+    return NULL;
+  }
+  pyarray v_array(reinterpret_cast<PyObject*>(
+      inplace_array(v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64, "v")));
+  if (!v_array) {
+    return NULL;
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc || PyArray_SIZE(col4row_array.get()) != nr ||
+      PyArray_SIZE(row4col_array.get()) != nc ||
+      PyArray_SIZE(v_array.get()) != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\"'s shape is invalid or does not match the "
+                    "assignment");
+    return NULL;
+  }
+  auto removed = index_mask(rows_removed_obj, nr, "rows_removed");
+  if (!removed) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  if (!all_assigned(col4row, nr, nc)) {
+    return NULL;
+  }
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  bool feasible = true;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      augment_removed_rows(
+          removed.get(), nr,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<float*>(v), stats_ptr);
+    } else {
+      augment_removed_rows(
+          removed.get(), nr,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<double*>(v), stats_ptr);
+    }
+  } catch (char const* e) {
+    feasible = false;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (feasible) {
+    return solution(col4row_array.get(), row4col_array.get(), v_array.get(),
+                    stats_ptr);
+  } else {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+}
+
+static PyObject *py_augment_masked(PyObject *self, PyObject *args,
+                                   PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *freerows_obj;
+  PyObject *col4row_obj, *row4col_obj, *v_obj, *col_mask_obj = Py_None;
+  int return_stats = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "freerows", "col4row", "row4col", "v", "col_mask",
+      "return_stats", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOOOO|Op", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &freerows_obj, &col4row_obj, &row4col_obj, &v_obj,
+      &col_mask_obj, &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray col4row_array(reinterpret_cast<PyObject*>(
+      inplace_array(col4row_obj, NPY_INT64, "col4row")));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray row4col_array(reinterpret_cast<PyObject*>(
+      inplace_array(row4col_obj, NPY_INT64, "row4col")));
+  if (!row4col_array) {
+    return NULL;
+  }
+  pyarray v_array(reinterpret_cast<PyObject*>(
+      inplace_array(v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64, "v")));
+  if (!v_array) {
+    return NULL;
+  }
+  pyarray col_mask_array;
+  if (col_mask_obj != Py_None) {
+    col_mask_array.reset(PyArray_FROM_OTF(
+        col_mask_obj, NPY_BOOL, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+    if (!col_mask_array) {
+      return NULL;
+    }
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (PyArray_SIZE(col4row_array.get()) != nr ||
+      PyArray_SIZE(row4col_array.get()) != nc ||
+      PyArray_SIZE(v_array.get()) != nc ||
+      (col_mask_array && PyArray_SIZE(col_mask_array.get()) != nc)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\"'s shape does not match the assignment "
+                    "or the column mask");
+    return NULL;
+  }
+  auto free = index_mask(freerows_obj, nr, "freerows");
+  if (!free) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  auto col_mask = col_mask_array?
+      reinterpret_cast<bool*>(PyArray_DATA(col_mask_array.get())) : nullptr;
+  for (int i = 0; i < nr; i++) {
+    if (free[i] && col4row[i] >= 0) {
+      PyErr_SetString(PyExc_ValueError,
+                      "\"freerows\" must be unassigned in \"col4row\"");
+      return NULL;
+    }
+  }
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  bool feasible = true;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    for (int64_t freerow = 0; freerow < nr; freerow++) {
+      if (!free[freerow]) {
+        continue;
+      }
+      if (float32) {
+        augment_costs(
+            freerow, nr, nc,
+            strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                                 row_stride, col_stride},
+            col_mask, col4row, row4col, reinterpret_cast<float*>(v), stats_ptr);
+      } else {
+        augment_costs(
+            freerow, nr, nc,
+            strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                  row_stride, col_stride},
+            col_mask, col4row, row4col, reinterpret_cast<double*>(v), stats_ptr);
+      }
+    }
+  } catch (char const* e) {
+    feasible = false;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (feasible) {
+    return solution(col4row_array.get(), row4col_array.get(), v_array.get(),
+                    stats_ptr);
+  } else {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+}
+
+static PyObject *py_augment_added_cols(PyObject *self, PyObject *args,
+                                       PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *cols_added_obj;
+  PyObject *col4row_obj, *row4col_obj, *v_obj;
+  int return_stats = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "cols_added", "col4row", "row4col", "v", "return_stats",
+      NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOOOO|p", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &cols_added_obj, &col4row_obj, &row4col_obj, &v_obj,
+      &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray col4row_array(reinterpret_cast<PyObject*>(
+      inplace_array(col4row_obj, NPY_INT64, "col4row")));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray row4col_array(reinterpret_cast<PyObject*>(
+      inplace_array(row4col_obj, NPY_INT64, "row4col")));
+  if (!row4col_array) {
+    return NULL;
+  }
+  pyarray v_array(reinterpret_cast<PyObject*>(
+      inplace_array(v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64, "v")));
+  if (!v_array) {
+    return NULL;
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc || PyArray_SIZE(col4row_array.get()) != nr ||
+      PyArray_SIZE(row4col_array.get()) != nc ||
+      PyArray_SIZE(v_array.get()) != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\"'s shape is invalid or does not match the "
+                    "assignment");
+    return NULL;
+  }
+  auto added = index_mask(cols_added_obj, nc, "cols_added");
+  if (!added) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  if (!all_assigned(col4row, nr, nc)) {
+    return NULL;
+  }
+  for (int j = 0; j < nc; j++) {
+    if (added[j] && row4col[j] >= 0) {
+      PyErr_SetString(PyExc_ValueError,
+                      "\"cols_added\" must be unassigned in \"row4col\"");
+      return NULL;
+    }
+  }
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  Py_BEGIN_ALLOW_THREADS
+  if (float32) {
+    augment_added_cols(
+        added.get(), nr, nc,
+        strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                             row_stride, col_stride},
+        col4row, row4col, reinterpret_cast<float*>(v), stats_ptr);
+  } else {
+    augment_added_cols(
+        added.get(), nr, nc,
+        strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                              row_stride, col_stride},
+        col4row, row4col, reinterpret_cast<double*>(v), stats_ptr);
+  }
+  Py_END_ALLOW_THREADS
+
+  return solution(col4row_array.get(), row4col_array.get(), v_array.get(),
+                  stats_ptr);
+}
+
+static PyObject *py_costs_rows(PyObject *self, PyObject *args,
+                               PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *col4row_obj, *row4col_obj, *v_obj, *out_obj;
+  int64_t row_start = 0, row_stop = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "col4row", "row4col", "v", "row_start", "row_stop", "out",
+      NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOOOLLO", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &col4row_obj, &row4col_obj, &v_obj,
+      &row_start, &row_stop, &out_obj)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray col4row_array(PyArray_FROM_OTF(
+      col4row_obj, NPY_INT64, NPY_ARRAY_IN_ARRAY));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray row4col_array(PyArray_FROM_OTF(
+      row4col_obj, NPY_INT64, NPY_ARRAY_IN_ARRAY));
+  if (!row4col_array) {
+    return NULL;
+  }
+  pyarray v_array(PyArray_FROM_OTF(
+      v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64,
+      NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+  if (!v_array) {
+    return NULL;
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc || PyArray_SIZE(col4row_array.get()) != nr ||
+      PyArray_SIZE(row4col_array.get()) != nc ||
+      PyArray_SIZE(v_array.get()) != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\"'s shape is invalid or does not match the "
+                    "assignment");
+    return NULL;
+  }
+  if (row_start < 0 || row_stop > nr || row_start > row_stop) {
+    PyErr_SetString(PyExc_IndexError,
+                    "\"row_start\" and \"row_stop\" are out of bounds");
+    return NULL;
+  }
+
+  // The result is written in place, whatever the strides of out.
+  auto out_array = reinterpret_cast<PyArrayObject*>(out_obj);
+  if (!PyArray_Check(out_obj) ||
+      !PyArray_EquivTypenums(PyArray_TYPE(out_array),
+                             float32? NPY_FLOAT32 : NPY_FLOAT64) ||
+      !PyArray_ISWRITEABLE(out_array) || !PyArray_ISALIGNED(out_array) ||
+      PyArray_NDIM(out_array) != 2 ||
+      PyArray_DIMS(out_array)[0] != row_stop - row_start ||
+      PyArray_DIMS(out_array)[1] != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"out\" must be a writeable numpy array of the dtype of "
+                    "\"cost_matrix\", with a row for each row in the range");
+    return NULL;
+  }
+  auto itemsize = PyArray_ITEMSIZE(out_array);
+  auto out_strides = PyArray_STRIDES(out_array);
+  if (out_strides[0] % itemsize || out_strides[1] % itemsize) {
+    PyErr_SetString(PyExc_ValueError,
+                    "the strides of \"out\" must be multiples of its itemsize");
+    return NULL;
+  }
+
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  auto out = PyArray_DATA(out_array);
+  if (!all_assigned(col4row, nr, nc)) {
+    return NULL;
+  }
+
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      clap_costs_rows(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<float*>(v), row_start, row_stop,
+          reinterpret_cast<float*>(out), out_strides[0] / itemsize,
+          out_strides[1] / itemsize);
+    } else {
+      clap_costs_rows(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<double*>(v), row_start, row_stop,
+          reinterpret_cast<double*>(out), out_strides[0] / itemsize,
+          out_strides[1] / itemsize);
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  Py_RETURN_NONE;
+}
+
+static PyObject *py_costs_entries(PyObject *self, PyObject *args,
+                                  PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *indptr_obj, *indices_obj;
+  static const char *kwlist[] = {"cost_matrix", "indptr", "indices", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOO", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &indptr_obj, &indices_obj)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray indptr_array(PyArray_FROMANY(
+      indptr_obj, NPY_INT64, 1, 1, NPY_ARRAY_IN_ARRAY));
+  if (!indptr_array) {
+    return NULL;
+  }
+  pyarray indices_array(PyArray_FROMANY(
+      indices_obj, NPY_INT64, 1, 1, NPY_ARRAY_IN_ARRAY));
+  if (!indices_array) {
+    return NULL;
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\" must not have more rows than columns");
+    return NULL;
+  }
+  auto indptr = reinterpret_cast<int64_t*>(PyArray_DATA(indptr_array.get()));
+  auto indices = reinterpret_cast<int64_t*>(
+      PyArray_DATA(indices_array.get()));
+  npy_intp n_entries = PyArray_SIZE(indices_array.get());
+  if (PyArray_SIZE(indptr_array.get()) != nr + 1 || indptr[0] != 0 ||
+      indptr[nr] != n_entries ||
+      !std::is_sorted(indptr, indptr + nr + 1)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"indptr\" must be a valid index pointer of the rows of "
+                    "\"cost_matrix\" into \"indices\"");
+    return NULL;
+  }
+  if (std::any_of(indices, indices + n_entries,
+                  [nc](int64_t j) { return j < 0 || j >= nc; })) {
+    PyErr_SetString(PyExc_IndexError, "\"indices\" is out of bounds");
+    return NULL;
+  }
+
+  npy_intp data_dims[] = {n_entries};
+  pyarray data_array(PyArray_SimpleNew(
+      1, data_dims, float32? NPY_FLOAT32 : NPY_FLOAT64));
+  if (!data_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto data = PyArray_DATA(data_array.get());
+
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      clap_costs_entries<int64_t>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          indptr, indices, reinterpret_cast<float*>(data));
+    } else {
+      clap_costs_entries<int64_t>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          indptr, indices, reinterpret_cast<double*>(data));
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  return reinterpret_cast<PyObject*>(data_array.release());
+}
+
+static PyObject *py_augment_changed(PyObject *self, PyObject *args,
+                                    PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *col4row_obj, *row4col_obj, *v_obj;
+  int return_stats = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "col4row", "row4col", "v", "return_stats", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOOO|p", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &col4row_obj, &row4col_obj, &v_obj, &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  pyarray col4row_array(reinterpret_cast<PyObject*>(
+      inplace_array(col4row_obj, NPY_INT64, "col4row")));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray row4col_array(reinterpret_cast<PyObject*>(
+      inplace_array(row4col_obj, NPY_INT64, "row4col")));
+  if (!row4col_array) {
+    return NULL;
+  }
+  pyarray v_array(reinterpret_cast<PyObject*>(
+      inplace_array(v_obj, float32? NPY_FLOAT32 : NPY_FLOAT64, "v")));
+  if (!v_array) {
+    return NULL;
+  }
+
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc || PyArray_SIZE(col4row_array.get()) != nr ||
+      PyArray_SIZE(row4col_array.get()) != nc ||
+      PyArray_SIZE(v_array.get()) != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\"'s shape is invalid or does not match the "
+                    "assignment");
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+  if (!all_assigned(col4row, nr, nc)) {
+    return NULL;
+  }
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  bool feasible = true;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      augment_changed(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<float*>(v), stats_ptr);
+    } else {
+      augment_changed(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          col4row, row4col, reinterpret_cast<double*>(v), stats_ptr);
+    }
+  } catch (char const* e) {
+    feasible = false;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (feasible) {
+    return solution(col4row_array.get(), row4col_array.get(), v_array.get(),
+                    stats_ptr);
+  } else {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+}
+
+static PyObject *py_bottleneck(PyObject *self, PyObject *args,
+                               PyObject *kwargs) {
+  PyObject *cost_matrix_obj;
+  static const char *kwlist[] = {"cost_matrix", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "O", const_cast<char**>(kwlist), &cost_matrix_obj)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (nr > nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"cost_matrix\" must not have more rows than columns");
+    return NULL;
+  }
+  pyarray col4row_array(PyArray_SimpleNew(1, dims, NPY_INT64));
+  if (!col4row_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+
+  double threshold = 0;
+  bool feasible = true, out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    auto colsol = std::unique_ptr<int64_t[]>(new int64_t[nc]);
+    if (float32) {
+      threshold = lap_bottleneck<int64_t, float>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          col4row, colsol.get());
+    } else {
+      threshold = lap_bottleneck<int64_t, double>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          col4row, colsol.get());
+    }
+  } catch (char const* e) {
+    feasible = false;
+  } catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  if (!feasible) {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+  return Py_BuildValue("(Od)", col4row_array.get(), threshold);
+}
+
+static PyObject *py_cardinality(PyObject *self, PyObject *args,
+                                PyObject *kwargs) {
+  PyObject *cost_matrix_obj;
+  int k;
+  int return_stats = 0;
+  static const char *kwlist[] = {"cost_matrix", "k", "return_stats", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "Oi|p", const_cast<char**>(kwlist), &cost_matrix_obj, &k,
+      &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  if (k < 0 || k > std::min(nr, nc)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"k\" must be between 0 and the number of rows and of "
+                    "columns");
+    return NULL;
+  }
+  pyarray col4row_array(PyArray_SimpleNew(1, dims, NPY_INT64));
+  if (!col4row_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  bool feasible = true, out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    auto colsol = std::unique_ptr<int64_t[]>(new int64_t[nc]);
+    if (float32) {
+      lap_cardinality<int64_t, float>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          k, col4row, colsol.get(), stats_ptr);
+    } else {
+      lap_cardinality<int64_t, double>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          k, col4row, colsol.get(), stats_ptr);
+    }
+  } catch (char const* e) {
+    feasible = false;
+  } catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  if (!feasible) {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+  if (!return_stats) {
+    return Py_BuildValue("(O)", col4row_array.get());
+  }
+  pyobj stats_obj(stats_dict(stats));
+  if (!stats_obj) {
+    return NULL;
+  }
+  return Py_BuildValue("(OO)", col4row_array.get(), stats_obj.get());
+}
+
+template <typename cost, typename costs>
+static void solve_unassigned(int nr, int nc, const costs &assign_cost,
+                             const cost *row_cost, const cost *col_cost,
+                             int64_t *col4row, int64_t *row4col,
+                             lap_stats *stats) {
+  lap_cardinality<int64_t, cost>(
+      nr, nc, unassigned_costs<cost, costs>{assign_cost, row_cost, col_cost},
+      std::min(nr, nc), col4row, row4col, stats, true);
+}
+
+static PyObject *py_unassigned(PyObject *self, PyObject *args,
+                               PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *row_cost_obj, *col_cost_obj;
+  int return_stats = 0;
+  static const char *kwlist[] = {
+      "cost_matrix", "row_cost", "col_cost", "return_stats", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOO|p", const_cast<char**>(kwlist), &cost_matrix_obj,
+      &row_cost_obj, &col_cost_obj, &return_stats)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  auto dtype = float32? NPY_FLOAT32 : NPY_FLOAT64;
+  pyarray row_cost_array(PyArray_FROM_OTF(
+      row_cost_obj, dtype, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+  if (!row_cost_array) {
+    return NULL;
+  }
+  pyarray col_cost_array(PyArray_FROM_OTF(
+      col_cost_obj, dtype, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+  if (!col_cost_array) {
+    return NULL;
+  }
+  if (PyArray_NDIM(row_cost_array.get()) != 1 ||
+      PyArray_DIMS(row_cost_array.get())[0] != nr ||
+      PyArray_NDIM(col_cost_array.get()) != 1 ||
+      PyArray_DIMS(col_cost_array.get())[0] != nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"row_cost\" and \"col_cost\" must have a cost for "
+                    "each row and each column");
+    return NULL;
+  }
+  npy_intp row_dims[] = {nr};
+  npy_intp col_dims[] = {nc};
+  pyarray col4row_array(PyArray_SimpleNew(1, row_dims, NPY_INT64));
+  pyarray row4col_array(PyArray_SimpleNew(1, col_dims, NPY_INT64));
+  if (!col4row_array || !row4col_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto row_cost = PyArray_DATA(row_cost_array.get());
+  auto col_cost = PyArray_DATA(col_cost_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto row4col = reinterpret_cast<int64_t*>(PyArray_DATA(row4col_array.get()));
+
+  lap_stats stats;
+  auto stats_ptr = return_stats? &stats : nullptr;
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      solve_unassigned(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          reinterpret_cast<float*>(row_cost), reinterpret_cast<float*>(col_cost),
+          col4row, row4col, stats_ptr);
+    } else {
+      solve_unassigned(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          reinterpret_cast<double*>(row_cost),
+          reinterpret_cast<double*>(col_cost), col4row, row4col, stats_ptr);
+    }
+  } catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  if (!return_stats) {
+    return Py_BuildValue("(OO)", col4row_array.get(), row4col_array.get());
+  }
+  pyobj stats_obj(stats_dict(stats));
+  if (!stats_obj) {
+    return NULL;
+  }
+  return Py_BuildValue("(OOO)", col4row_array.get(), row4col_array.get(),
+                       stats_obj.get());
+}
+
+static PyObject *py_candidate_cols(PyObject *self, PyObject *args,
+                                   PyObject *kwargs) {
+  PyObject *cost_matrix_obj;
+  int k = 0;
+  int max_candidates = -1;
+  static const char *kwlist[] = {"cost_matrix", "k", "max_candidates", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "Oi|i", const_cast<char**>(kwlist), &cost_matrix_obj, &k,
+      &max_candidates)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  pyarray candidate_array(PyArray_SimpleNew(1, dims + 1, NPY_BOOL));
+  if (!candidate_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto candidate = reinterpret_cast<bool*>(PyArray_DATA(candidate_array.get()));
+
+  bool out_of_memory = false, complete = true;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      complete = candidate_cols<int64_t, float>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          k, candidate, max_candidates);
+    } else {
+      complete = candidate_cols<int64_t, double>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          k, candidate, max_candidates);
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  if (!complete) {
+    Py_RETURN_NONE;
+  }
+  return reinterpret_cast<PyObject*>(candidate_array.release());
+}
+
+// Get obj as a contiguous array of n non-negative capacities.
+static PyArrayObject *capacity_array(PyObject *obj, int64_t n,
+                                     const char *name) {
+  pyarray array(PyArray_FROMANY(obj, NPY_INT64, 1, 1, NPY_ARRAY_IN_ARRAY));
+  if (!array) {
+    return NULL;
+  }
+  auto capacity = reinterpret_cast<int64_t*>(PyArray_DATA(array.get()));
+  if (PyArray_SIZE(array.get()) != n ||
+      std::any_of(capacity, capacity + n, [](int64_t c) { return c < 0; })) {
+    PyErr_Format(PyExc_ValueError,
+                 "\"%s\" must hold a non-negative capacity for each of the "
+                 "%lld %s of \"cost_matrix\"", name, static_cast<long long>(n),
+                 name[0] == 'r'? "rows" : "columns");
+    return NULL;
+  }
+  return array.release();
+}
+
+static PyObject *py_capacitated(PyObject *self, PyObject *args,
+                                PyObject *kwargs) {
+  PyObject *cost_matrix_obj, *row_capacity_obj, *col_capacity_obj;
+  static const char *kwlist[] = {
+      "cost_matrix", "row_capacity", "col_capacity", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "OOO", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &row_capacity_obj, &col_capacity_obj)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  pyarray row_capacity_array(reinterpret_cast<PyObject*>(
+      capacity_array(row_capacity_obj, nr, "row_capacity")));
+  if (!row_capacity_array) {
+    return NULL;
+  }
+  pyarray col_capacity_array(reinterpret_cast<PyObject*>(
+      capacity_array(col_capacity_obj, nc, "col_capacity")));
+  if (!col_capacity_array) {
+    return NULL;
+  }
+  auto row_capacity = reinterpret_cast<int64_t*>(
+      PyArray_DATA(row_capacity_array.get()));
+  auto col_capacity = reinterpret_cast<int64_t*>(
+      PyArray_DATA(col_capacity_array.get()));
+  if (std::accumulate(row_capacity, row_capacity + nr, int64_t(0)) >
+      std::accumulate(col_capacity, col_capacity + nc, int64_t(0))) {
+    PyErr_SetString(PyExc_ValueError,
+                    "the total \"row_capacity\" must not exceed the total "
+                    "\"col_capacity\"");
+    return NULL;
+  }
+
+  pyarray flow_array(PyArray_SimpleNew(2, dims, NPY_INT64));
+  if (!flow_array) {
+    return NULL;
+  }
+  pyarray v_array(PyArray_SimpleNew(
+      1, dims + 1, float32? NPY_FLOAT32 : NPY_FLOAT64));
+  if (!v_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto flow = reinterpret_cast<int64_t*>(PyArray_DATA(flow_array.get()));
+  auto v = PyArray_DATA(v_array.get());
+
+  bool feasible = true;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      lap_capacitated<int64_t>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          row_capacity, col_capacity, flow, reinterpret_cast<float*>(v));
+    } else {
+      lap_capacitated<int64_t>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          row_capacity, col_capacity, flow, reinterpret_cast<double*>(v));
+    }
+  }
+  catch (char const* e) {
+    feasible = false;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (!feasible) {
+    PyErr_SetString(PyExc_ValueError, "cost matrix is infeasible");
+    return NULL;
+  }
+  return Py_BuildValue("(OO)", flow_array.get(), v_array.get());
+}
+
+// Get a stack of cost matrices as a contiguous 3D numpy array.
+static PyArrayObject *cost_matrix_stack(PyObject *obj, bool float32) {
+  pyarray array(PyArray_FROM_OTF(
+      obj, float32? NPY_FLOAT32 : NPY_FLOAT64,
+      NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST));
+  if (!array) {
+    PyErr_SetString(PyExc_ValueError, "\"stack\" must be a numpy array "
+                                      "of float32 or float64 dtype");
+    return NULL;
+  }
+  if (PyArray_NDIM(array.get()) != 3) {
+    PyErr_SetString(PyExc_ValueError,
+                    "\"stack\" must be a 3D numpy array");
+    return NULL;
+  }
+  return array.release();
+}
+
+// Use every cpu for n_threads <= 0, and never more threads than matrices.
+static int batch_threads(int n_threads, int64_t batch) {
+  if (n_threads <= 0) {
+    n_threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  return std::max<int64_t>(1, std::min<int64_t>(n_threads, batch));
+}
+
+static PyObject *py_lapjv_batch(PyObject *self, PyObject *args,
+                                PyObject *kwargs) {
+  PyObject *stack_obj;
+  int n_threads = 0;
+  static const char *kwlist[] = {"stack", "n_threads", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "O|i", const_cast<char**>(kwlist),
+      &stack_obj, &n_threads)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(stack_obj);
+  pyarray stack_array(reinterpret_cast<PyObject*>(
+      cost_matrix_stack(stack_obj, float32)));
+  if (!stack_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(stack_array.get());
+  int64_t batch = dims[0];
+  int nr = dims[1];
+  int nc = dims[2];
+  if (nr > nc) {
+    PyErr_SetString(PyExc_ValueError,
+                    "the matrices of \"stack\" must not have more rows "
+                    "than columns");
+    return NULL;
+  }
+
+  npy_intp col4row_dims[] = {dims[0], dims[1]};
+  pyarray col4row_array(PyArray_SimpleNew(2, col4row_dims, NPY_INT64));
+  if (!col4row_array) {
+    return NULL;
+  }
+  pyarray feasible_array(PyArray_SimpleNew(1, dims, NPY_BOOL));
+  if (!feasible_array) {
+    return NULL;
+  }
+  auto stack = PyArray_DATA(stack_array.get());
+  auto col4row = reinterpret_cast<int64_t*>(PyArray_DATA(col4row_array.get()));
+  auto feasible = reinterpret_cast<bool*>(PyArray_DATA(feasible_array.get()));
+  n_threads = batch_threads(n_threads, batch);
+
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      lap_batch(batch, nr, nc, reinterpret_cast<float*>(stack), col4row,
+                feasible, n_threads);
+    } else {
+      lap_batch(batch, nr, nc, reinterpret_cast<double*>(stack), col4row,
+                feasible, n_threads);
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  return Py_BuildValue("(OO)", col4row_array.get(), feasible_array.get());
+}
+
+static PyObject *py_costs_batch(PyObject *self, PyObject *args, PyObject *kwargs) {
+  PyObject *stack_obj;
+  int n_threads = 0;
+  static const char *kwlist[] = {"stack", "n_threads", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "O|i", const_cast<char**>(kwlist),
+      &stack_obj, &n_threads)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(stack_obj);
+  pyarray stack_array(reinterpret_cast<PyObject*>(
+      cost_matrix_stack(stack_obj, float32)));
+  if (!stack_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(stack_array.get());
+  int64_t batch = dims[0];
+  int nr = dims[1];
+  int nc = dims[2];
+
+  pyarray total_costs_array(PyArray_SimpleNew(
+      3, dims, float32? NPY_FLOAT32 : NPY_FLOAT64));
+  if (!total_costs_array) {
+    return NULL;
+  }
+  auto stack = PyArray_DATA(stack_array.get());
+  auto total_costs = PyArray_DATA(total_costs_array.get());
+
+  n_threads = batch_threads(n_threads, batch);
+
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      clap_costs_batch<int64_t>(batch, nr, nc,
+                                reinterpret_cast<float*>(stack),
+                                reinterpret_cast<float*>(total_costs),
+                                n_threads);
+    } else {
+      clap_costs_batch<int64_t>(batch, nr, nc,
+                                reinterpret_cast<double*>(stack),
+                                reinterpret_cast<double*>(total_costs),
+                                n_threads);
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  Py_INCREF(total_costs_array.get());
+  return reinterpret_cast<PyObject*>(total_costs_array.get());
+}
+
+static PyObject *py_leave_one_out(PyObject *self, PyObject *args,
+                                  PyObject *kwargs) {
+  PyObject *cost_matrix_obj;
+  int n_threads = 0;
+  static const char *kwlist[] = {"cost_matrix", "n_threads", NULL};
+  if (!PyArg_ParseTupleAndKeywords(
+      args, kwargs, "O|i", const_cast<char**>(kwlist),
+      &cost_matrix_obj, &n_threads)) {
+    return NULL;
+  }
+
+  bool float32 = is_float32(cost_matrix_obj);
+  int64_t row_stride, col_stride;
+  pyarray cost_matrix_array(reinterpret_cast<PyObject*>(strided_cost_matrix(
+      cost_matrix_obj, float32, &row_stride, &col_stride)));
+  if (!cost_matrix_array) {
+    return NULL;
+  }
+  auto dims = PyArray_DIMS(cost_matrix_array.get());
+  int nr = dims[0];
+  int nc = dims[1];
+  pyarray totals_array(PyArray_SimpleNew(
+      1, dims, float32? NPY_FLOAT32 : NPY_FLOAT64));
+  if (!totals_array) {
+    return NULL;
+  }
+  auto cost_matrix = PyArray_DATA(cost_matrix_array.get());
+  auto totals = PyArray_DATA(totals_array.get());
+
+  // The rows of a tall matrix are the columns of its transpose.
+  bool remove_rows = nr <= nc;
+  if (!remove_rows) {
+    std::swap(nr, nc);
+    std::swap(row_stride, col_stride);
+  }
+  n_threads = batch_threads(n_threads, remove_rows ? nr : 1);
+
+  bool out_of_memory = false;
+  Py_BEGIN_ALLOW_THREADS
+  try {
+    if (float32) {
+      lap_leave_one_out<int64_t, float>(
+          nr, nc,
+          strided_costs<float>{reinterpret_cast<float*>(cost_matrix),
+                               row_stride, col_stride},
+          remove_rows, reinterpret_cast<float*>(totals), n_threads);
+    } else {
+      lap_leave_one_out<int64_t, double>(
+          nr, nc,
+          strided_costs<double>{reinterpret_cast<double*>(cost_matrix),
+                                row_stride, col_stride},
+          remove_rows, reinterpret_cast<double*>(totals), n_threads);
+    }
+  }
+  catch (std::bad_alloc const& e) {
+    out_of_memory = true;
+  }
+  Py_END_ALLOW_THREADS
+
+  if (out_of_memory) {
+    return PyErr_NoMemory();
+  }
+  return reinterpret_cast<PyObject*>(totals_array.release());
+}
@@ -13,6 +13,17 @@ __copyright__ = "Copyright (c) 2020, Jacob Moorman"
 from _augment import _solve
 from py_lapjv import augment, lapjv
 
-from . import clap, clap_naive, lap
+from . import aio, assign3d, cache, clap, clap_naive, lap, profiling
 
-__all__ = ["clap", "clap_naive", "lap", "_solve", "lapjv", "augment"]
+__all__ = [
+    "aio",
+    "assign3d",
+    "cache",
+    "clap",
+    "clap_naive",
+    "lap",
+    "profiling",
+    "_solve",
+    "lapjv",
+    "augment",
+]
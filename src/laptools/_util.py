@@ -1,5 +1,10 @@
 """Functions for solving variants of the linear assignment problem."""
+import concurrent.futures
+import os
+
 import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
 
 
 def one_hot(idx, length):
@@ -25,3 +30,53 @@ def one_hot(idx, length):
     one_hot = np.zeros(length, dtype=np.bool)
     one_hot[idx] = True
     return one_hot
+
+
+def connected_blocks(cost_matrix):
+    """Split a cost matrix into blocks which can be assigned independently.
+
+    The rows and columns are the nodes of a bipartite graph, with an edge for
+    every finite entry of the cost matrix. Each connected component of the
+    graph is a block, and every entry outside of the blocks is infinite.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+
+    Returns
+    -------
+    list of tuples
+        The sorted ``rows, cols`` of each block. A row or column without any
+        finite entry is a block of its own.
+    """
+    n_rows, n_cols = cost_matrix.shape
+    rows, cols = np.nonzero(np.isfinite(cost_matrix))
+    n_nodes = n_rows + n_cols
+    graph = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, n_rows + cols)),
+        shape=(n_nodes, n_nodes),
+    )
+    n_blocks, labels = csgraph.connected_components(graph, directed=False)
+
+    # Group the nodes by block, keeping them sorted within each block.
+    nodes = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[nodes], np.arange(n_blocks + 1))
+    blocks = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        block = nodes[start:stop]
+        blocks.append((block[block < n_rows], block[block >= n_rows] - n_rows))
+    return blocks
+
+
+def map_blocks(func, blocks, parallel):
+    """Apply func to each block, in a pool of threads if parallel is true.
+
+    The pool only pays off when func releases the GIL, and the blocks are
+    large enough to make up for starting it.
+    """
+    if not parallel or len(blocks) < 2:
+        return [func(block) for block in blocks]
+    n_threads = min(len(blocks), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+        return list(executor.map(func, blocks))
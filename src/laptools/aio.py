@@ -0,0 +1,287 @@
+"""Solve assignment problems from asyncio code without blocking the loop.
+
+The solvers run in a bounded pool of worker threads, which the native code
+releases the GIL in. Small requests of the same kind and shape which arrive
+within a short window of each other are coalesced into a single batched
+native call, which amortizes the overhead of dispatching them.
+
+>>> from laptools import aio
+>>> row_ind, col_ind = await aio.solve(cost_matrix)
+>>> total_costs = await aio.clap_costs(cost_matrix)
+
+The module level functions share a default Solver. Create a Solver to tune
+the batching, the size of the pool or the backpressure.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import weakref
+
+import numpy as np
+
+from py_lapjv import costs_batch as lapjv_costs_batch
+from py_lapjv import lapjv, lapjv_batch
+
+from . import clap, lap
+
+
+class Solver:
+    """Micro-batching asyncio front end to the laptools solvers.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        The number of worker threads running the solvers. Defaults to the
+        number of cpus.
+    window : float, optional
+        How long, in seconds, a small request waits for others of the same
+        kind and shape to be batched with.
+    max_batch : int, optional
+        A batch is dispatched as soon as it holds this many requests.
+    batch_size : int, optional
+        Only cost matrices with at most this many entries are batched. Larger
+        ones are dispatched on their own right away.
+    max_pending : int, optional
+        The maximum number of requests in flight. Further requests wait for
+        one of them to finish before they are queued.
+
+    Notes
+    -----
+    Cancelling a request drops it from its batch if the batch has not been
+    dispatched yet. Otherwise the request still runs to completion in the
+    background, but its result is discarded.
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        window=0.001,
+        max_batch=64,
+        batch_size=4096,
+        max_pending=1024,
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        # The asyncio primitives are bound to an event loop, so every loop
+        # using the solver gets its own.
+        self._loop_states = weakref.WeakKeyDictionary()
+
+    async def solve(self, cost_matrix, maximize=False):
+        """Solve the linear sum assignment problem, as ``lap.solve``.
+
+        Parameters
+        ----------
+        cost_matrix : 2darray
+            A matrix of costs.
+        maximize : bool, optional
+            Calculate a maximum weight matching if true.
+
+        Returns
+        -------
+        row_ind, col_ind : array
+            The optimal assignment, as returned by ``lap.solve``.
+        """
+        cost_matrix = _check_matrix(cost_matrix)
+        if not (
+            np.issubdtype(cost_matrix.dtype, np.number) or cost_matrix.dtype == bool
+        ):
+            raise ValueError(
+                "expected a matrix containing numerical entries, got %s"
+                % (cost_matrix.dtype,)
+            )
+
+        prepare = functools.partial(_prepare_solve, maximize=maximize)
+        col4row = await self._run("solve", cost_matrix, prepare, _solve, _solve_batch)
+        return lap._assignment(col4row, cost_matrix.shape)
+
+    async def clap_costs(self, cost_matrix, dtype=np.double):
+        """Solve a constrained lsap for each entry, as ``clap.costs``.
+
+        Parameters
+        ----------
+        cost_matrix : 2darray
+            A matrix of costs.
+        dtype : dtype, optional
+            The precision in which the costs are computed, either
+            ``np.double`` (the default) or ``np.float32``.
+
+        Returns
+        -------
+        2darray
+            The matrix of total constrained lsap costs of ``clap.costs``.
+        """
+        dtype = clap._check_dtype(dtype)
+        cost_matrix = _check_matrix(cost_matrix)
+
+        prepare = functools.partial(np.asarray, dtype=dtype)
+        return await self._run(
+            "clap", cost_matrix, prepare, _clap_costs, _clap_costs_batch
+        )
+
+    def close(self, wait=True):
+        """Shut down the worker threads once the dispatched requests are done."""
+        self._executor.shutdown(wait=wait)
+
+    async def _run(self, kind, cost_matrix, prepare, func, batch_func):
+        """Run func(prepare(cost_matrix)) in the pool, batched with others if
+        it is small.
+
+        prepare converts and validates the cost matrix into the problem. It
+        runs in the pool too for large cost matrices, so that it does not
+        block the event loop. batch_func takes a stack of problems of the same
+        shape and dtype, and returns a list with the result of each, or the
+        exception it raised.
+        """
+        loop = asyncio.get_event_loop()
+        state = self._loop_state(loop)
+
+        async with state.pending:
+            if cost_matrix.size > self.batch_size or self.max_batch <= 1:
+                return await loop.run_in_executor(
+                    self._executor, lambda: func(prepare(cost_matrix))
+                )
+
+            problem = prepare(cost_matrix)
+            future = loop.create_future()
+            key = (kind, problem.shape, problem.dtype)
+            batch = state.batches.get(key)
+            if batch is None:
+                batch = state.batches[key] = _Batch(batch_func)
+                batch.timer = loop.call_later(
+                    self.window, self._dispatch, loop, state, key
+                )
+            batch.problems.append(problem)
+            batch.futures.append(future)
+
+            if len(batch.futures) >= self.max_batch:
+                batch.timer.cancel()
+                self._dispatch(loop, state, key)
+
+            return await future
+
+    def _dispatch(self, loop, state, key):
+        """Run a batch in the pool, and resolve its futures when it is done."""
+        batch = state.batches.pop(key)
+
+        # Leave out the requests cancelled while they waited for the batch.
+        live = [
+            (problem, future)
+            for problem, future in zip(batch.problems, batch.futures)
+            if not future.cancelled()
+        ]
+        if not live:
+            return
+        problems, futures = zip(*live)
+
+        def run_batch():
+            return batch.func(np.stack(problems))
+
+        def resolve(task):
+            error = task.exception() if not task.cancelled() else None
+            for k, future in enumerate(futures):
+                if future.done():
+                    continue
+                if task.cancelled():
+                    future.cancel()
+                elif error is not None:
+                    future.set_exception(error)
+                elif isinstance(task.result()[k], Exception):
+                    future.set_exception(task.result()[k])
+                else:
+                    future.set_result(task.result()[k])
+
+        task = loop.run_in_executor(self._executor, run_batch)
+        task.add_done_callback(resolve)
+
+    def _loop_state(self, loop):
+        state = self._loop_states.get(loop)
+        if state is None:
+            state = self._loop_states[loop] = _LoopState(self.max_pending)
+        return state
+
+
+class _LoopState:
+    """The batches being gathered on an event loop, and its backpressure."""
+
+    def __init__(self, max_pending):
+        self.pending = asyncio.Semaphore(max_pending)
+        self.batches = {}
+
+
+class _Batch:
+    """Requests of the same kind and shape waiting to be dispatched."""
+
+    def __init__(self, func):
+        self.func = func
+        self.problems = []
+        self.futures = []
+        self.timer = None
+
+
+def _check_matrix(cost_matrix):
+    """Check the shape of cost_matrix, without converting an array."""
+    cost_matrix = np.asarray(cost_matrix)
+    if cost_matrix.ndim != 2:
+        raise ValueError(
+            "expected a matrix (2-d array), got a %r array" % (cost_matrix.shape,)
+        )
+    return cost_matrix
+
+
+def _prepare_solve(cost_matrix, maximize):
+    """Convert and validate a cost matrix, transposing it if it is tall."""
+    cost_matrix = lap._check_cost_matrix(cost_matrix, maximize)
+    if cost_matrix.shape[1] < cost_matrix.shape[0]:
+        return cost_matrix.T
+    return cost_matrix
+
+
+def _solve(problem):
+    col4row, _, _ = lapjv(problem)
+    return col4row
+
+
+def _solve_batch(stack):
+    col4row, feasible = lapjv_batch(stack, 1)
+    return [
+        col4row[k] if feasible[k] else ValueError("cost matrix is infeasible")
+        for k in range(len(stack))
+    ]
+
+
+def _clap_costs(problem):
+    # The native solver releases the GIL throughout, unlike clap.costs.
+    return lapjv_costs_batch(problem[np.newaxis], 1)[0]
+
+
+def _clap_costs_batch(stack):
+    return list(lapjv_costs_batch(stack, 1))
+
+
+_default_solver = None
+
+
+def _get_default_solver():
+    global _default_solver
+    if _default_solver is None:
+        _default_solver = Solver()
+    return _default_solver
+
+
+async def solve(cost_matrix, maximize=False):
+    """Solve the linear sum assignment problem, as ``lap.solve``.
+
+    See ``Solver.solve``.
+    """
+    return await _get_default_solver().solve(cost_matrix, maximize=maximize)
+
+
+async def clap_costs(cost_matrix, dtype=np.double):
+    """Solve a constrained lsap for each entry, as ``clap.costs``.
+
+    See ``Solver.clap_costs``.
+    """
+    return await _get_default_solver().clap_costs(cost_matrix, dtype=dtype)
@@ -0,0 +1,202 @@
+"""Axial three dimensional assignment by Lagrangian relaxation.
+
+The axial 3-d assignment problem assigns each i to a distinct j and a
+distinct k, at the least total cost ``cost_tensor[i, j, k]`` of the triples,
+e.g. to associate the reports of three sensors. It is NP-hard, so it is
+solved approximately, along with a lower bound on the optimal cost.
+
+>>> from laptools import assign3d
+>>> i_ind, j_ind, k_ind, info = assign3d.solve(cost_tensor)
+>>> info["gap"]
+0.0
+
+Relaxing the constraint that each k is used at most once, with a multiplier
+for each k, leaves the lsap of ``min_k cost_tensor[i, j, k] + multiplier[k]``.
+Its optimal cost less the sum of the multipliers is a lower bound, which is
+raised by subgradient steps on the multipliers. Consecutive lsaps differ
+little, so each of them is warm started from the solution of the last. Each
+relaxed solution is made feasible by keeping its pairs (i, j) and assigning
+them ks by another lsap, which is then improved by reassigning the js and ks
+in turn.
+"""
+import numpy as np
+
+from py_lapjv import augment_changed as lapjv_augment_changed
+from py_lapjv import lapjv
+
+from . import lap, profiling
+
+# The lower bound has to improve within this many iterations, or the steps of
+# the multipliers are halved, starting over from the best multipliers.
+_PATIENCE = 10
+
+
+def solve(cost_tensor, maximize=False, max_iter=200, tol=1e-6):
+    """Solve the axial three dimensional assignment problem approximately.
+
+    Parameters
+    ----------
+    cost_tensor : 3darray
+        A tensor of costs, whose i, j, k entry is the cost of the triple. The
+        indices of its shortest axis are all assigned. Infinite costs rule out
+        their triples.
+    maximize : bool, optional
+        Calculate a maximum weight assignment if true.
+    max_iter : int, optional
+        The maximum number of subgradient iterations.
+    tol : float, optional
+        Stop once the relative gap between the cost of the assignment and the
+        bound is at most tol.
+
+    Returns
+    -------
+    i_ind, j_ind, k_ind : 1darray
+        The triples of the best assignment found, sorted by i_ind. Its cost is
+        ``cost_tensor[i_ind, j_ind, k_ind].sum()``.
+    info : dict
+        The ``cost`` of the assignment, the ``bound`` on the optimal cost, a
+        lower bound, or an upper bound when maximizing, their relative
+        ``gap`` and the number of ``iterations``.
+    """
+    cost_tensor = _check_cost_tensor(cost_tensor, maximize)
+    prof = profiling.current()
+
+    # Put the shortest axis first, so that its indices are the rows of the
+    # lsaps, and the axis whose constraint is relaxed last.
+    shortest = int(np.argmin(cost_tensor.shape))
+    axes = [shortest] + [axis for axis in range(3) if axis != shortest]
+    problem = cost_tensor.transpose(axes)
+    n_rows, _, n_ks = problem.shape
+    rows = np.arange(n_rows)
+
+    multipliers = best_multipliers = np.zeros(n_ks)
+    solution = None
+    best_cost, best_triples = np.inf, None
+    bound = -np.inf
+    step_scale, stalled = 2.0, 0
+    iteration = 0
+    while iteration < max_iter and n_rows > 0:
+        iteration += 1
+        with prof.phase("assign3d.relax"):
+            reduced = problem + multipliers
+            k4pair = reduced.argmin(axis=2)
+            relaxed = np.take_along_axis(reduced, k4pair[..., np.newaxis], 2)[..., 0]
+            if solution is None:
+                solution = lapjv(relaxed)
+            else:
+                lapjv_augment_changed(relaxed, *solution)
+            col4row = solution[0]
+            relaxed_bound = relaxed[rows, col4row].sum() - multipliers.sum()
+
+        if relaxed_bound > bound:
+            bound, best_multipliers, stalled = relaxed_bound, multipliers, 0
+        else:
+            stalled += 1
+
+        with prof.phase("assign3d.recover"):
+            try:
+                cost, triples = _recover(problem, col4row)
+            except ValueError:
+                # Ruled out triples can leave the pairs no feasible ks.
+                cost = np.inf
+            if cost < best_cost:
+                best_cost, best_triples = cost, triples
+
+        if _gap(best_cost, bound) <= tol:
+            break
+
+        # Go back to the best multipliers with shorter steps once the bound
+        # has stopped improving.
+        if stalled >= _PATIENCE:
+            multipliers, step_scale, stalled = best_multipliers, step_scale / 2, 0
+            continue
+
+        # Step along the subgradient, the number of times each k is used
+        # less one, keeping the multipliers non-negative.
+        subgradient = np.bincount(k4pair[rows, col4row], minlength=n_ks) - 1.0
+        subgradient[(multipliers <= 0) & (subgradient < 0)] = 0
+        norm = subgradient @ subgradient
+        if norm == 0:
+            # The relaxed solution is feasible, and so optimal.
+            break
+        target = best_cost if np.isfinite(best_cost) else bound + abs(bound) + 1
+        step = step_scale * (target - relaxed_bound) / norm
+        multipliers = np.maximum(multipliers + step * subgradient, 0)
+
+    if n_rows == 0:
+        best_cost, bound = 0.0, 0.0
+        best_triples = (rows, rows, rows)
+    elif best_triples is None:
+        raise ValueError("no feasible assignment was found")
+
+    # Map the triples back to the axes of the cost tensor.
+    triples = [None] * 3
+    for axis, ind in zip(axes, best_triples):
+        triples[axis] = ind
+    order = np.argsort(triples[0], kind="stable")
+    i_ind, j_ind, k_ind = [ind[order] for ind in triples]
+
+    sign = -1 if maximize else 1
+    info = {
+        "cost": sign * best_cost,
+        "bound": sign * bound,
+        "gap": _gap(best_cost, bound),
+        "iterations": iteration,
+    }
+    return i_ind, j_ind, k_ind, info
+
+
+def _recover(problem, col4row):
+    """Make a feasible assignment out of the pairs (i, j) of a relaxed solution.
+
+    The ks are assigned optimally given the pairs, and then the js given the
+    pairs (i, k), and so on for as long as that lowers the cost.
+
+    Returns
+    -------
+    cost : float
+        The total cost of the assignment.
+    triples : tuple of 1darrays
+        The i, j and k of its triples.
+    """
+    rows = np.arange(len(col4row))
+    j_ind = col4row.copy()
+    k_costs = problem[rows, j_ind]
+    _, k_ind = lap.solve(k_costs)
+    cost = k_costs[rows, k_ind].sum()
+    while True:
+        j_costs = problem[rows, :, k_ind]
+        _, new_j_ind = lap.solve(j_costs)
+        k_costs = problem[rows, new_j_ind]
+        _, new_k_ind = lap.solve(k_costs)
+        new_cost = k_costs[rows, new_k_ind].sum()
+        if not new_cost < cost:
+            return cost, (rows, j_ind, k_ind)
+        cost, j_ind, k_ind = new_cost, new_j_ind, new_k_ind
+
+
+def _gap(cost, bound):
+    """The gap between the cost of an assignment and a bound, relative to it."""
+    if not np.isfinite(cost):
+        return np.inf
+    return max(cost - bound, 0) / max(abs(cost), np.finfo(float).tiny)
+
+
+def _check_cost_tensor(cost_tensor, maximize=False):
+    """Get cost_tensor as a float64 array of costs to minimize, validating it."""
+    cost_tensor = np.asarray(cost_tensor)
+    if cost_tensor.ndim != 3:
+        raise ValueError(
+            "expected a tensor (3-d array), got a %r array" % (cost_tensor.shape,)
+        )
+    if not (np.issubdtype(cost_tensor.dtype, np.number) or cost_tensor.dtype == bool):
+        raise ValueError(
+            "expected a tensor containing numerical entries, got %s"
+            % (cost_tensor.dtype,)
+        )
+    cost_tensor = cost_tensor.astype(np.double)
+    if maximize:
+        cost_tensor = -cost_tensor
+    if np.any(np.isneginf(cost_tensor) | np.isnan(cost_tensor)):
+        raise ValueError("tensor contains invalid numeric entries")
+    return cost_tensor
@@ -0,0 +1,208 @@
+"""An opt-in cache of solver results, keyed by the content of the cost matrix.
+
+Pass a Cache to ``lap.solve`` or ``clap.costs`` to reuse their results for
+byte-identical cost matrices solved with the same options.
+
+>>> from laptools import cache, clap, lap
+>>> results = cache.Cache(max_bytes=2 ** 30, directory="/tmp/laptools")
+>>> row_ind, col_ind = lap.solve(cost_matrix, cache=results)
+>>> total_costs = clap.costs(cost_matrix, cache=results)
+>>> results.as_dict()
+{'hits': 0, 'misses': 2, ...}
+
+Results are kept in memory, least recently used first out once they take
+more than max_bytes. With a directory, they are also written to disk, where
+they survive eviction from memory and the process itself.
+"""
+import collections
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+
+class Cache:
+    """A two tier LRU cache of solver results.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        The total size of the results kept in memory.
+    directory : str, optional
+        A directory in which to also keep results on disk. Results are only
+        kept in memory by default.
+    max_disk_bytes : int, optional
+        The total size of the results kept on disk. The least recently
+        written results are removed first. Unbounded by default.
+
+    Attributes
+    ----------
+    hits : int
+        Lookups answered from memory or disk.
+    disk_hits : int
+        Lookups answered from disk, a subset of the hits.
+    misses : int
+        Lookups which were not answered.
+    evictions : int
+        Results evicted from memory.
+    """
+
+    def __init__(self, max_bytes=2 ** 28, directory=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def key(self, solver, cost_matrix, **options):
+        """Hash a cost matrix, along with the solver and its options.
+
+        Parameters
+        ----------
+        solver : str
+            The name of the solver.
+        cost_matrix : ndarray
+            The cost matrix, whose bytes, dtype and shape are hashed.
+        **options
+            The options of the solver which change its results.
+
+        Returns
+        -------
+        str
+            The key of the results.
+        """
+        cost_matrix = np.ascontiguousarray(cost_matrix)
+        header = "%s|%s|%r|%r" % (
+            solver,
+            cost_matrix.dtype.str,
+            cost_matrix.shape,
+            sorted(options.items()),
+        )
+        digest = hashlib.blake2b(header.encode(), digest_size=20)
+        digest.update(cost_matrix.data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Look up the results stored under key.
+
+        Returns
+        -------
+        dict of ndarrays or None
+            A copy of the results, or None if there are none.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {name: array.copy() for name, array in entry.items()}
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, entry)
+        return {name: array.copy() for name, array in entry.items()}
+
+    def put(self, key, **results):
+        """Store results under key.
+
+        Parameters
+        ----------
+        key : str
+            The key of the results, from Cache.key.
+        **results : ndarray
+            The arrays to store, which are copied.
+        """
+        entry = {name: np.array(array) for name, array in results.items()}
+        with self._lock:
+            self._store(key, entry)
+        if self.directory is not None:
+            self._save(key, entry)
+
+    def clear(self):
+        """Remove every result from memory. Results on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def as_dict(self):
+        """Export the counters and the size of the cache as a dict."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _store(self, key, entry):
+        """Keep an entry in memory, evicting the least recently used ones."""
+        nbytes = _nbytes(entry)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= _nbytes(self._entries.pop(key))
+        self._entries[key] = entry
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= _nbytes(evicted)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with np.load(self._path(key)) as f:
+                return dict(f)
+        except (OSError, ValueError):
+            # Missing, or still being written by another process.
+            return None
+
+    def _save(self, key, entry):
+        # Write to a temporary file first, so that readers never see a
+        # partially written result.
+        path = self._path(key)
+        tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **entry)
+        os.replace(tmp_path, path)
+
+        if self.max_disk_bytes is not None:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        """Remove the least recently written results beyond max_disk_bytes."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _nbytes(entry):
+    return sum(array.nbytes for array in entry.values())
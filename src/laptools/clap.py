@@ -1,12 +1,20 @@
 import numpy as np
+from scipy import sparse
 
+from py_lapjv import costs_batch as lapjv_costs_batch
+from py_lapjv import costs_entries as lapjv_costs_entries
+from py_lapjv import costs_rows as lapjv_costs_rows
 from py_lapjv import lapjv
 
-from . import lap
+from . import _util, lap, profiling
 from ._util import one_hot
 
+# The number of entries in the blocks of costs(..., decompose=True) from which
+# they are solved in parallel.
+_PARALLEL_BLOCKS_SIZE = 2 ** 12
 
-def costs(cost_matrix):
+
+def costs(cost_matrix, out=None, dtype=np.double, cache=None, decompose=False):
     """Solve a constrained linear sum assignment problem for each entry.
 
     The output of this function is equivalent to, but significantly more
@@ -22,31 +30,88 @@ def costs(cost_matrix):
 
     Parameters
     ----------
-    cost_matrix : 2darray
-        A matrix of costs.
+    cost_matrix : 2darray or sparse matrix
+        A matrix of costs. It is never modified. A scipy sparse matrix is
+        handed to ``costs_sparse``, which returns a sparse matrix.
+    out : 2darray, optional
+        An array of the same shape as cost_matrix in which to place the
+        result, e.g. an ``np.memmap``.
+    dtype : dtype, optional
+        The precision in which the costs are computed, either ``np.double``
+        (the default) or ``np.float32``. Single precision halves the memory
+        footprint of the computation.
+    cache : laptools.cache.Cache, optional
+        A cache in which to look up the total costs first, and to store them
+        otherwise.
+    decompose : bool, optional
+        Split the cost matrix into the blocks connected by its finite entries
+        first, and solve each block on its own, in parallel if there are
+        several. An entry of a block costs its constrained cost within the
+        block plus the lsap costs of the other blocks.
 
     Returns
     -------
     2darray
         A matrix of total constrained lsap costs. The i, j entry of the matrix
         corresponds to the total lsap cost under the constraint that row i is
-        assigned to column j.
+        assigned to column j. If out was given, it is returned.
     """
-    cost_matrix = np.array(cost_matrix, dtype=np.double)
+    if sparse.issparse(cost_matrix):
+        if out is not None or cache is not None:
+            raise ValueError("out and cache are not supported for sparse matrices")
+        return costs_sparse(cost_matrix, dtype=dtype)
+
+    dtype = _check_dtype(dtype)
+
+    # Note: this only copies cost_matrix if it is not already of dtype.
+    cost_matrix = np.asarray(cost_matrix, dtype=dtype)
 
+    n_rows, n_cols = cost_matrix.shape
+    if out is None:
+        out = np.empty((n_rows, n_cols), dtype=dtype)
+    elif out.shape != (n_rows, n_cols):
+        raise ValueError(
+            "expected out to have shape %r, got %r" % ((n_rows, n_cols), out.shape)
+        )
+
+    compute = _costs_blocks if decompose else _costs
+    if cache is None:
+        return compute(cost_matrix, out)
+
+    key = cache.key("clap.costs", cost_matrix)
+    results = cache.get(key)
+    if results is not None:
+        out[...] = results["total_costs"]
+        return out
+    compute(cost_matrix, out)
+    cache.put(key, total_costs=out)
+    return out
+
+
+def _costs(cost_matrix, out):
+    """Compute costs(cost_matrix) into out, without a cache.
+
+    The cost matrix must already be an array of the dtype of out.
+    """
     n_rows, n_cols = cost_matrix.shape
     if n_rows > n_cols:
-        return costs(cost_matrix.T).T
+        _costs(cost_matrix.T, out.T)
+        return out
+
+    total_costs = out
+    prof = profiling.current()
 
     # Find the best lsap assignment from rows to columns without constrains.
     # Since there are at least as many columns as rows, row_idxs should
     # be identical to np.arange(n_rows). We depend on this.
     row_idxs = np.arange(n_rows)
     try:
-        col4row, row4col, v = lapjv(cost_matrix)
+        with prof.phase("clap.base_solve"):
+            col4row, row4col, v = lapjv(cost_matrix)
     except ValueError as e:
         if str(e) == "cost matrix is infeasible":
-            return np.full((n_rows, n_cols), np.inf)
+            total_costs.fill(np.inf)
+            return total_costs
         else:
             raise e
 
@@ -54,41 +119,23 @@ def costs(cost_matrix):
     lsap_costs = cost_matrix[row_idxs, col4row]
     lsap_total_cost = lsap_costs.sum()
 
-    # Find the two minimum-cost columns for each row
-    best_col_idxs = np.argmin(cost_matrix, axis=1)
-    best_col_vals = cost_matrix[row_idxs, best_col_idxs]
-    cost_matrix[row_idxs, best_col_idxs] = np.inf
-    second_best_col_idxs = np.argmin(cost_matrix, axis=1)
-    second_best_col_vals = cost_matrix[row_idxs, second_best_col_idxs]
-    cost_matrix[row_idxs, second_best_col_idxs] = np.inf
-    third_best_col_idxs = np.argmin(cost_matrix, axis=1)
-    cost_matrix[row_idxs, best_col_idxs] = best_col_vals
-    cost_matrix[row_idxs, second_best_col_idxs] = second_best_col_vals
-
-    # When a row has its column stolen by a constraint, these are the columns
-    # that might come into play when we are forced to resolve the assignment.
-    if n_rows < n_cols:
-        # unused = col_idxs[~np.isin(col_idxs, col4row)]
-        # unused = np.setdiff1d(np.arange(n_cols), col4row, assume_unique=True)
-        # first_unused = np.argmin(cost_matrix[:, unused], axis=1)
-        # potential_cols = np.union1d(col4row, unused[first_unused])
-        used_cost_matrix = cost_matrix[:, col4row]
-        cost_matrix[:, col4row] = np.inf
-        first_unused = np.argmin(cost_matrix, axis=1)
-        potential_cols = np.union1d(col4row, first_unused)
-        cost_matrix[:, col4row] = used_cost_matrix
-    else:
-        potential_cols = np.arange(n_cols)
+    # Find the three minimum-cost columns for each row. When a row has its
+    # column stolen by a constraint, the cheapest column outside of the lsap
+    # assignment might also come into play when we are forced to resolve the
+    # assignment. Masked values are written to a single scratch row rather
+    # than to the cost matrix itself.
+    with prof.phase("clap.candidates"):
+        best_cols, potential_cols = _best_cols(cost_matrix, col4row)
 
     # When we add the constraint assigning row i to column j, lsap_col_idxs[i]
     # is freed up. If lsap_col_idxs[i] cannot improve on the cost of one of the
     # other row assignments, it does not need to be reassigned to another row.
     # If additionally column j is not in lsap_col_idxs, it is not taken away
     # from any of the other row assignments. In this situation, the resulting
-    # total assignment costs are:
-    total_costs = lsap_total_cost - lsap_costs[:, None] + cost_matrix
-
+    # total assignment costs are computed row by row at the top of the loop.
     for i, freed_j in enumerate(col4row):
+        np.add(lsap_total_cost - lsap_costs[i], cost_matrix[i], out=total_costs[i])
+
         # When row i is constrained to another column, can column j be
         # reassigned to improve the assignment cost of one of the other rows?
         # To deal with that, we solve the lsap with row i omitted. For the
@@ -102,9 +149,11 @@ def costs(cost_matrix):
         # other rows, simply use the current assignments.
         if np.any(freed_col_costs < lsap_costs):
             # Need to solve the subproblem in which one row is removed
-            new_row4col, new_col4row, new_v = lap.solve_lsap_with_removed_row(
-                cost_matrix, i, row4col, col4row, v, modify_val=False
-            )
+            prof.count("clap.removed_row_augments")
+            with prof.phase("clap.removed_row"):
+                new_row4col, new_col4row, new_v = lap.solve_lsap_with_removed_row(
+                    cost_matrix, i, row4col, col4row, v, modify_val=False
+                )
 
             sub_total_cost = cost_matrix[sub_ind, new_col4row[sub_ind]].sum()
 
@@ -114,6 +163,7 @@ def costs(cost_matrix):
             # These miscalculations are corrected later.
             total_costs[i, :] = cost_matrix[i, :] + sub_total_cost
         else:
+            prof.count("clap.shortcut_rows")
             new_row4col, new_col4row, new_v = (
                 row4col,
                 col4row.copy(),
@@ -129,100 +179,369 @@ def costs(cost_matrix):
         new_col4row[i] = set(col4row).difference(set(new_col4row)).pop()
         total_costs[i, new_col4row[i]] = cost_matrix[row_idxs, new_col4row].sum()
 
-        # A flag that indicates if solve_lsap_with_removed_col has been called.
-        flag_removed_col = False
+        with prof.phase("clap.stolen_entries"):
+            _stolen_entries(
+                cost_matrix,
+                i,
+                new_col4row,
+                new_row4col,
+                new_v,
+                best_cols,
+                potential_cols,
+                total_costs,
+            )
+
+    # For those constraints which are compatible with the unconstrained lsap:
+    total_costs[row_idxs, col4row] = lsap_total_cost
+
+    return total_costs
+
 
-        for other_i, stolen_j in enumerate(new_col4row):
-            if other_i == i:
-                continue
+def costs_sparse(cost_matrix, forbidden=None, dtype=np.double):
+    """Solve a constrained linear sum assignment problem for each admissible
+       entry.
 
-            # if not np.isfinite(cost_matrix[i, stolen_j]):
-            #     total_costs[i, stolen_j] = cost_matrix[i, stolen_j]
-            #     continue
+    The admissible entries are the stored entries of a sparse cost_matrix, or
+    the entries of a dense one which are not forbidden, that have a finite
+    cost. Only their constrained costs are computed, and the problems are
+    solved on the rows and columns which have admissible entries.
 
-            # Row i steals column stolen_j from other_i because of constraint.
-            new_col4row[i] = stolen_j
+    Unlike ``costs``, a row or column without any admissible entry does not
+    make every constraint infeasible. It can never be assigned, so it is left
+    out of the problem instead.
 
-            # Row other_i must find a new column. What is its next best option?
-            best_j, second_best_j, third_best_j = (
-                best_col_idxs[other_i],
-                second_best_col_idxs[other_i],
-                third_best_col_idxs[other_i],
+    Parameters
+    ----------
+    cost_matrix : 2darray or sparse matrix
+        A matrix of costs. The entries which are not stored in a sparse matrix
+        are forbidden, rather than of zero cost.
+    forbidden : 2darray of bool, optional
+        The entries of a dense cost_matrix which may not be assigned.
+    dtype : dtype, optional
+        The precision in which the costs are computed, either ``np.double``
+        (the default) or ``np.float32``.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        A matrix of total constrained lsap costs, holding an entry for each
+        admissible entry of cost_matrix, with sorted indices. An entry is
+        ``inf`` if no assignment satisfies its constraint.
+    """
+    dtype = _check_dtype(dtype)
+    entry_rows, entry_cols, data, shape = _admissible_entries(
+        cost_matrix, forbidden, dtype
+    )
+    n_rows, n_cols = shape
+
+    # Only the rows and columns with admissible entries take part. Every entry
+    # of the compact matrix which is not admissible is infinite.
+    rows, row_pos = np.unique(entry_rows, return_inverse=True)
+    cols, col_pos = np.unique(entry_cols, return_inverse=True)
+    compact = np.full((len(rows), len(cols)), np.inf, dtype=dtype)
+    compact[row_pos, col_pos] = data
+
+    with profiling.current().phase("clap.costs_sparse"):
+        if len(rows) <= len(cols):
+            total_costs = lapjv_costs_entries(
+                compact, _indptr(row_pos, len(rows)), col_pos
+            )
+        else:
+            # Solve the transpose, whose entries are sorted by column.
+            order = np.lexsort((row_pos, col_pos))
+            total_costs = np.empty_like(data)
+            total_costs[order] = lapjv_costs_entries(
+                compact.T, _indptr(col_pos[order], len(cols)), row_pos[order]
             )
 
-            # Note: Problem might occur if we have two j's that are both next
-            # best, but one is not in col_idxs and the other is in col_idxs.
-            # In this case, choosing the one not in col_idxs does not necessarily
-            # give us the optimal assignment.
-            # TODO: make the following if-else prettier.
-
-            if (
-                best_j != stolen_j
-                and best_j not in new_col4row
-                and (
-                    cost_matrix[other_i, best_j] != cost_matrix[other_i, second_best_j]
-                    or second_best_j not in new_col4row
-                )
-            ):
-                new_col4row[other_i] = best_j
-                total_costs[i, stolen_j] = cost_matrix[row_idxs, new_col4row].sum()
-            elif second_best_j not in new_col4row and (
-                cost_matrix[other_i, second_best_j]
-                != cost_matrix[other_i, third_best_j]
-                or third_best_j not in new_col4row
-            ):
-                new_col4row[other_i] = second_best_j
-                total_costs[i, stolen_j] = cost_matrix[row_idxs, new_col4row].sum()
-            else:
-                # If this is the first time solve_lsap_with_removed_col is called
-                # we initialize a bunch of variables
-                if not flag_removed_col:
-                    # Otherwise, solve the lsap with stolen_j removed
-                    sub_sub_cost_matrix = cost_matrix[sub_ind, :][:, potential_cols]
-
-                    sub_j = list(potential_cols).index(stolen_j)
-
-                    sub_new_col4row = new_col4row[sub_ind]
-                    sub_new_col4row = np.where(
-                        sub_new_col4row.reshape(sub_new_col4row.size, 1)
-                        == potential_cols
-                    )[1]
-
-                    # When we solve the lsap with row i removed, we update row4col accordingly.
-                    sub_row4col = new_row4col.copy()
-                    sub_row4col[sub_row4col == i] = -1
-                    sub_row4col[sub_row4col > i] -= 1
-                    sub_sub_row4col = sub_row4col[potential_cols]
-
-                    sub_new_v = new_v[potential_cols]
-
-                    flag_removed_col = True
-                else:
-                    sub_j = list(potential_cols).index(stolen_j)
-
-                try:
+    return sparse.csr_matrix(
+        (total_costs, entry_cols, _indptr(entry_rows, n_rows)), shape=shape
+    )
+
+
+def costs_batch(stack, n_jobs=None, dtype=np.double):
+    """Solve the constrained linear sum assignment problems of many matrices.
+
+    The output of this function is equivalent to
+
+    >>> np.stack([clap.costs(cost_matrix) for cost_matrix in stack])
+
+    but the whole batch is computed natively, spread over n_jobs threads.
+    This avoids the python overhead of costs, which dominates for small cost
+    matrices.
+
+    Parameters
+    ----------
+    stack : 3darray or list of 2darrays
+        A stack of cost matrices, all of the same shape.
+    n_jobs : int, optional
+        The number of threads to use. Defaults to the number of cpus.
+    dtype : dtype, optional
+        The precision in which the costs are computed, either ``np.double``
+        (the default) or ``np.float32``.
+
+    Returns
+    -------
+    3darray
+        A stack of matrices of total constrained lsap costs, the k'th of which
+        is ``clap.costs(stack[k])``.
+    """
+    dtype = _check_dtype(dtype)
+    stack = np.asarray(stack, dtype=dtype)
+    if stack.ndim != 3:
+        raise ValueError(
+            "expected a stack of matrices (3-d array), got a %r array" % (stack.shape,)
+        )
+
+    with profiling.current().phase("clap.costs_batch"):
+        return lapjv_costs_batch(stack, n_jobs or 0)
+
+
+def _costs_blocks(cost_matrix, out):
+    """Compute costs(cost_matrix) into out, block by block, without a cache.
+
+    The cost matrix must already be an array of the dtype of out.
+    """
+    if cost_matrix.shape[0] > cost_matrix.shape[1]:
+        _costs_blocks(cost_matrix.T, out.T)
+        return out
+
+    prof = profiling.current()
+    out.fill(np.inf)
+    with prof.phase("clap.decompose"):
+        blocks = _util.connected_blocks(cost_matrix)
+    # Every row has to be assigned within its own block.
+    if any(len(rows) > len(cols) for rows, cols in blocks):
+        return out
+    blocks = [(rows, cols) for rows, cols in blocks if len(rows) > 0]
+    prof.count("clap.blocks", len(blocks))
+
+    def solve_block(block):
+        rows, cols = block
+        block_matrix = cost_matrix[np.ix_(rows, cols)]
+        try:
+            col4row, row4col, v = lapjv(block_matrix)
+        except ValueError:
+            return None
+        block_costs = np.empty_like(block_matrix)
+        lapjv_costs_rows(block_matrix, col4row, row4col, v, 0, len(rows), block_costs)
+        return block_matrix[np.arange(len(rows)), col4row].sum(), block_costs
+
+    with prof.phase("clap.block_costs"):
+        size = sum(len(rows) * len(cols) for rows, cols in blocks)
+        results = _util.map_blocks(solve_block, blocks, size >= _PARALLEL_BLOCKS_SIZE)
+    if any(result is None for result in results):
+        return out
+
+    # Every entry of a block also pays for the lsaps of the other blocks.
+    lsap_total_cost = sum(block_total for block_total, _ in results)
+    for (rows, cols), (block_total, block_costs) in zip(blocks, results):
+        out[np.ix_(rows, cols)] = block_costs + (lsap_total_cost - block_total)
+    return out
+
+
+def _best_cols(cost_matrix, col4row):
+    """Find the three cheapest columns of each row of cost_matrix.
+
+    Returns
+    -------
+    best_cols : tuple of 1darray
+        The cheapest, second cheapest and third cheapest column of each row.
+    potential_cols : 1darray
+        The columns which can be assigned once a constraint steals a column:
+        the columns of col4row and the cheapest other column of each row.
+    """
+    n_rows, n_cols = cost_matrix.shape
+    row_idxs = np.arange(n_rows)
+    best_col_idxs = np.empty(n_rows, dtype=int)
+    second_best_col_idxs = np.empty(n_rows, dtype=int)
+    third_best_col_idxs = np.empty(n_rows, dtype=int)
+    first_unused = np.empty(n_rows, dtype=int)
+    scratch_row = np.empty(n_cols, dtype=cost_matrix.dtype)
+    for i in row_idxs:
+        scratch_row[:] = cost_matrix[i]
+        best_col_idxs[i] = np.argmin(scratch_row)
+        scratch_row[best_col_idxs[i]] = np.inf
+        second_best_col_idxs[i] = np.argmin(scratch_row)
+        scratch_row[second_best_col_idxs[i]] = np.inf
+        third_best_col_idxs[i] = np.argmin(scratch_row)
+
+        if n_rows < n_cols:
+            scratch_row[:] = cost_matrix[i]
+            scratch_row[col4row] = np.inf
+            first_unused[i] = np.argmin(scratch_row)
+
+    if n_rows < n_cols:
+        potential_cols = np.union1d(col4row, first_unused)
+    else:
+        potential_cols = np.arange(n_cols)
+
+    return (best_col_idxs, second_best_col_idxs, third_best_col_idxs), potential_cols
+
+
+def _stolen_entries(
+    cost_matrix,
+    i,
+    new_col4row,
+    new_row4col,
+    new_v,
+    best_cols,
+    potential_cols,
+    total_costs,
+):
+    """Correct the total costs of the entries of row i which steal a column.
+
+    The columns of new_col4row, the assignment with row i omitted, are taken
+    away from the rows they are assigned to by the constraints on row i. Each
+    of those rows is reassigned to one of its best_cols if that is optimal,
+    and otherwise the lsap with the stolen column removed is solved. The
+    entries of new_col4row are restored on return.
+    """
+    prof = profiling.current()
+    n_rows, n_cols = cost_matrix.shape
+    row_idxs = np.arange(n_rows)
+    sub_ind = ~one_hot(i, n_rows)
+    best_col_idxs, second_best_col_idxs, third_best_col_idxs = best_cols
+
+    # A flag that indicates if solve_lsap_with_removed_col has been called.
+    flag_removed_col = False
+
+    for other_i, stolen_j in enumerate(new_col4row):
+        if other_i == i:
+            continue
+
+        # if not np.isfinite(cost_matrix[i, stolen_j]):
+        #     total_costs[i, stolen_j] = cost_matrix[i, stolen_j]
+        #     continue
+
+        # Row i steals column stolen_j from other_i because of constraint.
+        new_col4row[i] = stolen_j
+
+        # Row other_i must find a new column. What is its next best option?
+        best_j, second_best_j, third_best_j = (
+            best_col_idxs[other_i],
+            second_best_col_idxs[other_i],
+            third_best_col_idxs[other_i],
+        )
+
+        # Note: Problem might occur if we have two j's that are both next
+        # best, but one is not in col_idxs and the other is in col_idxs.
+        # In this case, choosing the one not in col_idxs does not necessarily
+        # give us the optimal assignment.
+        # TODO: make the following if-else prettier.
+
+        if (
+            best_j != stolen_j
+            and best_j not in new_col4row
+            and (
+                cost_matrix[other_i, best_j] != cost_matrix[other_i, second_best_j]
+                or second_best_j not in new_col4row
+            )
+        ):
+            new_col4row[other_i] = best_j
+            total_costs[i, stolen_j] = cost_matrix[row_idxs, new_col4row].sum()
+            prof.count("clap.candidate_entries")
+        elif second_best_j not in new_col4row and (
+            cost_matrix[other_i, second_best_j] != cost_matrix[other_i, third_best_j]
+            or third_best_j not in new_col4row
+        ):
+            new_col4row[other_i] = second_best_j
+            total_costs[i, stolen_j] = cost_matrix[row_idxs, new_col4row].sum()
+            prof.count("clap.candidate_entries")
+        else:
+            # If this is the first time solve_lsap_with_removed_col is called
+            # we initialize a bunch of variables. The lsap with stolen_j
+            # removed only involves the rows other than i and the potential
+            # columns. Rather than extracting that sub matrix, we free the
+            # column of row i, so that the augment never reaches row i, and
+            # mask out the other columns.
+            if not flag_removed_col:
+                sub_col4row = new_col4row.copy()
+                sub_col4row[i] = -1
+                sub_row4col = new_row4col.copy()
+                sub_row4col[sub_row4col == i] = -1
+                potential_col_mask = np.zeros(n_cols, dtype=bool)
+                potential_col_mask[potential_cols] = True
+
+                flag_removed_col = True
+
+            prof.count("clap.removed_col_augments")
+            try:
+                with prof.phase("clap.removed_col"):
                     _, new_new_col4row, _ = lap.solve_lsap_with_removed_col(
-                        sub_sub_cost_matrix,
-                        sub_j,
-                        sub_sub_row4col,
-                        sub_new_col4row,
-                        sub_new_v,  # dual variable associated with cols
+                        cost_matrix,
+                        stolen_j,
+                        sub_row4col,
+                        sub_col4row,
+                        new_v,  # dual variable associated with cols
                         modify_val=False,
+                        col_mask=potential_col_mask,
                     )
-                    total_costs[i, stolen_j] = (
-                        cost_matrix[i, stolen_j]
-                        + sub_sub_cost_matrix[
-                            np.arange(n_rows - 1), new_new_col4row
-                        ].sum()
-                    )
-                except ValueError:
-                    total_costs[i, stolen_j] = np.inf
+                total_costs[i, stolen_j] = (
+                    cost_matrix[i, stolen_j]
+                    + cost_matrix[sub_ind, new_new_col4row[sub_ind]].sum()
+                )
+            except ValueError:
+                total_costs[i, stolen_j] = np.inf
 
-            # Give other_i its column back in preparation for the next round.
-            new_col4row[other_i] = stolen_j
-            new_col4row[i] = -1
+        # Give other_i its column back in preparation for the next round.
+        new_col4row[other_i] = stolen_j
+        new_col4row[i] = -1
 
-    # For those constraints which are compatible with the unconstrained lsap:
-    total_costs[row_idxs, col4row] = lsap_total_cost
 
-    return total_costs
+def _admissible_entries(cost_matrix, forbidden, dtype):
+    """Get the admissible entries of a dense or sparse cost_matrix.
+
+    Returns
+    -------
+    entry_rows, entry_cols, data : 1darray
+        The row, column and cost of each admissible entry, sorted by row and
+        then by column.
+    shape : tuple of int
+        The shape of cost_matrix.
+    """
+    if sparse.issparse(cost_matrix):
+        if forbidden is not None:
+            raise ValueError("forbidden is only supported for dense matrices")
+        cost_matrix = sparse.csr_matrix(cost_matrix, dtype=dtype, copy=True)
+        cost_matrix.sum_duplicates()
+        shape = cost_matrix.shape
+        entry_rows = np.repeat(np.arange(shape[0]), np.diff(cost_matrix.indptr))
+        entry_cols, data = cost_matrix.indices, cost_matrix.data
+    else:
+        cost_matrix = np.asarray(cost_matrix, dtype=dtype)
+        if cost_matrix.ndim != 2:
+            raise ValueError(
+                "expected a matrix (2-d array), got a %r array" % (cost_matrix.shape,)
+            )
+        shape = cost_matrix.shape
+        admissible = np.ones(shape, dtype=bool)
+        if forbidden is not None:
+            forbidden = np.asarray(forbidden, dtype=bool)
+            if forbidden.shape != shape:
+                raise ValueError(
+                    "expected forbidden to have shape %r, got %r"
+                    % (shape, forbidden.shape)
+                )
+            admissible &= ~forbidden
+        entry_rows, entry_cols = np.nonzero(admissible)
+        data = cost_matrix[entry_rows, entry_cols]
+
+    if np.any(np.isneginf(data) | np.isnan(data)):
+        raise ValueError("matrix contains invalid numeric entries")
+
+    finite = np.isfinite(data)
+    return entry_rows[finite], entry_cols[finite], data[finite], shape
+
+
+def _indptr(entry_rows, n_rows):
+    """Get the index pointer of n_rows rows, from the sorted row of each entry."""
+    return np.concatenate(([0], np.cumsum(np.bincount(entry_rows, minlength=n_rows))))
+
+
+def _check_dtype(dtype):
+    """Return dtype as a np.dtype, making sure it is supported by the solver."""
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype(np.double), np.dtype(np.float32)):
+        raise ValueError("expected dtype float32 or float64, got %s" % (dtype,))
+    return dtype
@@ -1,11 +1,53 @@
+import queue
+import threading
+
 import numpy as np
 
 from _augment import _solve, augment
 from py_lapjv import augment as lapjv_augment
-from py_lapjv import lapjv
+from py_lapjv import augment_added_cols as lapjv_augment_added_cols
+from py_lapjv import augment_changed as lapjv_augment_changed
+from py_lapjv import augment_masked as lapjv_augment_masked
+from py_lapjv import augment_removed_rows as lapjv_augment_removed_rows
+from py_lapjv import bottleneck as lapjv_bottleneck
+from py_lapjv import capacitated as lapjv_capacitated
+from py_lapjv import candidate_cols as lapjv_candidate_cols
+from py_lapjv import cardinality as lapjv_cardinality
+from py_lapjv import lapjv, lapjv_small
+from py_lapjv import leave_one_out as lapjv_leave_one_out
+from py_lapjv import unassigned as lapjv_unassigned
+
+from . import _util, profiling
+
+# The largest number of rows and columns solved by lapjv_small.
+_SMALL = 8
+
+# The number of entries in the blocks of solve(..., decompose=True) from which
+# they are solved in parallel.
+_PARALLEL_BLOCKS_SIZE = 2 ** 18
+
+# Problems with at least this many times more columns than rows are solved on
+# their candidate columns, as long as those are at most half of the columns.
+_WIDE = 2
 
+# The relative tolerance within which solve_path_breakpoints takes two costs
+# to be equal.
+_PATH_RTOL = 1e-9
 
-def solve(cost_matrix, maximize=False):
+# Put on the queue of solve_iter after the last matrix.
+_DONE = object()
+
+
+def solve(
+    cost_matrix,
+    maximize=False,
+    return_stats=False,
+    cache=None,
+    decompose=False,
+    k=None,
+    row_unassigned_cost=None,
+    col_unassigned_cost=None,
+):
     """Solve the linear sum assignment based on the cost matrix. The return
        value is the same as scipy.optimize.linear_sum_assignment.
 
@@ -13,6 +55,28 @@ def solve(cost_matrix, maximize=False):
     ----------
     cost_matrix : 2darray
          A matrix of costs.
+    maximize : bool, optional
+        Calculate a maximum weight matching if true.
+    return_stats : bool, optional
+        Also return the statistics of the solver. They are only collected
+        when asked for, so they cost nothing otherwise.
+    cache : laptools.cache.Cache, optional
+        A cache in which to look up the assignment first, and to store it
+        along with the duals ``v`` of the solver otherwise, which are left
+        out for k pairs. It is bypassed when return_stats is true.
+    decompose : bool, optional
+        Split the cost matrix into the blocks connected by its finite entries
+        first, and solve each block on its own, in parallel if they are large.
+        This pays off for gated cost matrices, most entries of which are
+        ``inf``.
+    k : int, optional
+        Assign only k pairs, at the least total cost of any k pairs, instead
+        of ``min(cost_matrix.shape)`` pairs.
+    row_unassigned_cost, col_unassigned_cost : float or 1darray, optional
+        The finite cost of leaving each row, or each column, unassigned, e.g.
+        of a missed detection or a false alarm when tracking. If either is
+        given, rows and columns are only assigned when that is cheaper, and
+        the other defaults to zero.
 
     Returns
     -------
@@ -21,47 +85,831 @@ def solve(cost_matrix, maximize=False):
         the optimal assignment. The cost of the assignment can be computed
         as ``cost_matrix[row_ind, col_ind].sum()``. The row indices will be
         sorted; in the case of a square cost matrix they will be equal to
-        ``numpy.arange(cost_matrix.shape[0])``.
+        ``numpy.arange(cost_matrix.shape[0])``, unless k is given.
+    col4row, row4col : array
+        Returned instead of row_ind, col_ind if unassigned costs are given.
+        The column assigned to each row, and the row assigned to each column,
+        which are -1 for the rows and columns left unassigned.
+    stats : dict
+        Only returned if `return_stats` is true. The number of
+        ``augmentations``, one per row of the smaller side, of
+        ``dijkstra_iterations``, of ``columns_scanned`` and of ``ties`` for
+        the minimum reduced cost, the ``path_lengths`` histogram whose entry
+        k counts the augmenting paths of k rows, and the
+        ``init_time`` and ``augment_time`` in seconds.
+
+    Notes
+    -----
+    Numeric arrays of at most 8 rows and columns are solved by a single native
+    call, and only its total time is profiled, as ``solve.native``.
+
+    Problems with at least twice as many columns as rows are solved on the
+    columns which are among the ``n`` cheapest of one of their ``n`` rows,
+    which contain an optimal assignment. They are looked for first, which is
+    given up on as soon as they make up more than half of the columns.
+
+    Assignments of k pairs are found by k successive shortest augmenting
+    paths, each from any of the rows left unassigned, on the cost matrix as it
+    is rather than padded with dummy rows and columns. Each path only scans
+    the rows assigned so far, so that the time taken grows with k. So are
+    assignments with unassigned costs, on the costs less those of the row and
+    the column, until the next path would not lower the total cost.
     """
-    cost_matrix = np.array(cost_matrix)
+    prof = profiling.current()
+    if (
+        type(cost_matrix) is np.ndarray
+        and cost_matrix.ndim == 2
+        and cost_matrix.shape[0] <= _SMALL
+        and cost_matrix.shape[1] <= _SMALL
+        and cost_matrix.dtype.kind in "biuf"
+        and cache is None
+        and not return_stats
+        and not decompose
+        and k is None
+        and row_unassigned_cost is None
+        and col_unassigned_cost is None
+    ):
+        with prof.phase("solve.native"):
+            return lapjv_small(cost_matrix, maximize)
 
-    # The following are taken from scipy implementation.
-    if len(cost_matrix.shape) != 2:
-        raise ValueError(
-            "expected a matrix (2-d array), got a %r array" % (cost_matrix.shape,)
+    cost_matrix = _check_cost_matrix(cost_matrix, maximize)
+    if k is not None:
+        if not 0 <= k <= min(cost_matrix.shape):
+            raise ValueError(
+                "expected k between 0 and %d, got %r" % (min(cost_matrix.shape), k)
+            )
+        if decompose:
+            raise ValueError("k is not supported with decompose")
+        if k == min(cost_matrix.shape):
+            k = None
+    if row_unassigned_cost is not None or col_unassigned_cost is not None:
+        if k is not None or decompose:
+            raise ValueError("k and decompose are not supported with unassigned costs")
+        row_cost = _unassigned_cost(
+            row_unassigned_cost, cost_matrix.shape[0], maximize, "row_unassigned_cost"
         )
+        col_cost = _unassigned_cost(
+            col_unassigned_cost, cost_matrix.shape[1], maximize, "col_unassigned_cost"
+        )
+        return _solve_unassigned(cost_matrix, row_cost, col_cost, return_stats, cache)
 
-    if not (
-        np.issubdtype(cost_matrix.dtype, np.number)
-        or cost_matrix.dtype == np.dtype(np.bool)
-    ):
-        raise ValueError(
-            "expected a matrix containing numerical entries, got %s"
-            % (cost_matrix.dtype,)
+    if cache is not None and not return_stats:
+        # Maximizing is already accounted for by negating the cost matrix, and
+        # k only keys assignments of fewer pairs.
+        options = {} if k is None else {"k": k}
+        key = cache.key("lap.solve", cost_matrix, **options)
+        results = cache.get(key)
+        if results is not None:
+            return _assignment(results["col4row"], cost_matrix.shape)
+
+    # If the cost_matrix has more rows than columns, solve its transpose.
+    if cost_matrix.shape[1] < cost_matrix.shape[0]:
+        problem = cost_matrix.T
+    else:
+        problem = cost_matrix
+
+    # The duals are only worth extending to pruned columns for the cache.
+    duals = cache is not None and not return_stats
+    if decompose:
+        col4row, *stats = _solve_blocks(problem, return_stats, duals)
+    elif k is not None:
+        with prof.phase("solve.native"):
+            col4row, *stats = lapjv_cardinality(problem, k, return_stats)
+        duals = False
+    else:
+        with prof.phase("solve.native"):
+            col4row, *stats = _solve_pruned(problem, return_stats, duals)
+
+    if duals:
+        v, *stats = stats
+
+    if cache is not None and not return_stats:
+        if duals:
+            cache.put(key, col4row=col4row, v=v)
+        else:
+            cache.put(key, col4row=col4row)
+
+    return (*_assignment(col4row, cost_matrix.shape), *stats)
+
+
+def solve_iter(matrix_iterable, prefetch=1, maximize=False):
+    """Solve the linear sum assignment of each of a sequence of cost matrices,
+       overlapping the construction of the next ones with solving.
+
+    The matrices are pulled from matrix_iterable, converted and validated on
+    a helper thread, while the native solver, which releases the GIL, solves
+    the current one. This pays off when the matrices are built by numpy,
+    e.g. from pairwise distances, which also largely runs without the GIL.
+
+    Parameters
+    ----------
+    matrix_iterable : iterable of 2darrays
+        The cost matrices, which are pulled from it no further ahead than
+        prefetch matrices.
+    prefetch : int, optional
+        The number of matrices ready to be solved to keep in memory. At most
+        prefetch + 2 matrices are in flight, counting the one being solved
+        and the one being built.
+    maximize : bool, optional
+        Calculate maximum weight matchings if true.
+
+    Yields
+    ------
+    row_ind, col_ind : array
+        The optimal assignment of each cost matrix in turn, as for solve.
+        Errors in building or validating a matrix are raised when its
+        assignment is due.
+
+    Notes
+    -----
+    Only ``solve.native`` is profiled, as the conversion and validation of
+    the matrices happen on the helper thread.
+    """
+    if prefetch < 1:
+        raise ValueError("expected prefetch to be at least 1, got %r" % (prefetch,))
+    ready = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the results are abandoned, rather than wait for room.
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for cost_matrix in matrix_iterable:
+                if not put((_check_cost_matrix(cost_matrix, maximize), None)):
+                    return
+        except Exception as e:
+            put((None, e))
+        else:
+            put((_DONE, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            cost_matrix, error = ready.get()
+            if error is not None:
+                raise error
+            if cost_matrix is _DONE:
+                return
+            if cost_matrix.shape[1] < cost_matrix.shape[0]:
+                problem = cost_matrix.T
+            else:
+                problem = cost_matrix
+            with profiling.current().phase("solve.native"):
+                (col4row,) = _solve_pruned(problem, False)
+            yield _assignment(col4row, cost_matrix.shape)
+    finally:
+        stop.set()
+
+
+def solve_capacitated(
+    cost_matrix, row_capacity=1, col_capacity=1, maximize=False, merge_identical=True
+):
+    """Solve the linear sum assignment problem in which rows and columns have
+       capacities.
+
+    Row i is assigned row_capacity[i] units, and column j takes at most
+    col_capacity[j] units, or the other way around if the columns have less
+    capacity in total. This is the lsap of the cost matrix with row i repeated
+    row_capacity[i] times and column j repeated col_capacity[j] times, but it
+    is solved on the compact cost matrix.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+    row_capacity : int or 1darray of int, optional
+        The capacity of each row, or of every row.
+    col_capacity : int or 1darray of int, optional
+        The capacity of each column, or of every column.
+    maximize : bool, optional
+        Calculate a maximum weight matching if true.
+    merge_identical : bool, optional
+        Merge identical rows, and identical columns, into one of their
+        combined capacity before solving, e.g. for fleets of identical
+        vehicles.
+
+    Returns
+    -------
+    row_ind, col_ind : array
+        The row and column of each unit of the optimal assignment, sorted by
+        row. A row appears once for each of its units which is assigned, and
+        may be assigned to the same column more than once. The cost of the
+        assignment is ``cost_matrix[row_ind, col_ind].sum()``.
+    """
+    cost_matrix = _check_cost_matrix(cost_matrix, maximize)
+    n_rows, n_cols = cost_matrix.shape
+    row_capacity = _capacity(row_capacity, n_rows)
+    col_capacity = _capacity(col_capacity, n_cols)
+
+    if merge_identical:
+        cost_matrix, row_inverse = np.unique(cost_matrix, axis=0, return_inverse=True)
+        cost_matrix, col_inverse = np.unique(cost_matrix, axis=1, return_inverse=True)
+        # Older numpy versions return the inverse of an axis as a 2darray.
+        row_inverse, col_inverse = row_inverse.ravel(), col_inverse.ravel()
+        group_row_capacity = np.bincount(
+            row_inverse, weights=row_capacity, minlength=len(cost_matrix)
+        ).astype(np.int64)
+        group_col_capacity = np.bincount(
+            col_inverse, weights=col_capacity, minlength=cost_matrix.shape[1]
+        ).astype(np.int64)
+    else:
+        group_row_capacity, group_col_capacity = row_capacity, col_capacity
+
+    # The side with less capacity in total is assigned in full.
+    if group_row_capacity.sum() <= group_col_capacity.sum():
+        flow, _ = lapjv_capacitated(cost_matrix, group_row_capacity, group_col_capacity)
+    else:
+        flow, _ = lapjv_capacitated(
+            cost_matrix.T, group_col_capacity, group_row_capacity
         )
+        flow = flow.T
+
+    # Expand the flow into one row and column for each unit.
+    rows, cols = np.nonzero(flow)
+    units = flow[rows, cols]
+    row_ind, col_ind = np.repeat(rows, units), np.repeat(cols, units)
+
+    if merge_identical:
+        row_ind = _ungroup(row_ind, row_inverse, row_capacity)
+        col_ind = _ungroup(col_ind, col_inverse, col_capacity)
+        order = np.lexsort((col_ind, row_ind))
+        row_ind, col_ind = row_ind[order], col_ind[order]
 
-    if maximize:
-        cost_matrix = -cost_matrix
+    return row_ind, col_ind
 
-    if np.any(np.isneginf(cost_matrix) | np.isnan(cost_matrix)):
-        raise ValueError("matrix contains invalid numeric entries")
 
-    cost_matrix = cost_matrix.astype(np.double)
-    a = np.arange(np.min(cost_matrix.shape))
+def leave_one_out_costs(cost_matrix, axis=0, maximize=False, n_jobs=None):
+    """Find the total cost of the optimal assignment with each row, or each
+       column, left out.
+
+    The output of this function is equivalent to, but far faster than,
+
+    >>> def leave_one_out_costs(cost_matrix, axis=0):
+    ...     totals = []
+    ...     for k in range(cost_matrix.shape[axis]):
+    ...         sub_matrix = np.delete(cost_matrix, k, axis=axis)
+    ...         row_ind, col_ind = lap.solve(sub_matrix)
+    ...         totals.append(sub_matrix[row_ind, col_ind].sum())
+    ...     return np.array(totals)
+
+    e.g. for VCG payments, which charge each row the cost its presence
+    imposes on the others. The full problem is solved once, and each of the
+    problems with a row or column of the smaller side left out is warm
+    started from its solution, spread over n_jobs threads. Leaving out a
+    column of the larger side only reassigns the row it was assigned to,
+    which is found for all of them at once.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+    axis : int, optional
+        Leave out each row if 0, or each column if 1.
+    maximize : bool, optional
+        Calculate maximum weight matchings if true.
+    n_jobs : int, optional
+        The number of threads to use. Defaults to the number of cpus.
+
+    Returns
+    -------
+    1darray
+        The total cost of the optimal assignment of the cost matrix with the
+        k'th row, or column, removed. It is ``inf``, or ``-inf`` when
+        maximizing, if that problem is infeasible.
+    """
+    if axis not in (0, 1):
+        raise ValueError("expected axis to be 0 or 1, got %r" % (axis,))
+    cost_matrix = _check_cost_matrix(cost_matrix, maximize)
+    problem = cost_matrix if axis == 0 else cost_matrix.T
+
+    with profiling.current().phase("solve.native"):
+        totals = lapjv_leave_one_out(problem, n_jobs or 0)
+    return -totals if maximize else totals
+
+
+def solve_bottleneck(cost_matrix, maximize=False, min_sum=False):
+    """Solve the bottleneck assignment problem, which minimizes the largest
+       cost assigned rather than their sum.
+
+    The threshold on the costs is raised only as far as the rows left
+    unassigned need, and each of them is assigned by an augmenting path of
+    entries below the threshold, so that the matching grows incrementally
+    instead of being found again for every threshold.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+    maximize : bool, optional
+        Maximize the smallest weight assigned if true.
+    min_sum : bool, optional
+        Also minimize, or maximize, the total cost among the assignments
+        whose largest cost is the bottleneck.
 
-    # If the cost_matrix has more rows than columns
+    Returns
+    -------
+    row_ind, col_ind : array
+        The assignment, as for solve. Its bottleneck cost is
+        ``cost_matrix[row_ind, col_ind].max()``, or ``.min()`` when
+        maximizing.
+    """
+    cost_matrix = _check_cost_matrix(cost_matrix, maximize)
     if cost_matrix.shape[1] < cost_matrix.shape[0]:
-        # Here, col4row holds the rows in cost_matrix that are in the assignment
-        col4row, _, _ = lapjv(cost_matrix.T)
+        problem = cost_matrix.T
+    else:
+        problem = cost_matrix
+
+    prof = profiling.current()
+    with prof.phase("solve.native"):
+        col4row, threshold = lapjv_bottleneck(problem)
+        if min_sum and problem.shape[0] > 0:
+            restricted = np.where(problem <= threshold, problem, np.inf)
+            (col4row,) = _solve_pruned(restricted, False)
+    return _assignment(col4row, cost_matrix.shape)
+
+
+def solve_path(cost_matrix, direction, lambdas, maximize=False):
+    """Solve the linear sum assignment problem of
+       ``cost_matrix + lambda * direction`` for each of the lambdas.
+
+    The first problem is solved from scratch, and each of the others is warm
+    started from the solution of the one before it. Only the rows which its
+    dual variables no longer price out are re-augmented, so lambdas close to
+    each other, e.g. sorted ones, are solved the fastest.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+    direction : 2darray
+        A matrix of costs of the same shape, weighted by lambda. An ``inf``
+        entry of either matrix rules out its pair for every lambda.
+    lambdas : 1darray
+        The weights of direction.
+    maximize : bool, optional
+        Calculate maximum weight matchings if true.
+
+    Returns
+    -------
+    list of tuples
+        The ``row_ind, col_ind`` of ``solve`` for each of the lambdas.
+    """
+    path = _Path(cost_matrix, direction, maximize)
+    assignments = []
+    for lam in lambdas:
+        path.solve(lam)
+        assignments.append(path.assignment())
+    return assignments
+
+
+def solve_path_breakpoints(
+    cost_matrix, direction, lambda_min, lambda_max, maximize=False
+):
+    """Find the lambdas at which the optimal assignment of
+       ``cost_matrix + lambda * direction`` changes.
+
+    The optimal total cost is a piecewise linear function of lambda, with one
+    piece for each of the optimal assignments. The pieces are found by
+    solving at the lambda where the pieces at the ends of an interval
+    intersect. Either that is a breakpoint, or a new piece is found there,
+    which splits the interval in two. This takes at most two solves per
+    breakpoint, each warm started as in ``solve_path``.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs.
+    direction : 2darray
+        A matrix of costs of the same shape, weighted by lambda. An ``inf``
+        entry of either matrix rules out its pair for every lambda.
+    lambda_min, lambda_max : float
+        The range of lambdas in which to look for breakpoints.
+    maximize : bool, optional
+        Calculate maximum weight matchings if true.
+
+    Returns
+    -------
+    breakpoints : 1darray
+        The sorted lambdas in (lambda_min, lambda_max) at which the optimal
+        assignment changes.
+    assignments : list of tuples
+        The ``row_ind, col_ind`` of an assignment which is optimal between
+        each pair of consecutive breakpoints, one more than there are of them.
+        The first and last are optimal from lambda_min and up to lambda_max.
+    """
+    if not lambda_min <= lambda_max:
+        raise ValueError("expected lambda_min <= lambda_max")
+    path = _Path(cost_matrix, direction, maximize)
+
+    def piece(lam):
+        path.solve(lam)
+        return lam, path.line(), path.assignment()
+
+    left = piece(lambda_min)
+    breakpoints, assignments = [], [left[2]]
+    # The intervals still to be looked at, the leftmost last.
+    intervals = [(left, piece(lambda_max))]
+    while intervals:
+        a, b = intervals.pop()
+        (lam_a, line_a, _), (lam_b, line_b, assignment_b) = a, b
+        # The optimal total cost is concave, so the slope of the left piece is
+        # larger, unless they are the same piece.
+        if _same_line(line_a, line_b) or line_a[1] <= line_b[1]:
+            continue
+        lam = (line_b[0] - line_a[0]) / (line_a[1] - line_b[1])
+        mid = piece(min(max(lam, lam_a), lam_b))
+        # The terms of the costs, rather than the costs, set the tolerance.
+        value_a = line_a[0] + mid[0] * line_a[1]
+        value_mid = mid[1][0] + mid[0] * mid[1][1]
+        scale = abs(line_a[0]) + abs(mid[0] * line_a[1])
+        if (
+            value_a - value_mid <= _PATH_RTOL * scale
+            or _same_line(mid[1], line_a)
+            or _same_line(mid[1], line_b)
+        ):
+            breakpoints.append(mid[0])
+            assignments.append(assignment_b)
+        else:
+            intervals.append((mid, b))
+            intervals.append((a, mid))
+
+    return np.array(breakpoints), assignments
+
+
+class _Path:
+    """The warm started solutions of ``cost_matrix + lambda * direction``."""
+
+    def __init__(self, cost_matrix, direction, maximize):
+        cost_matrix = _check_cost_matrix(cost_matrix, maximize)
+        direction = _check_cost_matrix(direction, maximize)
+        if direction.shape != cost_matrix.shape:
+            raise ValueError(
+                "expected direction to have shape %r, got %r"
+                % (cost_matrix.shape, direction.shape)
+            )
+        # Rule out the pairs with an infinite cost in either matrix, rather
+        # than leave inf * 0 to be nan, or inf * -1 to be -inf.
+        forbidden = np.isinf(cost_matrix) | np.isinf(direction)
+        cost_matrix[forbidden] = np.inf
+        direction[forbidden] = 0
+        self.shape = cost_matrix.shape
+        # If the cost_matrix has more rows than columns, solve its transpose.
+        if self.shape[1] < self.shape[0]:
+            cost_matrix, direction = cost_matrix.T, direction.T
+        self.cost_matrix, self.direction = cost_matrix, direction
+        self.problem = np.empty(cost_matrix.shape)
+        self.solution = None
+
+    def solve(self, lam):
+        """Solve the problem of lam, warm started from the last one solved."""
+        if not np.isfinite(lam):
+            raise ValueError("expected finite lambdas, got %r" % (lam,))
+        problem = np.multiply(self.direction, lam, out=self.problem)
+        problem += self.cost_matrix
+
+        with profiling.current().phase("solve.native"):
+            if self.solution is None:
+                self.solution = lapjv(problem)
+            else:
+                lapjv_augment_changed(problem, *self.solution)
+
+    def assignment(self):
+        """The row_ind, col_ind of the last solution."""
+        return _assignment(self.solution[0].copy(), self.shape)
 
+    def line(self):
+        """The total cost of the last solution as the line (intercept, slope)."""
+        rows, cols = np.arange(len(self.solution[0])), self.solution[0]
+        return (
+            self.cost_matrix[rows, cols].sum(),
+            self.direction[rows, cols].sum(),
+        )
+
+
+def _same_line(line_a, line_b):
+    return np.allclose(line_a, line_b, rtol=_PATH_RTOL, atol=0)
+
+
+def _solve_blocks(problem, return_stats, duals=False):
+    """Solve problem, with no more rows than columns, block by block.
+
+    Returns
+    -------
+    col4row : 1darray
+        The assignment, stitched together from those of the blocks.
+    v : 1darray
+        Only returned if duals is true. The duals of lapjv, stitched together
+        from those of the blocks, and zero outside of them.
+    stats : dict
+        Only returned if return_stats is true. The sum of the statistics of
+        the blocks.
+    """
+    prof = profiling.current()
+    with prof.phase("solve.decompose"):
+        blocks = _util.connected_blocks(problem)
+    # Every row has to be assigned within its own block.
+    if any(len(rows) > len(cols) for rows, cols in blocks):
+        raise ValueError("cost matrix is infeasible")
+    blocks = [(rows, cols) for rows, cols in blocks if len(rows) > 0]
+    prof.count("solve.blocks", len(blocks))
+
+    def solve_block(block):
+        rows, cols = block
+        return _solve_pruned(problem[np.ix_(rows, cols)], return_stats, duals)
+
+    with prof.phase("solve.native"):
+        size = sum(len(rows) * len(cols) for rows, cols in blocks)
+        results = _util.map_blocks(solve_block, blocks, size >= _PARALLEL_BLOCKS_SIZE)
+
+    col4row = np.empty(problem.shape[0], dtype=np.int64)
+    # The columns outside of the blocks are unassigned, with zero duals.
+    v = np.zeros(problem.shape[1])
+    for (rows, cols), (block_col4row, *block_v) in zip(blocks, results):
+        col4row[rows] = cols[block_col4row]
+        if duals:
+            # Shift the duals of square blocks, which are only defined up to a
+            # shift, to at most zero as in the other blocks.
+            v[cols] = block_v[0] - (block_v[0].max() if len(rows) == len(cols) else 0)
+
+    solution = (col4row, v) if duals else (col4row,)
+    if not return_stats:
+        return solution
+    return (*solution, _sum_stats([result[-1] for result in results]))
+
+
+def _solve_unassigned(cost_matrix, row_cost, col_cost, return_stats, cache):
+    """Solve cost_matrix, whose rows and columns may be left unassigned.
+
+    Returns
+    -------
+    col4row, row4col : 1darray
+        The column assigned to each row, and the row assigned to each column,
+        -1 if unassigned.
+    stats : dict
+        Only returned if return_stats is true.
+    """
+    if cache is not None and not return_stats:
+        unassigned = cache.key("unassigned", np.concatenate([row_cost, col_cost]))
+        key = cache.key("lap.solve", cost_matrix, unassigned=unassigned)
+        results = cache.get(key)
+        if results is not None:
+            return results["col4row"], results["row4col"]
+
+    # Solve the transpose of a tall cost matrix, as for solve.
+    transpose = cost_matrix.shape[1] < cost_matrix.shape[0]
+    with profiling.current().phase("solve.native"):
+        if transpose:
+            row4col, col4row, *stats = lapjv_unassigned(
+                cost_matrix.T, col_cost, row_cost, return_stats
+            )
+        else:
+            col4row, row4col, *stats = lapjv_unassigned(
+                cost_matrix, row_cost, col_cost, return_stats
+            )
+
+    if cache is not None and not return_stats:
+        cache.put(key, col4row=col4row, row4col=row4col)
+    return (col4row, row4col, *stats)
+
+
+def _unassigned_cost(unassigned_cost, n, maximize, name):
+    """Get the cost of leaving each of n rows or columns unassigned."""
+    if unassigned_cost is None:
+        return np.zeros(n)
+    try:
+        unassigned_cost = np.broadcast_to(np.asarray(unassigned_cost, np.double), (n,))
+    except ValueError:
+        raise ValueError("expected %s to be a float or to have %d entries" % (name, n))
+    if not np.all(np.isfinite(unassigned_cost)):
+        raise ValueError("%s contains invalid numeric entries" % (name,))
+    return -unassigned_cost if maximize else unassigned_cost
+
+
+def _solve_pruned(problem, return_stats, duals=False):
+    """Solve problem, with no more rows than columns, on its candidate columns.
+
+    Only wide problems are pruned, see the notes of solve.
+
+    Returns
+    -------
+    col4row : 1darray
+        The column assigned to each row.
+    v : 1darray
+        Only returned if duals is true. The duals of the columns of problem,
+        at most zero and zero for the unassigned columns, as left by lapjv.
+    stats : dict
+        Only returned if return_stats is true. The statistics of the solver,
+        on the pruned problem.
+    """
+    n_rows, n_cols = problem.shape
+    if n_rows > 0 and n_cols >= _WIDE * n_rows:
+        candidate = lapjv_candidate_cols(problem, n_rows, n_cols // 2)
+        if candidate is not None:
+            cols = np.flatnonzero(candidate)
+            profiling.current().count("solve.pruned_cols", n_cols - len(cols))
+            col4row, _, v, *stats = lapjv(problem[:, cols], return_stats=return_stats)
+            if not duals:
+                return (cols[col4row], *stats)
+            return (*_extend_duals(problem, cols, col4row, v), *stats)
+    col4row, _, v, *stats = lapjv(problem, return_stats=return_stats)
+    if not duals:
+        return (col4row, *stats)
+    return (col4row, v, *stats)
+
+
+def _extend_duals(problem, cols, col4row, v):
+    """Extend the solution of ``problem[:, cols]`` to the duals of problem.
+
+    The other columns are added to it as by solve_lsap_with_added_cols, which
+    only re-augments the rows whose duals they violate.
+
+    Returns
+    -------
+    col4row, v : 1darray
+        The solution of problem.
+    """
+    n_rows, n_cols = problem.shape
+    # The duals of a square problem are only defined up to a shift.
+    if len(cols) == n_rows:
+        v = v - v.max()
+    col4row = cols[col4row]
+    row4col = np.full(n_cols, -1, dtype=np.int64)
+    row4col[col4row] = np.arange(n_rows)
+    full_v = np.zeros(n_cols)
+    full_v[cols] = v
+    added = np.ones(n_cols, dtype=bool)
+    added[cols] = False
+    lapjv_augment_added_cols(problem, np.flatnonzero(added), col4row, row4col, full_v)
+    return col4row, full_v
+
+
+def _sum_stats(stats):
+    """Sum the statistics of several solves."""
+    total = {
+        key: sum(s[key] for s in stats)
+        for key in [
+            "augmentations",
+            "dijkstra_iterations",
+            "columns_scanned",
+            "ties",
+            "init_time",
+            "augment_time",
+        ]
+    }
+    path_lengths = np.zeros(max([len(s["path_lengths"]) for s in stats] + [0]), int)
+    for s in stats:
+        path_lengths[: len(s["path_lengths"])] += s["path_lengths"]
+    total["path_lengths"] = path_lengths
+    return total
+
+
+def _capacity(capacity, n):
+    """Get capacity, a scalar or one capacity for each of n, as a 1darray."""
+    capacity = np.asarray(capacity)
+    if capacity.ndim == 0:
+        capacity = np.full(n, capacity)
+    if capacity.shape != (n,) or not np.issubdtype(capacity.dtype, np.integer):
+        raise ValueError("expected %d integer capacities, got %r" % (n, capacity))
+    if np.any(capacity < 0):
+        raise ValueError("expected non-negative capacities, got %r" % (capacity,))
+    return capacity.astype(np.int64)
+
+
+def _ungroup(groups, inverse, capacity):
+    """Map the units of merged groups to the members of the groups.
+
+    Parameters
+    ----------
+    groups : 1darray
+        The group of each unit.
+    inverse : 1darray
+        The group of each member.
+    capacity : 1darray
+        The capacity of each member.
+
+    Returns
+    -------
+    1darray
+        The member of each unit. The units of a group fill the capacity of its
+        members one after the other, which is optimal since they are identical.
+    """
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    rank = np.arange(len(groups)) - np.searchsorted(sorted_groups, sorted_groups)
+
+    # Every member takes as many slots as its capacity, sorted by group.
+    members = np.argsort(inverse, kind="stable")
+    slots = np.repeat(members, capacity[members])
+    first_slot = np.searchsorted(inverse[slots], sorted_groups)
+
+    ungrouped = np.empty_like(groups)
+    ungrouped[order] = slots[first_slot + rank]
+    return ungrouped
+
+
+def _check_cost_matrix(cost_matrix, maximize=False):
+    """Get cost_matrix as a float64 array of costs to minimize, validating it."""
+    prof = profiling.current()
+
+    with prof.phase("solve.convert"):
+        cost_matrix = np.array(cost_matrix)
+
+    with prof.phase("solve.validate"):
+        # The following are taken from scipy implementation.
+        if len(cost_matrix.shape) != 2:
+            raise ValueError(
+                "expected a matrix (2-d array), got a %r array" % (cost_matrix.shape,)
+            )
+
+        if not (
+            np.issubdtype(cost_matrix.dtype, np.number)
+            or cost_matrix.dtype == np.dtype(np.bool)
+        ):
+            raise ValueError(
+                "expected a matrix containing numerical entries, got %s"
+                % (cost_matrix.dtype,)
+            )
+
+    with prof.phase("solve.convert"):
+        if maximize:
+            cost_matrix = -cost_matrix
+
+    with prof.phase("solve.validate"):
+        if np.any(np.isneginf(cost_matrix) | np.isnan(cost_matrix)):
+            raise ValueError("matrix contains invalid numeric entries")
+
+    with prof.phase("solve.convert"):
+        return cost_matrix.astype(np.double)
+
+
+def _assignment(col4row, shape):
+    """Get the row_ind, col_ind of solve from the lapjv solution col4row.
+
+    For a cost matrix with more rows than columns, col4row is the solution of
+    its transpose, and holds the rows in the assignment. Rows left unassigned,
+    by an assignment of fewer pairs, have a column of -1.
+    """
+    a = np.arange(min(shape))
+    if len(col4row) and col4row.min() < 0:
+        a = np.flatnonzero(col4row >= 0)
+        col4row = col4row[a]
+    if shape[1] < shape[0]:
         # Sort the row indexes in the assignment
         idx_sorted = np.argsort(col4row)
-
-        return (col4row[idx_sorted], a[idx_sorted])
-    # If the cost_matrix has more columns than rows
+        return col4row[idx_sorted], a[idx_sorted]
     else:
-        col4row, _, _ = lapjv(cost_matrix)
-        return (a, col4row)
+        return a, col4row
+
+
+def candidate_cols(cost_matrix, n_removed_cols=0):
+    """Find columns which suffice for the optimal assignment of a wide problem.
+
+    Some optimal assignment only uses the columns which are among the
+    ``n_rows + n_removed_cols`` cheapest of some row, even after any
+    n_removed_cols of the columns are removed. Pass them, along with the
+    assigned columns, as the col_mask of solve_lsap_with_removed_col(s) to
+    skip the rest of the columns of very wide problems.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+        A matrix of costs, with no more rows than columns.
+    n_removed_cols : int, optional
+        The number of columns which may be removed.
+
+    Returns
+    -------
+    1darray(bool)
+        Whether each column is a candidate.
+
+    Notes
+    -----
+    The dual variables of the columns outside of col_mask are left as they
+    were, so they may no longer be feasible afterwards.
+
+    Examples
+    --------
+    >>> col_mask = lap.candidate_cols(cost_matrix, n_removed_cols=10)
+    >>> col_mask[col4row] = True
+    >>> lap.solve_lsap_with_removed_cols(
+    ...     cost_matrix, cols_removed, row4col, col4row, v, col_mask=col_mask
+    ... )
+    """
+    cost_matrix = np.asarray(cost_matrix)
+    if cost_matrix.ndim != 2 or cost_matrix.shape[0] > cost_matrix.shape[1]:
+        raise ValueError(
+            "expected a matrix with no more rows than columns, got a %r array"
+            % (cost_matrix.shape,)
+        )
+    return lapjv_candidate_cols(cost_matrix, cost_matrix.shape[0] + n_removed_cols)
 
 
 def solve_lsap_with_removed_row(
@@ -103,42 +951,19 @@ def solve_lsap_with_removed_row(
     if np.all(freed_col_costs >= cost_matrix[np.arange(n_rows), col4row]):
         return row4col, col4row, v
 
-    # Update the cost matrix to reflect the row removal.
-    # Create a copy of the cost matrix and update all costs associated with
-    # row_removed to be zero. We don't modify the original cost values.
-    cost_matrix_copy = cost_matrix.copy()
-    cost_matrix_copy[row_removed] = 0
-
-    # Update the dual variables
-    # u[row_removed] = np.min(cost_matrix_copy[row_removed] - v)
-
     # Perform another augmenting step, only on the sub-cost-matrix that
     # involves the rows and columns in the original optimal assignment.
-    # The row to be removed have all of its associated costs set to 0.
-    sub_cost_matrix = cost_matrix_copy[:, col4row]
-    sub_v = v[col4row]
-
-    # Remove the assignment associated with the removed row. Note that in the
-    # submatrix, the removed row and the freed up column have the same index.
-    sub_col4row = np.arange(n_rows)
-    sub_col4row[row_removed] = -1
-    sub_row4col = np.arange(n_rows)
-    sub_row4col[row_removed] = -1
-
-    # Find the shortest augmenting path for the sub square lsap and augment.
-    lapjv_augment(sub_cost_matrix, row_removed, sub_col4row, sub_row4col, sub_v)
-
-    # Update the original assignment
-    # Note: update every variable that depends on col4row for indexing first.
-    row4col[col4row] = sub_row4col
-    v[col4row] = sub_v
-    col4row[:] = col4row[sub_col4row]
+    # The row to be removed have all of its associated costs treated as 0.
+    # The sub-cost-matrix is never formed: the augment reads the entries it
+    # needs straight from cost_matrix, whatever its memory layout, and updates
+    # the assignment and dual variables in place.
+    lapjv_augment_removed_rows(cost_matrix, row_removed, col4row, row4col, v)
 
     return row4col, col4row, v
 
 
 def solve_lsap_with_removed_col(
-    cost_matrix, col_removed, row4col, col4row, v, modify_val=True
+    cost_matrix, col_removed, row4col, col4row, v, modify_val=True, col_mask=None
 ):
     """Solve the sub linear sum assignment problem with one column removed.
 
@@ -157,6 +982,11 @@ def solve_lsap_with_removed_col(
              Specify the columns to which each row is matched with.
     v : 1darray
         The dual cost vector for columns.
+    modify_val : bool, optional
+        A flag that indicates whether variables are modified in place.
+    col_mask : 1darray(bool), optional
+        The columns which may be used in the new assignment. Defaults to all
+        of the columns. col_removed is never used, regardless of col_mask.
     """
     row_freed = row4col[col_removed]
 
@@ -169,18 +999,194 @@ def solve_lsap_with_removed_col(
     if not modify_val:
         row4col, col4row, v = row4col.copy(), col4row.copy(), v.copy()
 
-    # Update the cost matrix to reflect the column removal.
-    # Create a copy of the cost matrix and update all costs associated with
-    # col_removed to be infinity. We don't modify the original cost values.
-    # Note: need to make sure that cost_matrix has dtype float.
-    cost_matrix_copy = cost_matrix.copy()
-    cost_matrix_copy[:, col_removed] = np.inf
+    # Update the column mask to reflect the column removal. The augment skips
+    # masked columns entirely, so the cost matrix is neither copied nor
+    # modified.
+    if col_mask is None:
+        col_mask = np.ones(len(row4col), dtype=bool)
+    else:
+        col_mask = np.array(col_mask, dtype=bool)
+    col_mask[col_removed] = False
 
     # Removed the assignment associated with the removed column.
     col4row[row_freed] = -1
     row4col[col_removed] = -1
 
     # Perform another augmenting step
-    lapjv_augment(cost_matrix_copy, row_freed, col4row, row4col, v)
+    lapjv_augment_masked(cost_matrix, row_freed, col4row, row4col, v, col_mask)
+
+    return row4col, col4row, v
+
+
+def solve_lsap_with_removed_rows(
+    cost_matrix, rows_removed, row4col, col4row, v, modify_val=True
+):
+    """Solve the sub linear sum assignment problem with several rows removed.
+
+    The removed rows are re-augmented together in a single native call, which
+    is equivalent to, but faster than, calling solve_lsap_with_removed_row for
+    each of them in turn.
+
+    Note: the removed rows will still be assigned to columns.
+    Note: While the cost matrix will not be modified, the dual variables would
+          be updated as if the costs of removed rows are uniformly zero.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+         A matrix of costs.
+    rows_removed : 1darray
+         The indices of the rows that are to be removed.
+    row4col: 1darray
+             Specify the rows to which each column is matched with.
+    col4row: 1darray
+             Specify the columns to which each row is matched with.
+    v : 1darray
+        The dual cost vector for columns.
+    modify_val : bool, optional
+        A flag that indicates whether variables are modified in place.
+    """
+    # Copy the variables if they are not modified in place.
+    if not modify_val:
+        row4col, col4row, v = row4col.copy(), col4row.copy(), v.copy()
+
+    lapjv_augment_removed_rows(cost_matrix, rows_removed, col4row, row4col, v)
+
+    return row4col, col4row, v
+
+
+def solve_lsap_with_removed_cols(
+    cost_matrix, cols_removed, row4col, col4row, v, modify_val=True, col_mask=None
+):
+    """Solve the sub linear sum assignment problem with several columns removed.
+
+    All of the rows freed by the removal are re-augmented in a single native
+    call, which is equivalent to, but faster than, calling
+    solve_lsap_with_removed_col for each of the columns in turn.
+
+    Note: While the cost matrix will not be modified, the dual variables would
+          be updated as if the removed columns do not exist.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+         A matrix of costs.
+    cols_removed : 1darray
+         The indices of the columns that are to be removed.
+    row4col: 1darray
+             Specify the rows to which each column is matched with.
+    col4row: 1darray
+             Specify the columns to which each row is matched with.
+    v : 1darray
+        The dual cost vector for columns.
+    modify_val : bool, optional
+        A flag that indicates whether variables are modified in place.
+    col_mask : 1darray(bool), optional
+        The columns which may be used in the new assignment. Defaults to all
+        of the columns. cols_removed are never used, regardless of col_mask.
+    """
+    cols_removed = np.asarray(cols_removed, dtype=int)
+
+    # Copy the variables if they are not modified in place.
+    if not modify_val:
+        row4col, col4row, v = row4col.copy(), col4row.copy(), v.copy()
+
+    if col_mask is None:
+        col_mask = np.ones(len(row4col), dtype=bool)
+    else:
+        col_mask = np.array(col_mask, dtype=bool)
+    col_mask[cols_removed] = False
+
+    # Removed the assignments associated with the removed columns.
+    rows_freed = row4col[cols_removed]
+    rows_freed = rows_freed[rows_freed != -1]
+    col4row[rows_freed] = -1
+    row4col[cols_removed] = -1
+
+    lapjv_augment_masked(cost_matrix, rows_freed, col4row, row4col, v, col_mask)
 
     return row4col, col4row, v
+
+
+def solve_lsap_with_added_rows(cost_matrix, new_rows, row4col, col4row, v):
+    """Solve the linear sum assignment problem with several rows added.
+
+    The assignment of the original rows stays dual feasible, so only the new
+    rows are augmented, in a single native call.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+         A matrix of costs.
+    new_rows : 2darray
+         The costs of the rows that are to be added, one row per row.
+    row4col: 1darray
+             Specify the rows to which each column is matched with.
+    col4row: 1darray
+             Specify the columns to which each row is matched with.
+    v : 1darray
+        The dual cost vector for columns.
+
+    Returns
+    -------
+    cost_matrix : 2darray
+        The cost matrix with new_rows appended to it.
+    row4col, col4row, v : 1darray
+        The updated assignment and dual variables. The inputs are not
+        modified, since col4row grows.
+    """
+    cost_matrix = np.vstack([cost_matrix, new_rows])
+    n_rows = len(col4row)
+    n_added = cost_matrix.shape[0] - n_rows
+
+    row4col, v = row4col.copy(), v.astype(cost_matrix.dtype)
+    col4row = np.concatenate([col4row, np.full(n_added, -1, dtype=col4row.dtype)])
+
+    lapjv_augment_masked(
+        cost_matrix, np.arange(n_rows, n_rows + n_added), col4row, row4col, v
+    )
+
+    return cost_matrix, row4col, col4row, v
+
+
+def solve_lsap_with_added_cols(cost_matrix, new_cols, row4col, col4row, v):
+    """Solve the linear sum assignment problem with several columns added.
+
+    The new columns are given dual variables that keep the current assignment
+    dual feasible, and the rows which are better off with one of the new
+    columns are re-augmented, all in a single native call.
+
+    Parameters
+    ----------
+    cost_matrix : 2darray
+         A matrix of costs.
+    new_cols : 2darray
+         The costs of the columns that are to be added, one column per column.
+    row4col: 1darray
+             Specify the rows to which each column is matched with.
+    col4row: 1darray
+             Specify the columns to which each row is matched with.
+    v : 1darray
+        The dual cost vector for columns.
+
+    Returns
+    -------
+    cost_matrix : 2darray
+        The cost matrix with new_cols appended to it.
+    row4col, col4row, v : 1darray
+        The updated assignment and dual variables. The inputs are not
+        modified, since row4col and v grow.
+    """
+    cost_matrix = np.hstack([cost_matrix, new_cols])
+    n_cols = len(row4col)
+    n_added = cost_matrix.shape[1] - n_cols
+
+    col4row = col4row.copy()
+    row4col = np.concatenate([row4col, np.full(n_added, -1, dtype=row4col.dtype)])
+    v = np.concatenate([v, np.zeros(n_added)]).astype(cost_matrix.dtype)
+
+    lapjv_augment_added_cols(
+        cost_matrix, np.arange(n_cols, n_cols + n_added), col4row, row4col, v
+    )
+
+    return cost_matrix, row4col, col4row, v
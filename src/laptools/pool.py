@@ -0,0 +1,272 @@
+"""A pool of warm worker processes sharing cost matrices through shared memory.
+
+Cost matrices are handed to the workers by the name of a block of shared
+memory rather than pickled, and the results of ``clap_costs`` are written by
+the workers straight into shared memory. Allocate the cost matrices with
+``SolverPool.empty`` to avoid copying them at all.
+
+>>> from laptools.pool import SolverPool
+>>> with SolverPool() as pool:
+...     cost_matrix = pool.empty((5000, 5000))
+...     cost_matrix[:] = ...
+...     row_ind, col_ind = pool.solve(cost_matrix)
+...     total_costs = pool.clap_costs(cost_matrix)
+
+This module needs python 3.8 or later, for ``multiprocessing.shared_memory``.
+"""
+import concurrent.futures
+import os
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from py_lapjv import costs_rows as lapjv_costs_rows
+from py_lapjv import lapjv
+
+from . import clap, lap
+
+
+class SolverPool:
+    """Solve assignment problems in a pool of warm worker processes.
+
+    Parameters
+    ----------
+    processes : int, optional
+        The number of worker processes. Defaults to the number of cpus.
+    chunks_per_process : int, optional
+        A ``clap_costs`` call is split into this many row ranges per worker
+        process, to balance the load between them.
+    """
+
+    def __init__(self, processes=None, chunks_per_process=4):
+        self.processes = processes or os.cpu_count()
+        self.chunks_per_process = chunks_per_process
+        self._executor = concurrent.futures.ProcessPoolExecutor(self.processes)
+        # Map the address of each array allocated by empty to its block.
+        self._blocks = {}
+
+    def empty(self, shape, dtype=np.double):
+        """Allocate an array in shared memory, which the workers read in place.
+
+        The memory is released once the array, and every view of it, is
+        garbage collected. Closing the pool stops sharing it.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the array.
+        dtype : dtype, optional
+            The dtype of the array.
+
+        Returns
+        -------
+        ndarray
+            An uninitialized C-contiguous array.
+        """
+        dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+        address = _address(array)
+        self._blocks[address] = shm
+        weakref.finalize(array, _free_block, self._blocks, address, shm)
+        return array
+
+    def solve(self, cost_matrix, maximize=False):
+        """Solve the linear sum assignment problem, as ``lap.solve``.
+
+        Parameters
+        ----------
+        cost_matrix : 2darray
+            A matrix of costs.
+        maximize : bool, optional
+            Calculate a maximum weight matching if true.
+
+        Returns
+        -------
+        row_ind, col_ind : array
+            The optimal assignment, as returned by ``lap.solve``.
+        """
+        return self.solve_many([cost_matrix], maximize=maximize)[0]
+
+    def solve_many(self, cost_matrices, maximize=False):
+        """Solve many linear sum assignment problems, spread over the workers.
+
+        Parameters
+        ----------
+        cost_matrices : iterable of 2darrays
+            The matrices of costs.
+        maximize : bool, optional
+            Calculate maximum weight matchings if true.
+
+        Returns
+        -------
+        list of tuples
+            The ``row_ind, col_ind`` of each of the problems.
+        """
+        with _SharedArrays(self) as shared:
+            specs = [shared.spec(cost_matrix) for cost_matrix in cost_matrices]
+            futures = [
+                self._executor.submit(_solve_worker, spec, maximize) for spec in specs
+            ]
+            return [future.result() for future in futures]
+
+    def clap_costs(self, cost_matrix, dtype=np.double):
+        """Solve a constrained lsap for each entry, as ``clap.costs``.
+
+        The unconstrained problem is solved once, and its solution is shared
+        by the workers, each of which fills in a range of rows of the result.
+
+        Parameters
+        ----------
+        cost_matrix : 2darray
+            A matrix of costs.
+        dtype : dtype, optional
+            The precision in which the costs are computed, either
+            ``np.double`` (the default) or ``np.float32``.
+
+        Returns
+        -------
+        2darray
+            The matrix of total constrained lsap costs, allocated by empty.
+        """
+        dtype = clap._check_dtype(dtype)
+        cost_matrix = np.asarray(cost_matrix, dtype=dtype)
+        if cost_matrix.ndim != 2:
+            raise ValueError(
+                "expected a matrix (2-d array), got a %r array" % (cost_matrix.shape,)
+            )
+        total_costs = self.empty(cost_matrix.shape, dtype=dtype)
+
+        with _SharedArrays(self) as shared:
+            cost_spec = shared.spec(cost_matrix)
+
+            # The constrained costs of the rows of a tall matrix are those of
+            # the columns of its transpose.
+            transpose = cost_matrix.shape[0] > cost_matrix.shape[1]
+            problem = cost_matrix.T if transpose else cost_matrix
+            try:
+                col4row, row4col, v = lapjv(problem)
+            except ValueError as e:
+                if str(e) == "cost matrix is infeasible":
+                    total_costs.fill(np.inf)
+                    return total_costs
+                raise
+
+            n_rows = problem.shape[0]
+            n_chunks = min(n_rows, self.processes * self.chunks_per_process)
+            bounds = np.linspace(0, n_rows, n_chunks + 1).astype(int)
+            futures = [
+                self._executor.submit(
+                    _clap_costs_worker,
+                    cost_spec,
+                    shared.spec(total_costs),
+                    transpose,
+                    (col4row, row4col, v),
+                    row_start,
+                    row_stop,
+                )
+                for row_start, row_stop in zip(bounds[:-1], bounds[1:])
+            ]
+            for future in futures:
+                future.result()
+
+        return total_costs
+
+    def close(self):
+        """Shut down the workers, and stop sharing the arrays allocated by empty.
+
+        The arrays themselves stay valid until they are garbage collected.
+        """
+        self._executor.shutdown()
+        for shm in self._blocks.values():
+            shm.unlink()
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _SharedArrays:
+    """Share arrays with the workers for the duration of a call.
+
+    Arrays allocated by the pool are shared in place, others are copied into
+    temporary blocks of shared memory.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.temporary = []
+
+    def spec(self, array):
+        """Get the name, shape and dtype of a block holding array."""
+        array = np.asarray(array)
+        shm = self.pool._blocks.get(_address(array))
+        if shm is None or not array.flags.c_contiguous:
+            copy = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.temporary.append(copy)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=copy.buf)[:] = array
+            shm = copy
+        return shm.name, array.shape, array.dtype.str
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for shm in self.temporary:
+            shm.close()
+            shm.unlink()
+
+
+def _free_block(blocks, address, shm):
+    """Release the block of an array allocated by SolverPool.empty."""
+    if blocks.pop(address, None) is not None:
+        shm.unlink()
+    shm.close()
+
+
+def _address(array):
+    return array.__array_interface__["data"][0]
+
+
+def _attach(spec):
+    """Attach to a block of shared memory, as an array."""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _solve_worker(spec, maximize):
+    shm, cost_matrix = _attach(spec)
+    try:
+        return lap.solve(cost_matrix, maximize=maximize)
+    finally:
+        del cost_matrix
+        shm.close()
+
+
+def _clap_costs_worker(cost_spec, out_spec, transpose, solution, row_start, row_stop):
+    cost_shm, cost_matrix = _attach(cost_spec)
+    out_shm, out = _attach(out_spec)
+    try:
+        if transpose:
+            cost_matrix, out = cost_matrix.T, out.T
+        col4row, row4col, v = solution
+        lapjv_costs_rows(
+            cost_matrix,
+            col4row,
+            row4col,
+            v,
+            row_start,
+            row_stop,
+            out[row_start:row_stop],
+        )
+    finally:
+        del cost_matrix, out
+        cost_shm.close()
+        out_shm.close()
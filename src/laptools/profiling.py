@@ -0,0 +1,163 @@
+"""Opt-in profiling of the phases of the laptools solvers.
+
+Profiling is off by default, and the instrumented solvers then only pay for a
+few no-op method calls. Inside of a ``profile()`` block, every solver called
+from the same thread records the time spent in each of its phases and counts
+the paths taken through it.
+
+>>> from laptools import clap, profiling
+>>> with profiling.profile() as prof:
+...     clap.costs(cost_matrix)
+>>> prof.as_dict()
+{'times': {'clap.base_solve': ..., ...}, 'counts': {'clap.shortcut_rows': ...}}
+
+Phase times are inclusive of the phases nested in them. For ``clap.costs``:
+
+clap.base_solve
+    The unconstrained lsap.
+clap.candidates
+    Finding the three cheapest columns of each row.
+clap.removed_row
+    The augments of ``lap.solve_lsap_with_removed_row``.
+clap.stolen_entries
+    Resolving the entries whose column is stolen from another row, through
+    the candidate fast path or else the fallback below.
+clap.removed_col
+    The fallback sub-augments of ``lap.solve_lsap_with_removed_col``.
+clap.decompose, clap.block_costs
+    With ``decompose=True``, finding the blocks of the cost matrix, and
+    solving all of them, instead of the phases above.
+
+and the counts are
+
+clap.shortcut_rows
+    Rows whose freed column does not help any other row, so that no augment
+    is needed.
+clap.removed_row_augments
+    Rows that needed an augment with the row removed.
+clap.candidate_entries
+    Stolen entries resolved by the best, second or third candidate column.
+clap.removed_col_augments
+    Stolen entries that needed a sub-augment.
+clap.blocks
+    With ``decompose=True``, the blocks which have rows.
+
+For ``lap.solve``, the phases are ``solve.convert`` of the input to a float64
+array, ``solve.validate`` of its shape and entries, and ``solve.native``, the
+time spent in the native solver. With ``decompose=True``, it also records the
+``solve.decompose`` phase and counts the ``solve.blocks``. Wide problems
+solved on their candidate columns count the ``solve.pruned_cols`` left out.
+Problems of at most 8 rows and columns are solved by a single native call,
+and only record ``solve.native``.
+
+For ``assign3d.solve``, the phases are ``assign3d.relax``, the relaxed lsaps,
+and ``assign3d.recover``, the feasible assignments made out of them.
+"""
+import collections
+import contextlib
+import threading
+import time
+
+
+class Profile:
+    """Per-phase times, in seconds, and counts recorded by the solvers."""
+
+    def __init__(self):
+        self.times = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+
+    def phase(self, name):
+        """Return a context manager adding the time spent in it to a phase."""
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        """Add n to a count."""
+        self.counts[name] += n
+
+    def as_dict(self):
+        """Export the times and counts as plain dicts, e.g. for a metrics sink.
+
+        Returns
+        -------
+        dict
+            A dict with a ``"times"`` dict mapping each phase to its total time
+            in seconds, and a ``"counts"`` dict mapping each count to its total.
+        """
+        return {"times": dict(self.times), "counts": dict(self.counts)}
+
+
+class _Phase:
+    __slots__ = ("profile", "name", "t0")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.times[self.name] += time.perf_counter() - self.t0
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _NullProfile:
+    """The profile used outside of a profile() block, which records nothing."""
+
+    _null_phase = _NullPhase()
+
+    def phase(self, name):
+        return self._null_phase
+
+    def count(self, name, n=1):
+        pass
+
+
+_NULL_PROFILE = _NullProfile()
+
+
+class _Local(threading.local):
+    # A class attribute, since looking up a missing one is slow.
+    profile = _NULL_PROFILE
+
+
+_local = _Local()
+
+
+def current():
+    """Return the active profile, or a null profile which records nothing."""
+    return _local.profile
+
+
+@contextlib.contextmanager
+def profile(prof=None):
+    """Profile the solvers called inside of the block.
+
+    Parameters
+    ----------
+    prof : Profile, optional
+        A profile to add to, e.g. to accumulate over several blocks. A new
+        one is used by default.
+
+    Yields
+    ------
+    Profile
+        The profile recording the solvers.
+    """
+    if prof is None:
+        prof = Profile()
+    outer = current()
+    _local.profile = prof
+    try:
+        yield prof
+    finally:
+        _local.profile = outer
@@ -0,0 +1,143 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from laptools import aio, clap_naive, lap
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def batch_sizes(monkeypatch):
+    """Record the size of every batch solved natively."""
+    sizes = []
+    solve_batch = aio._solve_batch
+
+    def recording_solve_batch(stack):
+        sizes.append(len(stack))
+        return solve_batch(stack)
+
+    monkeypatch.setattr(aio, "_solve_batch", recording_solve_batch)
+    return sizes
+
+
+def test_solve(batch_sizes):
+    solver = aio.Solver(window=0.01)
+    shapes = [(4, 6), (6, 4), (5, 5)] * 10
+    cost_matrices = [np.random.rand(*shape) for shape in shapes]
+
+    async def solve_all():
+        return await asyncio.gather(*map(solver.solve, cost_matrices))
+
+    results = run(solve_all())
+    solver.close()
+
+    for cost_matrix, (row_ind, col_ind) in zip(cost_matrices, results):
+        expected_row_ind, expected_col_ind = lap.solve(cost_matrix)
+        np.testing.assert_array_equal(row_ind, expected_row_ind)
+        np.testing.assert_array_equal(col_ind, expected_col_ind)
+
+    # The tall matrices are solved transposed, along with the wide ones.
+    assert sorted(batch_sizes) == [10, 20]
+
+
+def test_solve_unbatched(batch_sizes):
+    solver = aio.Solver(batch_size=10)
+    cost_matrix = np.random.rand(5, 7)
+
+    row_ind, col_ind = run(solver.solve(cost_matrix, maximize=True))
+    expected_row_ind, expected_col_ind = lap.solve(cost_matrix, maximize=True)
+    np.testing.assert_array_equal(row_ind, expected_row_ind)
+    np.testing.assert_array_equal(col_ind, expected_col_ind)
+
+    # Large cost matrices are converted and validated in the pool.
+    row_ind, col_ind = run(solver.solve(cost_matrix.T.tolist()))
+    expected_row_ind, expected_col_ind = lap.solve(cost_matrix.T)
+    np.testing.assert_array_equal(row_ind, expected_row_ind)
+    np.testing.assert_array_equal(col_ind, expected_col_ind)
+    cost_matrix[0, 0] = np.nan
+    with pytest.raises(ValueError):
+        run(solver.solve(cost_matrix))
+    solver.close()
+    assert batch_sizes == []
+
+
+def test_solve_infeasible():
+    cost_matrix = np.random.rand(3, 3)
+    cost_matrix[:, 0] = np.inf
+
+    async def solve_both():
+        return await asyncio.gather(
+            aio.solve(cost_matrix), aio.solve(np.ones((3, 3))), return_exceptions=True
+        )
+
+    infeasible, feasible = run(solve_both())
+    assert isinstance(infeasible, ValueError)
+    np.testing.assert_array_equal(feasible[0], np.arange(3))
+
+    with pytest.raises(ValueError):
+        run(aio.solve(np.ones(3)))
+
+
+def test_clap_costs():
+    cost_matrices = [np.random.rand(4, 5) for _ in range(5)]
+    cost_matrices.append(np.random.rand(6, 9))
+
+    solver = aio.Solver(batch_size=40)
+
+    async def costs_all():
+        return await asyncio.gather(
+            *[solver.clap_costs(cost_matrix) for cost_matrix in cost_matrices],
+            solver.clap_costs(cost_matrices[0], dtype=np.float32),
+        )
+
+    results = run(costs_all())
+    solver.close()
+
+    for cost_matrix, total_costs in zip(cost_matrices, results):
+        np.testing.assert_allclose(total_costs, clap_naive.costs(cost_matrix))
+    assert results[-1].dtype == np.float32
+    np.testing.assert_allclose(results[-1], results[0], rtol=1e-5)
+
+
+def test_cancel(batch_sizes):
+    solver = aio.Solver(window=0.05)
+    cost_matrices = [np.random.rand(4, 4) for _ in range(4)]
+
+    async def cancel_one():
+        tasks = [
+            asyncio.ensure_future(solver.solve(cost_matrix))
+            for cost_matrix in cost_matrices
+        ]
+        await asyncio.sleep(0)
+        tasks[0].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = run(cancel_one())
+    solver.close()
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    for cost_matrix, (_, col_ind) in zip(cost_matrices[1:], results[1:]):
+        np.testing.assert_array_equal(col_ind, lap.solve(cost_matrix)[1])
+    # The cancelled request was left out of the batch.
+    assert batch_sizes == [3]
+
+
+def test_backpressure(batch_sizes):
+    solver = aio.Solver(window=0.01, max_pending=2)
+    cost_matrices = [np.random.rand(4, 4) for _ in range(6)]
+
+    async def solve_all():
+        return await asyncio.gather(*map(solver.solve, cost_matrices))
+
+    run(solve_all())
+    solver.close()
+
+    assert batch_sizes == [2, 2, 2]
@@ -0,0 +1,69 @@
+import itertools
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from pytest import raises as assert_raises
+
+from laptools import assign3d
+
+
+def brute_force(cost_tensor):
+    """The optimal cost, trying every assignment of the shortest axis."""
+    cost_tensor = np.moveaxis(cost_tensor, np.argmin(cost_tensor.shape), 0)
+    n, n_js, n_ks = cost_tensor.shape
+    return min(
+        cost_tensor[np.arange(n), j_ind, k_ind].sum()
+        for j_ind in itertools.permutations(range(n_js), n)
+        for k_ind in itertools.permutations(range(n_ks), n)
+    )
+
+
+def test_assign3d_against_brute_force():
+    rng = np.random.RandomState(0)
+    for shape in [(4, 4, 4), (3, 5, 4), (5, 3, 4), (4, 5, 3)]:
+        for _ in range(3):
+            cost_tensor = rng.rand(*shape)
+            i_ind, j_ind, k_ind, info = assign3d.solve(cost_tensor)
+
+            # Every index of the shortest axis is assigned, and none twice.
+            assert len(i_ind) == min(shape)
+            for ind in [i_ind, j_ind, k_ind]:
+                assert len(np.unique(ind)) == len(ind)
+            assert np.all(np.diff(i_ind) > 0)
+            assert np.isclose(cost_tensor[i_ind, j_ind, k_ind].sum(), info["cost"])
+
+            optimum = brute_force(cost_tensor)
+            assert info["bound"] <= optimum + 1e-9
+            assert optimum <= info["cost"] + 1e-9
+            assert info["gap"] >= 0
+
+
+def test_assign3d_planted():
+    # Triples which are far cheaper than the rest are found, with no gap.
+    rng = np.random.RandomState(0)
+    n = 30
+    cost_tensor = 1 + rng.rand(n, n, n)
+    j_ind, k_ind = rng.permutation(n), rng.permutation(n)
+    cost_tensor[np.arange(n), j_ind, k_ind] = rng.rand(n)
+    cost_tensor[0, 0, 0] = np.inf
+
+    i_ind, j_found, k_found, info = assign3d.solve(cost_tensor)
+    assert_array_equal(j_found, j_ind)
+    assert_array_equal(k_found, k_ind)
+    assert info["gap"] <= 1e-6
+
+    i_ind, j_found, k_found, info = assign3d.solve(-cost_tensor[1:], maximize=True)
+    assert_array_equal(k_found, k_ind[1:])
+    assert info["bound"] >= info["cost"]
+
+
+def test_assign3d_input_validation():
+    assert_raises(ValueError, assign3d.solve, np.ones((3, 3)))
+    assert_raises(ValueError, assign3d.solve, np.full((2, 2, 2), np.nan))
+    # The only feasible triples share their k.
+    cost_tensor = np.full((2, 2, 2), np.inf)
+    cost_tensor[:, :, 0] = 1
+    assert_raises(ValueError, assign3d.solve, cost_tensor)
+
+    i_ind, j_ind, k_ind, info = assign3d.solve(np.ones((0, 3, 3)))
+    assert len(i_ind) == len(j_ind) == len(k_ind) == 0
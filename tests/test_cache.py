@@ -0,0 +1,88 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from laptools import cache, clap, lap
+
+
+def test_solve_cache():
+    results = cache.Cache()
+    cost_matrix = np.random.rand(6, 4)
+
+    row_ind_1, col_ind_1 = lap.solve(cost_matrix, cache=results)
+    row_ind_2, col_ind_2 = lap.solve(cost_matrix.copy(), cache=results)
+    assert results.as_dict()["hits"] == 1
+    assert results.as_dict()["misses"] == 1
+    assert_array_equal(row_ind_1, row_ind_2)
+    assert_array_equal(col_ind_1, col_ind_2)
+
+    # Different options and contents are different keys.
+    lap.solve(cost_matrix, maximize=True, cache=results)
+    cost_matrix[0, 0] += 1
+    lap.solve(cost_matrix, cache=results)
+    assert results.misses == 3
+
+    key = results.key("lap.solve", -cost_matrix)
+    assert results.get(key) is None
+    assert set(results.get(results.key("lap.solve", cost_matrix))) == {"col4row", "v"}
+
+    # The duals of a wide problem solved on its candidate columns are extended
+    # to all of the columns, at most zero and zero for the unassigned ones.
+    cost_matrix = np.arange(100) + 5 * np.random.rand(10, 100)
+    row_ind, col_ind = lap.solve(cost_matrix, cache=results)
+    v = results.get(results.key("lap.solve", cost_matrix))["v"]
+    u = cost_matrix[row_ind, col_ind] - v[col_ind]
+    assert np.all(cost_matrix - u[:, np.newaxis] - v >= -1e-12)
+    assert np.all(np.delete(v, col_ind) == 0) and np.all(v <= 0)
+
+
+def test_clap_costs_cache():
+    results = cache.Cache()
+    cost_matrix = np.random.rand(5, 7)
+
+    expected = clap.costs(cost_matrix)
+    total_costs = clap.costs(cost_matrix, cache=results)
+    np.testing.assert_array_equal(total_costs, expected)
+
+    # Results handed out are copies, so modifying them leaves the cache be.
+    total_costs[:] = 0
+    out = np.empty_like(expected)
+    assert clap.costs(cost_matrix, out=out, cache=results) is out
+    np.testing.assert_array_equal(out, expected)
+    assert results.hits == 1
+
+    clap.costs(cost_matrix, dtype=np.float32, cache=results)
+    assert results.misses == 2
+
+
+def test_eviction():
+    cost_matrices = [np.random.rand(10, 10) for i in range(3)]
+    # Room for the results of two of the matrices.
+    results = cache.Cache(max_bytes=2 * 10 * 10 * 8)
+
+    for cost_matrix in cost_matrices:
+        clap.costs(cost_matrix, cache=results)
+    assert results.evictions == 1
+    assert results.as_dict()["entries"] == 2
+
+    clap.costs(cost_matrices[0], cache=results)
+    clap.costs(cost_matrices[2], cache=results)
+    assert results.hits == 1
+
+
+def test_disk_tier(tmpdir):
+    cost_matrix = np.random.rand(8, 8)
+    expected = clap.costs(cost_matrix)
+
+    results = cache.Cache(max_bytes=0, directory=str(tmpdir))
+    clap.costs(cost_matrix, cache=results)
+    assert results.as_dict()["entries"] == 0
+
+    # A fresh cache, e.g. in another process, finds the results on disk.
+    results = cache.Cache(directory=str(tmpdir))
+    np.testing.assert_array_equal(clap.costs(cost_matrix, cache=results), expected)
+    assert results.disk_hits == 1
+    assert results.as_dict()["entries"] == 1
+
+    results = cache.Cache(directory=str(tmpdir), max_disk_bytes=0)
+    clap.costs(np.random.rand(8, 8), cache=results)
+    assert tmpdir.listdir() == []
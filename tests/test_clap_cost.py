@@ -1,7 +1,8 @@
 import numpy as np
 import pytest
+from scipy import sparse
 
-from laptools import clap
+from laptools import cache, clap, clap_naive
 
 cost_matrices = []
 global_cost_matrices = []
@@ -170,3 +171,135 @@ class TestClap:
         # for i in range(num_rows):
         #     for j in range(num_cols):
         #         assert clap.cost(i, j, cost_matrix) == expected_global_costs[i, j]
+
+    @pytest.mark.parametrize(
+        "cost_matrix, expected_global_costs",
+        list(zip(cost_matrices, global_cost_matrices)),
+    )
+    def test_clap_costs_does_not_modify_input(self, cost_matrix, expected_global_costs):
+        """Verify clap.costs leaves its input untouched."""
+        cost_matrix = np.array(cost_matrix, dtype=np.double)
+        cost_matrix_copy = cost_matrix.copy()
+        clap.costs(cost_matrix)
+        assert np.array_equal(cost_matrix, cost_matrix_copy)
+
+    @pytest.mark.parametrize(
+        "cost_matrix, expected_global_costs",
+        list(zip(cost_matrices, global_cost_matrices)),
+    )
+    def test_clap_costs_out(self, cost_matrix, expected_global_costs, tmp_path):
+        """Verify clap.costs writes its result to out, including memmaps."""
+        shape = np.shape(cost_matrix)
+        out = np.memmap(tmp_path / "out.dat", dtype=np.double, mode="w+", shape=shape)
+        assert clap.costs(cost_matrix, out=out) is out
+        assert out.tolist() == expected_global_costs
+
+        with pytest.raises(ValueError):
+            clap.costs(cost_matrix, out=np.empty((shape[0] + 1, shape[1])))
+
+    @pytest.mark.parametrize(
+        "cost_matrix, expected_global_costs",
+        list(zip(cost_matrices, global_cost_matrices)),
+    )
+    def test_clap_costs_float32(self, cost_matrix, expected_global_costs):
+        """Verify clap.costs can be computed in single precision."""
+        total_costs = clap.costs(cost_matrix, dtype=np.float32)
+        assert total_costs.dtype == np.float32
+        assert total_costs.tolist() == expected_global_costs
+
+    @pytest.mark.parametrize(
+        "cost_matrix, expected_global_costs",
+        list(zip(cost_matrices, global_cost_matrices)),
+    )
+    def test_clap_costs_batch(self, cost_matrix, expected_global_costs):
+        """Verify clap.costs_batch works on small examples."""
+        stack = [cost_matrix, cost_matrix]
+        total_costs = clap.costs_batch(stack, n_jobs=2)
+        assert total_costs.tolist() == [expected_global_costs] * 2
+
+        total_costs = clap.costs_batch(stack, dtype=np.float32)
+        assert total_costs.dtype == np.float32
+        assert total_costs.tolist() == [expected_global_costs] * 2
+
+    @pytest.mark.parametrize("shape", [(20, 6, 6), (20, 4, 7), (20, 7, 4)])
+    def test_clap_costs_batch_against_naive(self, shape):
+        """Verify clap.costs_batch agrees with clap_naive.costs on random matrices."""
+        stack = np.random.randint(10, size=shape).astype(np.double)
+        expected = np.stack([clap_naive.costs(cost_matrix) for cost_matrix in stack])
+        assert np.array_equal(clap.costs_batch(stack), expected)
+
+        with pytest.raises(ValueError):
+            clap.costs_batch(stack[0])
+
+    @pytest.mark.parametrize("shape", [(30, 30), (20, 40), (40, 20)])
+    def test_clap_costs_decompose(self, shape):
+        """Verify clap.costs agrees with itself when split into blocks."""
+        rng = np.random.RandomState(0)
+        for _ in range(5):
+            cost_matrix = rng.rand(*shape)
+            row_blocks = rng.randint(4, size=shape[0])
+            col_blocks = rng.randint(4, size=shape[1])
+            cost_matrix[row_blocks[:, np.newaxis] != col_blocks] = np.inf
+
+            expected = clap.costs_batch([cost_matrix])[0]
+            total_costs = clap.costs(cost_matrix, decompose=True)
+            assert np.array_equal(np.isinf(total_costs), np.isinf(expected))
+            assert np.allclose(total_costs, expected)
+
+    @pytest.mark.parametrize("shape", [(6, 6), (4, 7), (7, 4)])
+    def test_clap_costs_sparse(self, shape):
+        """Verify clap.costs_sparse agrees with clap.costs on the admissible entries."""
+        rng = np.random.RandomState(0)
+        for _ in range(20):
+            cost_matrix = rng.randint(10, size=shape).astype(np.double)
+            forbidden = rng.rand(*shape) < 0.5
+            gated = np.where(forbidden, np.inf, cost_matrix)
+            expected = clap.costs_batch([gated])[0]
+
+            # Rows and columns without admissible entries are left out.
+            rows = ~forbidden.all(axis=1)
+            cols = ~forbidden.all(axis=0)
+            expected[np.ix_(rows, cols)] = clap.costs_batch(
+                [gated[np.ix_(rows, cols)]]
+            )[0]
+
+            total_costs = clap.costs_sparse(cost_matrix, forbidden=forbidden)
+            assert sparse.isspmatrix_csr(total_costs)
+            assert total_costs.nnz == np.sum(~forbidden)
+            assert np.array_equal(
+                total_costs.toarray()[~forbidden], expected[~forbidden]
+            )
+
+            # The admissible entries of zero cost are stored explicitly.
+            admissible = np.nonzero(~forbidden)
+            total_costs = clap.costs(
+                sparse.csr_matrix((cost_matrix[admissible], admissible), shape=shape)
+            )
+            assert np.array_equal(
+                total_costs.toarray()[~forbidden], expected[~forbidden]
+            )
+
+    def test_clap_costs_sparse_explicit_zeros(self):
+        """Verify the stored zeros of a sparse matrix are admissible."""
+        cost_matrix = sparse.csr_matrix(([0.0, 1.0], ([0, 1], [0, 0])), shape=(2, 2))
+        total_costs = clap.costs_sparse(cost_matrix)
+        assert total_costs.nnz == 2
+        assert total_costs.toarray().tolist() == [[0, 0], [1, 0]]
+
+        with pytest.raises(ValueError):
+            clap.costs_sparse(cost_matrix, forbidden=np.zeros((2, 2), dtype=bool))
+        with pytest.raises(ValueError):
+            clap.costs_sparse([[0, np.nan]])
+
+    def test_clap_costs_sparse_dispatch(self):
+        """Verify clap.costs hands sparse matrices to clap.costs_sparse."""
+        cost_matrix = sparse.csr_matrix(([0.0, 1.0], ([0, 1], [0, 0])), shape=(2, 2))
+        total_costs = clap.costs(cost_matrix, dtype=np.float32)
+        assert sparse.isspmatrix_csr(total_costs)
+        assert total_costs.dtype == np.float32
+        assert total_costs.toarray().tolist() == [[0, 0], [1, 0]]
+
+        with pytest.raises(ValueError):
+            clap.costs(cost_matrix, out=np.empty((2, 2)))
+        with pytest.raises(ValueError):
+            clap.costs(cost_matrix, cache=cache.Cache())
@@ -86,3 +86,192 @@ def test_solve_lsap_with_removed_col():
             np.array_equal(sub_col_idx_1, col4row)
             or sub_cost_matrix_sum == cost_matrix[row_idx_1, col4row].sum()
         )
+
+
+def test_solve_lsap_with_removed_row_layouts():
+    """Removing a row should not depend on, or modify, the cost matrix layout."""
+    num_rows = 10
+    num_cols = 30
+    num_rounds = 100
+
+    for i in range(num_rounds):
+        cost_matrix = np.random.randint(10, size=(num_rows, num_cols))
+        cost_matrix = cost_matrix.astype(np.double)
+        cost_matrix_copy = cost_matrix.copy()
+        removed_row = random.randint(0, num_rows - 1)
+
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+        expected = lap.solve_lsap_with_removed_row(
+            cost_matrix, removed_row, row4col, col4row, v, modify_val=False
+        )
+        assert np.array_equal(cost_matrix, cost_matrix_copy)
+
+        strided = np.repeat(cost_matrix, 2, axis=1)[:, ::2]
+        for layout in [np.asfortranarray(cost_matrix), strided]:
+            result = lap.solve_lsap_with_removed_row(
+                layout, removed_row, row4col, col4row, v, modify_val=False
+            )
+            for actual, desired in zip(result, expected):
+                assert np.array_equal(actual, desired)
+
+        row4col, col4row, v = (
+            row4col.astype(int),
+            col4row.astype(int),
+            v.astype(np.float32),
+        )
+        lap.solve_lsap_with_removed_row(
+            cost_matrix.astype(np.float32), removed_row, row4col, col4row, v
+        )
+        assert np.array_equal(col4row, expected[1])
+
+
+def test_solve_lsap_with_removed_col_mask():
+    """Removing a column within a column mask should solve the masked problem."""
+    num_rows = 10
+    num_cols = 20
+    num_rounds = 200
+
+    for i in range(num_rounds):
+        cost_matrix = np.random.randint(10, size=(num_rows, num_cols))
+        cost_matrix = cost_matrix.astype(np.double)
+        cost_matrix_copy = cost_matrix.copy()
+
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+        removed_col = random.choice(col4row)
+        # Keep at least one spare column, so the problem stays feasible.
+        col_mask = np.random.rand(num_cols) < 0.5
+        col_mask[col4row] = True
+        col_mask[random.choice(np.flatnonzero(row4col == -1))] = True
+
+        lap.solve_lsap_with_removed_col(
+            cost_matrix, removed_col, row4col, col4row, v, col_mask=col_mask
+        )
+        assert np.array_equal(cost_matrix, cost_matrix_copy)
+        assert removed_col not in col4row
+        assert np.all(col_mask[col4row])
+
+        col_mask[removed_col] = False
+        sub_cost_matrix = cost_matrix[:, col_mask]
+        sub_row_idx, sub_col_idx = linear_sum_assignment(sub_cost_matrix)
+        assert (
+            sub_cost_matrix[sub_row_idx, sub_col_idx].sum()
+            == cost_matrix[np.arange(num_rows), col4row].sum()
+        )
+
+
+def test_solve_lsap_with_removed_rows():
+    """Removing several rows at once should solve the remaining rows."""
+    num_rows = 10
+    num_cols = 30
+    num_rounds = 200
+
+    for i in range(num_rounds):
+        cost_matrix = np.random.randint(10, size=(num_rows, num_cols))
+        cost_matrix = cost_matrix.astype(np.double)
+
+        removed_rows = np.random.choice(num_rows, random.randint(1, num_rows - 1))
+        kept_rows = np.setdiff1d(np.arange(num_rows), removed_rows)
+        sub_cost_matrix = cost_matrix[kept_rows]
+        sub_row_idx, sub_col_idx = linear_sum_assignment(sub_cost_matrix)
+
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+        lap.solve_lsap_with_removed_rows(cost_matrix, removed_rows, row4col, col4row, v)
+        assert np.array_equal(row4col[col4row], np.arange(num_rows))
+        assert (
+            sub_cost_matrix[sub_row_idx, sub_col_idx].sum()
+            == cost_matrix[kept_rows, col4row[kept_rows]].sum()
+        )
+
+
+def test_solve_lsap_with_removed_cols():
+    """Removing several columns at once should solve the remaining columns."""
+    num_rows = 10
+    num_cols = 20
+    num_rounds = 200
+
+    for i in range(num_rounds):
+        cost_matrix = np.random.randint(10, size=(num_rows, num_cols))
+        cost_matrix = cost_matrix.astype(np.double)
+
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+        removed_cols = np.random.choice(
+            num_cols, random.randint(1, num_cols - num_rows)
+        )
+        kept_cols = np.setdiff1d(np.arange(num_cols), removed_cols)
+        sub_cost_matrix = cost_matrix[:, kept_cols]
+        sub_row_idx, sub_col_idx = linear_sum_assignment(sub_cost_matrix)
+
+        lap.solve_lsap_with_removed_cols(cost_matrix, removed_cols, row4col, col4row, v)
+        assert not np.any(np.isin(col4row, removed_cols))
+        assert np.all(row4col[removed_cols] == -1)
+        assert (
+            sub_cost_matrix[sub_row_idx, sub_col_idx].sum()
+            == cost_matrix[np.arange(num_rows), col4row].sum()
+        )
+
+
+def test_solve_lsap_with_removed_cols_candidates():
+    """The candidate columns suffice to remove up to n_removed_cols columns."""
+    num_rows = 5
+    num_cols = 100
+    num_removed = 5
+
+    for i in range(50):
+        cost_matrix = np.arange(num_cols) + 10 * np.random.rand(num_rows, num_cols)
+
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+        col_mask = lap.candidate_cols(cost_matrix, n_removed_cols=num_removed)
+        assert col_mask.sum() < num_cols
+        col_mask[col4row] = True
+
+        removed_cols = np.random.choice(num_cols, num_removed, replace=False)
+        kept_cols = np.setdiff1d(np.arange(num_cols), removed_cols)
+        sub_cost_matrix = cost_matrix[:, kept_cols]
+        sub_row_idx, sub_col_idx = linear_sum_assignment(sub_cost_matrix)
+
+        lap.solve_lsap_with_removed_cols(
+            cost_matrix, removed_cols, row4col, col4row, v, col_mask=col_mask
+        )
+        assert not np.any(np.isin(col4row, removed_cols))
+        assert np.isclose(
+            sub_cost_matrix[sub_row_idx, sub_col_idx].sum(),
+            cost_matrix[np.arange(num_rows), col4row].sum(),
+        )
+
+
+def test_solve_lsap_with_added_rows_and_cols():
+    """Adding rows or columns should solve the enlarged problem.
+
+    The updated dual variables are checked by chaining the updates.
+    """
+    num_rows = 8
+    num_cols = 12
+    num_rounds = 200
+
+    for i in range(num_rounds):
+        cost_matrix = np.random.randint(10, size=(num_rows, num_cols))
+        cost_matrix = cost_matrix.astype(np.double)
+        row4col, col4row, u, v = lap._solve(cost_matrix)
+
+        new_cols = np.random.randint(10, size=(num_rows, 3)).astype(np.double)
+        cost_matrix, row4col, col4row, v = lap.solve_lsap_with_added_cols(
+            cost_matrix, new_cols, row4col, col4row, v
+        )
+        assert cost_matrix.shape == (num_rows, num_cols + 3)
+        row_idx, col_idx = linear_sum_assignment(cost_matrix)
+        assert (
+            cost_matrix[row_idx, col_idx].sum()
+            == cost_matrix[np.arange(num_rows), col4row].sum()
+        )
+
+        new_rows = np.random.randint(10, size=(4, num_cols + 3)).astype(np.double)
+        cost_matrix, row4col, col4row, v = lap.solve_lsap_with_added_rows(
+            cost_matrix, new_rows, row4col, col4row, v
+        )
+        assert cost_matrix.shape == (num_rows + 4, num_cols + 3)
+        row_idx, col_idx = linear_sum_assignment(cost_matrix)
+        assert (
+            cost_matrix[row_idx, col_idx].sum()
+            == cost_matrix[np.arange(num_rows + 4), col4row].sum()
+        )
+        assert np.array_equal(row4col[col4row], np.arange(num_rows + 4))
@@ -2,6 +2,8 @@
 # Author: Brian M. Clapper, G. Varoquaux, Lars Buitinck
 # License: BSD
 
+import warnings
+
 import numpy as np
 from numpy.testing import assert_array_equal
 from pytest import raises as assert_raises
@@ -121,3 +123,393 @@ def test_linear_sum_assignment_against_scipy():
 
         assert_array_equal(row_ind_1, row_ind_2)
         assert_array_equal(col_ind_1, col_ind_2)
+
+
+def test_linear_sum_assignment_small():
+    # Matrices of at most 8 rows and columns take the fast path.
+    rng = np.random.RandomState(0)
+    for n_rows in range(9):
+        for n_cols in range(9):
+            for maximize in [False, True]:
+                cost_matrix = rng.randint(0, 4, (n_rows, n_cols))
+                cost_matrix = cost_matrix.astype(np.double)
+                if maximize:
+                    cost_matrix[rng.rand(n_rows, n_cols) < 0.1] = -np.inf
+                else:
+                    cost_matrix[rng.rand(n_rows, n_cols) < 0.1] = np.inf
+
+                try:
+                    expected = linear_sum_assignment(cost_matrix, maximize)
+                except ValueError:
+                    assert_raises(ValueError, lap.solve, cost_matrix, maximize)
+                    continue
+
+                # With ties, a tall matrix may assign other rows than scipy.
+                row_ind, col_ind = lap.solve(cost_matrix, maximize)
+                assert len(row_ind) == min(n_rows, n_cols)
+                assert np.all(np.diff(row_ind) > 0)
+                assert len(np.unique(col_ind)) == len(col_ind)
+                assert (cost_matrix[row_ind, col_ind].sum()
+                        == cost_matrix[expected].sum())
+
+    # Integer dtypes and strided views are taken as they are.
+    cost_matrix = rng.randint(0, 100, (8, 16))[:, ::2].T
+    expected = linear_sum_assignment(cost_matrix)
+    row_ind, col_ind = lap.solve(cost_matrix)
+    assert_array_equal(row_ind, expected[0])
+    assert cost_matrix[row_ind, col_ind].sum() == cost_matrix[expected].sum()
+
+
+def test_linear_sum_assignment_decompose():
+    rng = np.random.RandomState(0)
+    for shape in [(30, 30), (20, 40), (40, 20)]:
+        cost_matrix = rng.rand(*shape)
+        # Gate the matrix into blocks, some of them wider than others.
+        row_blocks = rng.randint(4, size=shape[0])
+        col_blocks = rng.randint(4, size=shape[1])
+        cost_matrix[row_blocks[:, np.newaxis] != col_blocks] = np.inf
+
+        try:
+            expected = linear_sum_assignment(cost_matrix)
+        except ValueError:
+            assert_raises(ValueError, lap.solve, cost_matrix, decompose=True)
+            continue
+        row_ind, col_ind, stats = lap.solve(
+            cost_matrix, decompose=True, return_stats=True
+        )
+        assert_array_equal(row_ind, expected[0])
+        assert_array_equal(col_ind, expected[1])
+        assert stats["augmentations"] == min(shape)
+        assert stats["path_lengths"].sum() == stats["augmentations"]
+
+    # A block with more rows than columns cannot be assigned.
+    cost_matrix = np.array([[1, 2, np.inf], [3, np.inf, np.inf], [4, np.inf, np.inf]])
+    assert_raises(ValueError, lap.solve, cost_matrix, decompose=True)
+
+
+def test_linear_sum_assignment_wide():
+    rng = np.random.RandomState(0)
+    for shape in [(10, 100), (100, 10), (1, 50)]:
+        n_rows, n_cols = shape
+        # Every row prefers the same few columns, so most columns are pruned.
+        cost_matrix = np.arange(n_cols) + 5 * rng.rand(n_rows, n_cols)
+        if n_rows > n_cols:
+            cost_matrix = np.arange(n_rows)[:, np.newaxis] + rng.rand(*shape)
+        expected = linear_sum_assignment(cost_matrix)
+        with laptools.profiling.profile() as prof:
+            row_ind, col_ind = lap.solve(cost_matrix)
+        assert_array_equal(row_ind, expected[0])
+        assert_array_equal(col_ind, expected[1])
+        assert prof.as_dict()["counts"].get("solve.pruned_cols", 0) > 0
+
+    # Pruning is given up on when most of the columns are candidates, and ties
+    # and infeasible rows are kept intact.
+    for cost_matrix in [
+        rng.rand(20, 50),
+        rng.randint(3, size=(10, 40)).astype(float),
+        np.where(rng.rand(10, 40) < 0.2, np.inf, rng.rand(10, 40)),
+    ]:
+        expected = linear_sum_assignment(cost_matrix)
+        row_ind, col_ind = lap.solve(cost_matrix)
+        assert_array_equal(row_ind, expected[0])
+        assert (
+            cost_matrix[row_ind, col_ind].sum()
+            == cost_matrix[expected[0], expected[1]].sum()
+        )
+
+    cost_matrix = np.full((3, 30), np.inf)
+    cost_matrix[:, 0] = 1
+    assert_raises(ValueError, lap.solve, cost_matrix)
+
+
+def test_linear_sum_assignment_k():
+    rng = np.random.RandomState(0)
+    for shape in [(10, 10), (8, 30), (30, 8)]:
+        n_rows, n_cols = shape
+        cost_matrix = rng.randn(*shape)
+        cost_matrix[rng.rand(*shape) < 0.2] = np.inf
+        for k in range(min(shape) + 1):
+            # Padding with dummy rows and columns, which can't be assigned to
+            # each other, leaves exactly k pairs of the cost matrix assigned.
+            padded = np.zeros((n_rows + n_cols - k, n_cols + n_rows - k))
+            padded[:n_rows, :n_cols] = cost_matrix
+            padded[n_rows:, n_cols:] = np.inf
+            try:
+                total = padded[linear_sum_assignment(padded)].sum()
+            except ValueError:
+                assert_raises(ValueError, lap.solve, cost_matrix, k=k)
+                continue
+
+            row_ind, col_ind = lap.solve(cost_matrix, k=k)
+            assert len(row_ind) == len(np.unique(col_ind)) == k
+            assert np.all(np.diff(row_ind) > 0)
+            assert np.isclose(cost_matrix[row_ind, col_ind].sum(), total)
+
+            row_ind, col_ind = lap.solve(-cost_matrix, maximize=True, k=k)
+            assert np.isclose(cost_matrix[row_ind, col_ind].sum(), total)
+
+    assert_raises(ValueError, lap.solve, cost_matrix, k=-1)
+    assert_raises(ValueError, lap.solve, cost_matrix, k=9)
+    assert_raises(ValueError, lap.solve, cost_matrix, k=1, decompose=True)
+
+
+def test_linear_sum_assignment_unassigned_costs():
+    rng = np.random.RandomState(0)
+    for shape in [(10, 10), (8, 15), (15, 8)]:
+        n_rows, n_cols = shape
+        cost_matrix = rng.randn(*shape)
+        cost_matrix[rng.rand(*shape) < 0.3] = np.inf
+        row_cost, col_cost = rng.rand(n_rows), 0.5
+
+        # The block matrix with the unassigned costs on the diagonals of the
+        # dummy blocks.
+        padded = np.zeros((n_rows + n_cols, n_cols + n_rows))
+        padded[:n_rows, :n_cols] = cost_matrix
+        padded[:n_rows, n_cols:] = np.inf
+        padded[n_rows:, :n_cols] = np.inf
+        padded[np.arange(n_rows), n_cols + np.arange(n_rows)] = row_cost
+        padded[n_rows + np.arange(n_cols), np.arange(n_cols)] = col_cost
+        expected = padded[linear_sum_assignment(padded)].sum()
+
+        for sign in [1, -1]:
+            col4row, row4col = lap.solve(
+                sign * cost_matrix,
+                maximize=sign < 0,
+                row_unassigned_cost=sign * row_cost,
+                col_unassigned_cost=sign * col_cost,
+            )
+            row_ind = np.flatnonzero(col4row >= 0)
+            assert_array_equal(row4col[col4row[row_ind]], row_ind)
+            assert np.sum(row4col >= 0) == len(row_ind)
+            total = (
+                cost_matrix[row_ind, col4row[row_ind]].sum()
+                + row_cost[col4row < 0].sum()
+                + col_cost * np.sum(row4col < 0)
+            )
+            assert np.isclose(total, expected)
+
+    assert_raises(ValueError, lap.solve, cost_matrix, row_unassigned_cost=np.inf)
+    assert_raises(ValueError, lap.solve, cost_matrix, row_unassigned_cost=[1, 2])
+    assert_raises(ValueError, lap.solve, cost_matrix, col_unassigned_cost=1, k=1)
+
+
+def test_solve_iter():
+    rng = np.random.RandomState(0)
+    cost_matrices = [rng.rand(*shape) for shape in [(5, 5), (20, 10), (10, 30)]]
+    for prefetch in [1, 3]:
+        results = list(lap.solve_iter(iter(cost_matrices), prefetch=prefetch))
+        assert len(results) == len(cost_matrices)
+        for cost_matrix, (row_ind, col_ind) in zip(cost_matrices, results):
+            expected = linear_sum_assignment(cost_matrix)
+            assert_array_equal(row_ind, expected[0])
+            assert_array_equal(col_ind, expected[1])
+
+    results = lap.solve_iter(cost_matrices, maximize=True)
+    for cost_matrix, (row_ind, col_ind) in zip(cost_matrices, results):
+        expected = linear_sum_assignment(cost_matrix, maximize=True)
+        assert_array_equal(col_ind, expected[1])
+
+    # Invalid matrices raise in turn.
+    results = lap.solve_iter([cost_matrices[0], np.ones(3), cost_matrices[1]])
+    next(results)
+    assert_raises(ValueError, next, results)
+
+    # Matrices are pulled no further ahead than prefetch, and the helper
+    # thread stops once the results are abandoned.
+    n_pulled = 0
+
+    def endless():
+        nonlocal n_pulled
+        while True:
+            n_pulled += 1
+            yield rng.rand(4, 4)
+
+    results = lap.solve_iter(endless(), prefetch=2)
+    for _ in range(3):
+        next(results)
+    results.close()
+    assert n_pulled <= 3 + 2 + 1
+
+    assert_raises(ValueError, next, lap.solve_iter(cost_matrices, prefetch=0))
+
+
+def test_linear_sum_assignment_return_stats():
+    for shape in [(5, 10), (10, 5), (7, 7)]:
+        cost_matrix = np.random.rand(*shape)
+
+        row_ind_1, col_ind_1, stats = lap.solve(cost_matrix, return_stats=True)
+        row_ind_2, col_ind_2 = lap.solve(cost_matrix)
+
+        assert_array_equal(row_ind_1, row_ind_2)
+        assert_array_equal(col_ind_1, col_ind_2)
+
+        assert stats["augmentations"] == min(shape)
+        assert stats["path_lengths"].sum() == stats["augmentations"]
+        assert stats["columns_scanned"] >= max(shape)
+        assert stats["ties"] >= 0
+        assert stats["init_time"] >= 0 and stats["augment_time"] >= 0
+
+
+def test_leave_one_out_costs():
+    rng = np.random.RandomState(0)
+    for shape in [(6, 6), (4, 9), (9, 4), (1, 3)]:
+        cost_matrix = rng.randint(5, size=shape).astype(float)
+        cost_matrix[rng.rand(*shape) < 0.3] = np.inf
+        for axis in [0, 1]:
+            expected = []
+            for k in range(shape[axis]):
+                sub_matrix = np.delete(cost_matrix, k, axis=axis)
+                try:
+                    row_ind, col_ind = linear_sum_assignment(sub_matrix)
+                except ValueError:
+                    expected.append(np.inf)
+                else:
+                    expected.append(sub_matrix[row_ind, col_ind].sum())
+
+            assert_array_equal(lap.leave_one_out_costs(cost_matrix, axis), expected)
+            assert_array_equal(
+                lap.leave_one_out_costs(-cost_matrix, axis, maximize=True),
+                -np.array(expected),
+            )
+
+    assert_raises(ValueError, lap.leave_one_out_costs, np.ones((2, 2)), axis=2)
+
+
+def test_solve_path():
+    rng = np.random.RandomState(0)
+    for shape in [(20, 20), (10, 15), (15, 10)]:
+        cost_matrix, direction = rng.rand(*shape), rng.rand(*shape) - 0.5
+        # Decreasing lambdas too, and a jump back.
+        lambdas = np.concatenate([np.linspace(-2, 2, 30), [1.5, -1, -3]])
+        assignments = lap.solve_path(cost_matrix, direction, lambdas)
+        assert len(assignments) == len(lambdas)
+        for lam, (row_ind, col_ind) in zip(lambdas, assignments):
+            problem = cost_matrix + lam * direction
+            expected = linear_sum_assignment(problem)
+            assert_array_equal(row_ind, expected[0])
+            assert np.isclose(problem[row_ind, col_ind].sum(), problem[expected].sum())
+
+    row_ind, col_ind = lap.solve_path(-cost_matrix, direction, [0], maximize=True)[0]
+    assert_array_equal(col_ind, linear_sum_assignment(cost_matrix)[1])
+    assert_raises(ValueError, lap.solve_path, np.ones((2, 2)), np.ones((2, 3)), [0])
+    direction = np.ones((2, 2))
+    assert_raises(ValueError, lap.solve_path, np.ones((2, 2)), direction, [np.nan])
+
+    # An inf in either matrix rules out its pair for every lambda.
+    cost_matrix, direction = rng.rand(6, 6), rng.rand(6, 6) - 0.5
+    cost_matrix[0, 0] = direction[1, 1] = direction[2, 2] = np.inf
+    lambdas = [-1.0, 0.0, 1.0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assignments = lap.solve_path(cost_matrix, direction, lambdas)
+    for lam, (row_ind, col_ind) in zip(lambdas, assignments):
+        problem = cost_matrix + lam * np.where(np.isinf(direction), 0, direction)
+        problem[np.isinf(direction)] = np.inf
+        expected = linear_sum_assignment(problem)
+        assert np.all(np.isfinite(problem[row_ind, col_ind]))
+        assert np.isclose(problem[row_ind, col_ind].sum(), problem[expected].sum())
+
+
+def test_solve_path_breakpoints():
+    rng = np.random.RandomState(0)
+    for shape in [(8, 8), (6, 9), (9, 6)]:
+        cost_matrix, direction = rng.rand(*shape), rng.rand(*shape) - 0.5
+        breakpoints, assignments = lap.solve_path_breakpoints(
+            cost_matrix, direction, -2, 2
+        )
+        assert len(assignments) == len(breakpoints) + 1
+        assert np.all(np.diff(breakpoints) > 0)
+
+        # Each assignment is optimal throughout its piece, and the pieces on
+        # either side of a breakpoint are different.
+        edges = np.concatenate([[-2], breakpoints, [2]])
+        for k, (row_ind, col_ind) in enumerate(assignments):
+            for lam in np.linspace(edges[k], edges[k + 1], 5):
+                problem = cost_matrix + lam * direction
+                expected = linear_sum_assignment(problem)
+                assert np.isclose(
+                    problem[row_ind, col_ind].sum(), problem[expected].sum()
+                )
+        for a, b in zip(assignments, assignments[1:]):
+            assert np.any(a[0] != b[0]) or np.any(a[1] != b[1])
+
+    # Without a direction, the assignment never changes.
+    breakpoints, assignments = lap.solve_path_breakpoints(
+        cost_matrix, np.zeros(shape), -2, 2
+    )
+    assert len(breakpoints) == 0 and len(assignments) == 1
+
+
+def test_solve_bottleneck():
+    rng = np.random.RandomState(0)
+    for shape in [(20, 20), (10, 15), (15, 10)]:
+        cost_matrix = rng.randint(50, size=shape).astype(float)
+        cost_matrix[rng.rand(*shape) < 0.3] = np.inf
+
+        # The smallest threshold below which the entries admit an assignment.
+        n = min(shape)
+        for threshold in np.unique(cost_matrix):
+            gated = np.where(cost_matrix <= threshold, cost_matrix, np.inf)
+            try:
+                expected = linear_sum_assignment(gated)
+            except ValueError:
+                continue
+            break
+
+        row_ind, col_ind = lap.solve_bottleneck(cost_matrix)
+        assert len(row_ind) == len(np.unique(col_ind)) == n
+        assert np.all(np.diff(row_ind) > 0)
+        assert cost_matrix[row_ind, col_ind].max() == threshold
+
+        row_ind, col_ind = lap.solve_bottleneck(cost_matrix, min_sum=True)
+        assert cost_matrix[row_ind, col_ind].max() == threshold
+        assert cost_matrix[row_ind, col_ind].sum() == gated[expected].sum()
+
+        row_ind, col_ind = lap.solve_bottleneck(-cost_matrix, True, min_sum=True)
+        assert cost_matrix[row_ind, col_ind].max() == threshold
+        assert cost_matrix[row_ind, col_ind].sum() == gated[expected].sum()
+
+    assert_raises(ValueError, lap.solve_bottleneck, [[1, np.inf], [2, np.inf]])
+    row_ind, col_ind = lap.solve_bottleneck(np.zeros((0, 3)))
+    assert len(row_ind) == len(col_ind) == 0
+
+
+def test_solve_capacitated_against_tiled():
+    for i in range(100):
+        n_rows, n_cols = np.random.randint(1, 6, size=2)
+        # Identical rows and columns are merged.
+        cost_matrix = np.random.randint(3, size=(n_rows, n_cols)).astype(float)
+        row_capacity = np.random.randint(4, size=n_rows)
+        col_capacity = np.random.randint(4, size=n_cols)
+
+        tiled = np.repeat(np.repeat(cost_matrix, row_capacity, 0), col_capacity, 1)
+        row_ind, col_ind = linear_sum_assignment(tiled)
+        expected_cost = tiled[row_ind, col_ind].sum()
+
+        for merge_identical in [True, False]:
+            row_ind, col_ind = lap.solve_capacitated(
+                cost_matrix, row_capacity, col_capacity, merge_identical=merge_identical
+            )
+            assert cost_matrix[row_ind, col_ind].sum() == expected_cost
+            assert len(row_ind) == min(row_capacity.sum(), col_capacity.sum())
+            assert np.all(np.bincount(row_ind, minlength=n_rows) <= row_capacity)
+            assert np.all(np.bincount(col_ind, minlength=n_cols) <= col_capacity)
+            assert np.all(np.diff(row_ind) >= 0)
+
+
+def test_solve_capacitated_unit_capacity():
+    cost_matrix = np.random.rand(5, 8)
+    row_ind, col_ind = lap.solve_capacitated(cost_matrix, maximize=True)
+    expected_row_ind, expected_col_ind = lap.solve(cost_matrix, maximize=True)
+    assert_array_equal(row_ind, expected_row_ind)
+    assert_array_equal(col_ind, expected_col_ind)
+
+
+def test_solve_capacitated_input_validation():
+    cost_matrix = np.ones((2, 3))
+    assert_raises(ValueError, lap.solve_capacitated, cost_matrix, [1, 2, 3])
+    assert_raises(ValueError, lap.solve_capacitated, cost_matrix, -1)
+    assert_raises(ValueError, lap.solve_capacitated, cost_matrix, 1.5)
+
+    cost_matrix = np.array([[1, np.inf], [2, np.inf]])
+    assert_raises(ValueError, lap.solve_capacitated, cost_matrix, 1, [1, 1])
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from laptools import clap_naive, lap
+
+pool = pytest.importorskip("laptools.pool")
+
+
+@pytest.fixture(scope="module")
+def solver_pool():
+    with pool.SolverPool(processes=2) as solver_pool:
+        yield solver_pool
+
+
+def test_solve(solver_pool):
+    cost_matrix = solver_pool.empty((6, 9))
+    cost_matrix[:] = np.random.rand(6, 9)
+    cost_matrices = [cost_matrix, np.random.rand(9, 6), np.random.rand(5, 5).tolist()]
+
+    results = solver_pool.solve_many(cost_matrices)
+    for cost_matrix, (row_ind, col_ind) in zip(cost_matrices, results):
+        expected_row_ind, expected_col_ind = lap.solve(cost_matrix)
+        np.testing.assert_array_equal(row_ind, expected_row_ind)
+        np.testing.assert_array_equal(col_ind, expected_col_ind)
+
+    row_ind, col_ind = solver_pool.solve(cost_matrices[0], maximize=True)
+    np.testing.assert_array_equal(
+        col_ind, lap.solve(cost_matrices[0], maximize=True)[1]
+    )
+
+    with pytest.raises(ValueError):
+        solver_pool.solve(np.full((3, 3), np.inf))
+
+
+@pytest.mark.parametrize("shape", [(7, 10), (10, 7), (6, 6)])
+def test_clap_costs(solver_pool, shape):
+    cost_matrix = np.random.rand(*shape)
+    total_costs = solver_pool.clap_costs(cost_matrix)
+    np.testing.assert_allclose(total_costs, clap_naive.costs(cost_matrix))
+
+    total_costs = solver_pool.clap_costs(cost_matrix, dtype=np.float32)
+    assert total_costs.dtype == np.float32
+    np.testing.assert_allclose(total_costs, clap_naive.costs(cost_matrix), rtol=1e-5)
+
+
+def test_clap_costs_infeasible(solver_pool):
+    cost_matrix = np.random.rand(4, 4)
+    cost_matrix[:, :3] = np.inf
+    assert np.all(np.isinf(solver_pool.clap_costs(cost_matrix)))
+
+
+def test_empty_released():
+    with pool.SolverPool(processes=1) as solver_pool:
+        array = solver_pool.empty((3, 4), dtype=np.float32)
+        assert array.dtype == np.float32 and array.flags.c_contiguous
+        assert len(solver_pool._blocks) == 1
+        view = array[1:]
+        del array
+        assert len(solver_pool._blocks) == 1
+        del view
+        assert len(solver_pool._blocks) == 0
@@ -0,0 +1,66 @@
+import numpy as np
+
+from laptools import clap, lap, profiling
+
+
+def test_profile_clap_costs():
+    cost_matrix = np.random.rand(8, 12)
+    expected = clap.costs(cost_matrix)
+
+    with profiling.profile() as prof:
+        total_costs = clap.costs(cost_matrix)
+    np.testing.assert_array_equal(total_costs, expected)
+
+    stats = prof.as_dict()
+    for phase in ["clap.base_solve", "clap.candidates", "clap.stolen_entries"]:
+        assert stats["times"][phase] >= 0
+
+    counts = stats["counts"]
+    # Every row either takes the shortcut or needs an augment.
+    assert counts.get("clap.shortcut_rows", 0) + counts.get(
+        "clap.removed_row_augments", 0
+    ) == len(cost_matrix)
+    # Every row has another row's column stolen from it once per other row.
+    assert counts.get("clap.candidate_entries", 0) + counts.get(
+        "clap.removed_col_augments", 0
+    ) == len(cost_matrix) * (len(cost_matrix) - 1)
+
+
+def test_profile_lap_solve():
+    with profiling.profile() as prof:
+        lap.solve(np.random.rand(10, 10))
+        lap.solve(np.random.rand(10, 10))
+
+    assert set(prof.as_dict()["times"]) == {
+        "solve.convert",
+        "solve.validate",
+        "solve.native",
+    }
+
+    # Small problems are solved by a single native call.
+    with profiling.profile() as prof:
+        lap.solve(np.random.rand(5, 5))
+    assert set(prof.as_dict()["times"]) == {"solve.native"}
+
+
+def test_profile_off_outside_of_block():
+    with profiling.profile() as prof:
+        pass
+    lap.solve(np.random.rand(5, 5))
+
+    assert prof.as_dict() == {"times": {}, "counts": {}}
+    assert not isinstance(profiling.current(), profiling.Profile)
+
+
+def test_profile_nested_and_accumulated():
+    outer = profiling.Profile()
+    with profiling.profile(outer):
+        with profiling.profile() as inner:
+            lap.solve(np.random.rand(5, 5))
+        assert profiling.current() is outer
+    with profiling.profile(outer):
+        lap.solve(np.random.rand(5, 5))
+
+    assert "solve.native" in inner.times
+    assert outer.counts == {}
+    assert outer.times["solve.native"] > 0